@@ -3,13 +3,26 @@
 # Funciona con almacenamiento temporal en memoria (STORIES_DB) para MVP.
 
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from flask import Blueprint, request, jsonify, send_file
+from flask import (
+    Blueprint, request, jsonify, send_file, send_from_directory, Response, stream_with_context, current_app
+)
+from config.settings import settings
 from models.models import Story, ChildProfile
 from config.database import SessionLocal
-from core.orchestrator import start_story_generation
+from core.orchestrator import start_story_generation, retry_story_generation, cancel_story_generation
+from core.job_queue import profundidad_por_cuenta
+from core.progress import bus_progreso, ESTADOS_FINALES
+from core.hls import directorio_hls, ruta_master
+from core.processors.portadas import (
+    recursos_portada, ruta_portada, ruta_miniatura, ruta_vista_previa, TAMANOS_MINIATURA
+)
 from utils.db_memory import STORIES_DB  # ✅ Fuente única para almacenamiento en memoria
+from datetime import datetime, timedelta
+import jwt
 import uuid
 import os
+import json
+import queue
 
 # Crear Blueprint para agrupar rutas relacionadas con historias
 stories_bp = Blueprint('stories', __name__)
@@ -21,7 +34,7 @@ REQUIRED_FIELDS = [
 ]
 
 # Estados válidos posibles (puede usarse para validación futura)
-VALID_STATUSES = ["pending", "generating", "completed", "failed"]
+VALID_STATUSES = ["pending", "generating", "completed", "failed", "cancelled"]
 
 # ──────────────────────────────────────────────────────────────
 # POST /api/stories/start
@@ -73,7 +86,7 @@ def start_story():
         STORIES_DB[story_id] = nueva_historia
 
         from core.orchestrator import start_story_generation
-        start_story_generation(story_id, data)
+        start_story_generation(story_id, data, owner=adulto_email)
 
         return jsonify({"story_id": story_id}), 201
 
@@ -84,6 +97,78 @@ def start_story():
         db.close()
 
 
+# ──────────────────────────────────────────────────────────────
+# GET /api/stories/queue
+# Consulta cuántas historias del adulto esperan o se están generando
+# ──────────────────────────────────────────────────────────────
+@stories_bp.route('/api/stories/queue', methods=['GET'])
+@jwt_required()
+def get_queue_depth():
+    """
+    Devuelve la profundidad de cola del adulto autenticado y el total del sistema.
+    """
+    try:
+        profundidad = profundidad_por_cuenta()
+        propia = profundidad.get(get_jwt_identity(), {"en_cola": 0, "en_curso": 0})
+
+        return jsonify({
+            "en_cola": propia["en_cola"],
+            "en_curso": propia["en_curso"],
+            "total_en_cola": sum(c["en_cola"] for c in profundidad.values()),
+            "cuentas_en_espera": sum(1 for c in profundidad.values() if c["en_cola"])
+        }), 200
+
+    except Exception as e:
+        return jsonify({"error": "Error al consultar la cola", "detail": str(e)}), 500
+
+
+# ──────────────────────────────────────────────────────────────
+# GET /api/stories/history
+# Historias del adulto autenticado, con sus miniaturas para los listados
+# ──────────────────────────────────────────────────────────────
+@stories_bp.route('/api/stories/history', methods=['GET'])
+@jwt_required()
+def get_story_history():
+    """
+    Lista las historias de los perfiles del adulto, de la más reciente a la más antigua
+    (?limite=N para quedarse con las N últimas).
+    """
+    db = SessionLocal()
+
+    try:
+        consulta = (
+            db.query(Story, ChildProfile.nombre)
+            .join(ChildProfile, ChildProfile.id == Story.profile_id)
+            .filter(ChildProfile.adulto_email == get_jwt_identity())
+            .order_by(Story.created_at.desc())
+        )
+        limite = request.args.get("limite", type=int)
+        if limite:
+            consulta = consulta.limit(limite)
+
+        historias = []
+        for story, nombre in consulta.all():
+            historia = {
+                "id": story.id,
+                "nombre": nombre,
+                "status": story.status,
+                "created_at": story.created_at.isoformat() if story.created_at else None,
+            }
+            if story.status == "completed":
+                historia["video_url"] = f"/api/stories/{story.id}/download"
+            # Portada y miniaturas: existen desde la primera escena
+            historia.update(recursos_portada(story.id))
+            historias.append(historia)
+
+        return jsonify(historias), 200
+
+    except Exception as e:
+        return jsonify({"error": "Error al consultar el historial", "detail": str(e)}), 500
+
+    finally:
+        db.close()
+
+
 # ──────────────────────────────────────────────────────────────
 # GET /api/stories/<story_id>/status
 # Consulta el estado actual de una historia
@@ -112,6 +197,13 @@ def get_story_status(story_id):
         if story.status == "completed" and story.video_path:
             response["video_url"] = story.video_path
 
+        # Playlist HLS: disponible desde la primera escena, aunque la historia siga generándose
+        if os.path.isfile(ruta_master(story.id)):
+            response["playlist_url"] = url_playlist(story.id)
+
+        # Portada, miniatura y vista previa: existen desde la primera escena
+        response.update(recursos_portada(story.id))
+
         return jsonify(response), 200
 
     except Exception as e:
@@ -122,6 +214,152 @@ def get_story_status(story_id):
 
 
 
+# ──────────────────────────────────────────────────────────────
+# GET /api/stories/<story_id>/events
+# Stream de progreso (Server-Sent Events) en lugar de consultar /status
+# ──────────────────────────────────────────────────────────────
+@stories_bp.route('/api/stories/<story_id>/events', methods=['GET'])
+@jwt_required()
+def stream_story_events(story_id):
+    """
+    Envía el progreso de la historia (etapa, escenas completadas/total, ETA)
+    como eventos SSE hasta que termina. Los eventos salen del bus de progreso
+    del proceso, no de una consulta a la base de datos por cliente.
+    """
+    db = SessionLocal()
+    try:
+        if not db.query(Story.id).filter_by(id=story_id).first():
+            return jsonify({"error": "Historia no encontrada."}), 404
+    finally:
+        db.close()
+
+    cola = bus_progreso.suscribir(story_id)
+
+    def eventos():
+        playlist_url = None
+        try:
+            while True:
+                try:
+                    evento = cola.get(timeout=15)
+                except queue.Empty:
+                    yield ": ping\n\n"  # Mantiene viva la conexión a través de proxies
+                    continue
+
+                # El bus no tiene contexto de aplicación: la URL firmada se añade aquí
+                if playlist_url is None and os.path.isfile(ruta_master(story_id)):
+                    playlist_url = url_playlist(story_id)
+                if playlist_url:
+                    evento = {**evento, "playlist_url": playlist_url}
+
+                yield f"event: progress\ndata: {json.dumps(evento)}\n\n"
+                if evento.get("status") in ESTADOS_FINALES:
+                    return
+        finally:
+            bus_progreso.desuscribir(story_id, cola)
+
+    return Response(
+        stream_with_context(eventos()),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+# ──────────────────────────────────────────────────────────────
+# POST /api/stories/<story_id>/retry
+# Reanuda una historia fallida rehaciendo solo las etapas que faltan
+# ──────────────────────────────────────────────────────────────
+@stories_bp.route('/api/stories/<story_id>/retry', methods=['POST'])
+@jwt_required()
+def retry_story(story_id):
+    """
+    Vuelve a encolar una historia fallida. Las imágenes, audios y subtítulos
+    ya generados se reutilizan desde el manifiesto de la historia.
+    """
+    db = SessionLocal()
+
+    try:
+        story = db.query(Story).filter_by(id=story_id).first()
+
+        if not story:
+            return jsonify({"error": "Historia no encontrada."}), 404
+
+        # Solo el adulto dueño del perfil puede reintentar (consume llamadas de pago)
+        perfil = db.query(ChildProfile).filter_by(id=story.profile_id, adulto_email=get_jwt_identity()).first()
+        if not perfil:
+            return jsonify({"error": "La historia no pertenece a este usuario"}), 403
+
+        if story.status not in ("failed", "cancelled"):
+            return jsonify({"error": "Solo se pueden reintentar historias fallidas o canceladas."}), 409
+
+        story.status = "pending"
+        story.error_message = None
+        db.commit()
+
+        if not retry_story_generation(story_id, owner=get_jwt_identity()):
+            story.status = "failed"
+            db.commit()
+            return jsonify({"error": "No hay datos previos para reintentar esta historia."}), 409
+
+        return jsonify({"story_id": story_id, "status": "pending"}), 202
+
+    except Exception as e:
+        return jsonify({"error": "Error al reintentar la historia", "detail": str(e)}), 500
+
+    finally:
+        db.close()
+
+
+# ──────────────────────────────────────────────────────────────
+# POST /api/stories/<story_id>/cancel
+# Detiene una historia en cola o en curso y libera su trabajador
+# ──────────────────────────────────────────────────────────────
+@stories_bp.route('/api/stories/<story_id>/cancel', methods=['POST'])
+@jwt_required()
+def cancel_story(story_id):
+    """
+    Cancela la generación de una historia. Si está en curso, el trabajador deja de
+    pedir imágenes y voz en la siguiente etapa; lo ya generado se conserva en el
+    manifiesto por si después se reintenta.
+    """
+    db = SessionLocal()
+
+    try:
+        story = db.query(Story).filter_by(id=story_id).first()
+
+        if not story:
+            return jsonify({"error": "Historia no encontrada."}), 404
+
+        perfil = db.query(ChildProfile).filter_by(id=story.profile_id, adulto_email=get_jwt_identity()).first()
+        if not perfil:
+            return jsonify({"error": "La historia no pertenece a este usuario"}), 403
+
+        if story.status not in ("pending", "generating"):
+            return jsonify({"error": "La historia ya no se está generando."}), 409
+
+        afectados = cancel_story_generation(story_id)
+
+        # Con un trabajo en curso, el estado final lo fija su trabajador al detenerse. Si no, se
+        # fija aquí solo mientras siga 'pending': un trabajador pudo reclamarla tras la lectura
+        if afectados["en_curso"]:
+            return jsonify({"story_id": story_id, "status": "cancelling"}), 202
+
+        actualizadas = db.query(Story).filter(Story.id == story_id, Story.status == "pending").update(
+            {Story.status: "cancelled"}, synchronize_session=False
+        )
+        db.commit()
+        if not (actualizadas or afectados["en_cola"]):
+            # Terminó entre la lectura y la cancelación
+            return jsonify({"error": "La historia ya no se está generando."}), 409
+
+        return jsonify({"story_id": story_id, "status": "cancelled"}), 202
+
+    except Exception as e:
+        return jsonify({"error": "Error al cancelar la historia", "detail": str(e)}), 500
+
+    finally:
+        db.close()
+
+
 # ──────────────────────────────────────────────────────────────
 # GET /api/stories/<story_id>/download
 # Permite visualizar o descargar el video generado
@@ -157,3 +395,116 @@ def download_story_video(story_id):
 
     finally:
         db.close()
+
+
+# ──────────────────────────────────────────────────────────────
+# GET /api/stories/<story_id>/hls/<token>/<archivo>
+# Playlists y trozos HLS de la historia (se sirven mientras se generan)
+# ──────────────────────────────────────────────────────────────
+TIPOS_HLS = {".m3u8": "application/vnd.apple.mpegurl", ".ts": "video/mp2t"}
+
+
+def url_playlist(story_id: str) -> str:
+    """
+    URL de la playlist maestra con un token firmado de corta duración en la ruta.
+    Los reproductores HLS (y <video src=...m3u8>) no envían la cabecera Authorization; al ir
+    el token en la ruta, las URLs relativas de variantes y trozos lo heredan sin reescribir
+    las playlists. El token solo vale para el HLS de esta historia: su audiencia hace que
+    @jwt_required lo rechace en el resto de la API.
+    """
+    ahora = datetime.utcnow()
+    token = jwt.encode(
+        {"aud": f"hls:{story_id}", "iat": ahora, "exp": ahora + timedelta(seconds=settings.HLS_TOKEN_SECONDS)},
+        current_app.config["JWT_SECRET_KEY"],
+        algorithm="HS256",
+    )
+    return f"/api/stories/{story_id}/hls/{token}/master.m3u8"
+
+
+def _token_hls_valido(story_id: str, token: str) -> bool:
+    try:
+        jwt.decode(token, current_app.config["JWT_SECRET_KEY"], algorithms=["HS256"], audience=f"hls:{story_id}")
+    except jwt.InvalidTokenError:
+        return False
+    return True
+
+
+@stories_bp.route('/api/stories/<story_id>/hls/<token>/<path:archivo>', methods=['GET'])
+def get_story_hls(story_id, token, archivo):
+    """
+    Sirve la playlist maestra, las playlists de cada variante y los trozos .ts.
+    Se autoriza con el token firmado de la ruta (ver url_playlist), no con la cabecera JWT.
+    """
+    if not _token_hls_valido(story_id, token):
+        return jsonify({"error": "Token HLS no válido o caducado."}), 401
+
+    extension = os.path.splitext(archivo)[1].lower()
+    if extension not in TIPOS_HLS:
+        return jsonify({"error": "Archivo no válido."}), 404
+
+    directorio = directorio_hls(story_id)
+    if not os.path.isdir(directorio):
+        return jsonify({"error": "La historia no tiene versión HLS."}), 404
+
+    # send_from_directory rechaza rutas fuera del directorio de la historia
+    respuesta = send_from_directory(directorio, archivo, mimetype=TIPOS_HLS[extension])
+    if extension == ".m3u8":
+        # Las playlists EVENT crecen mientras se renderizan escenas: no se cachean
+        respuesta.headers["Cache-Control"] = "no-cache"
+    return respuesta
+
+
+# ──────────────────────────────────────────────────────────────
+# GET /api/stories/<story_id>/poster | thumbnail | preview
+# Recursos ligeros para listados: sin descargar el video completo
+# ──────────────────────────────────────────────────────────────
+def _enviar_recurso(story_id, ruta, mimetype):
+    """
+    Envía un recurso ligero de la historia con caché corta en el navegador.
+    """
+    db = SessionLocal()
+    try:
+        if not db.query(Story.id).filter_by(id=story_id).first():
+            return jsonify({"error": "Historia no encontrada."}), 404
+    finally:
+        db.close()
+
+    if not os.path.isfile(ruta):
+        return jsonify({"error": "El recurso aún no está disponible."}), 404
+
+    # Un reintento puede regenerarlos: se permite caché, pero revalidando
+    return send_file(ruta, mimetype=mimetype, conditional=True, max_age=60)
+
+
+@stories_bp.route('/api/stories/<story_id>/poster', methods=['GET'])
+@jwt_required()
+def get_story_poster(story_id):
+    """
+    Portada de la historia (?formato=webp por defecto, o jpg).
+    """
+    formato = request.args.get("formato", "webp").lower()
+    if formato not in ("webp", "jpg"):
+        return jsonify({"error": "Formato no válido (webp o jpg)."}), 400
+    mimetype = "image/webp" if formato == "webp" else "image/jpeg"
+    return _enviar_recurso(story_id, ruta_portada(story_id, formato), mimetype)
+
+
+@stories_bp.route('/api/stories/<story_id>/thumbnail', methods=['GET'])
+@jwt_required()
+def get_story_thumbnail(story_id):
+    """
+    Miniatura WebP de la historia (?tamano=320 por defecto, o 160).
+    """
+    tamano = request.args.get("tamano", TAMANOS_MINIATURA[0], type=int)
+    if tamano not in TAMANOS_MINIATURA:
+        return jsonify({"error": f"Tamaño no válido ({', '.join(map(str, TAMANOS_MINIATURA))})."}), 400
+    return _enviar_recurso(story_id, ruta_miniatura(story_id, tamano), "image/webp")
+
+
+@stories_bp.route('/api/stories/<story_id>/preview', methods=['GET'])
+@jwt_required()
+def get_story_preview(story_id):
+    """
+    Vista previa de baja resolución de la primera escena.
+    """
+    return _enviar_recurso(story_id, ruta_vista_previa(story_id), "video/mp4")
@@ -5,13 +5,19 @@ from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker, declarative_base
 import os
 
-# Ruta a la base de datos SQLite (local por ahora)
+# Ruta a la base de datos SQLite (local por defecto)
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 DB_PATH = os.path.join(BASE_DIR, 'cuentix.db')
-DB_URL = f"sqlite:///{DB_PATH}"
+
+# DATABASE_URL permite compartir la base entre la API y trabajadores en otros hosts (p. ej. Postgres)
+DB_URL = os.getenv("DATABASE_URL", f"sqlite:///{DB_PATH}")
 
 # Crear motor de conexión
-engine = create_engine(DB_URL, connect_args={"check_same_thread": False})
+# (timeout amplio: varios procesos trabajadores escriben en la misma base SQLite)
+if DB_URL.startswith("sqlite"):
+    engine = create_engine(DB_URL, connect_args={"check_same_thread": False, "timeout": 30})
+else:
+    engine = create_engine(DB_URL, pool_pre_ping=True)
 
 # Crear sesión de conexión
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
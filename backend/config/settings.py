@@ -29,7 +29,26 @@ class Settings(BaseSettings):
 
     # 🗣️ Motor de texto a voz y modelo de Whisper
     TTS_ENGINE: str = Field("gtts", env="TTS_ENGINE")
+    # Formato de la narración: "aac" (.m4a, se copia al video sin recodificar) o "mp3"
+    AUDIO_FORMAT: str = Field("aac", env="AUDIO_FORMAT")
+    # Caché en disco de narraciones (motor, voz, modelo y texto): tamaño máximo en MB (0 = desactivada)
+    TTS_CACHE_MAX_MB: int = Field(512, env="TTS_CACHE_MAX_MB")
     WHISPER_MODEL_SIZE: str = Field("base", env="WHISPER_MODEL_SIZE")
+    # Motor de transcripción: "openai-whisper" (PyTorch fp32) o "faster-whisper" (CTranslate2 cuantizado)
+    WHISPER_ENGINE: str = Field("openai-whisper", env="WHISPER_ENGINE")
+    WHISPER_COMPUTE_TYPE: str = Field("int8", env="WHISPER_COMPUTE_TYPE")  # Solo faster-whisper
+    # Subtítulos: "alineacion" (texto conocido + energía de la narración) o "whisper" (transcripción)
+    SUBTITLE_ENGINE: str = Field("alineacion", env="SUBTITLE_ENGINE")
+    SUBTITLE_VERIFY: bool = Field(False, env="SUBTITLE_VERIFY")  # Whisper verifica la alineación
+    SUBTITLE_VERIFY_MIN_RATIO: float = Field(0.6, env="SUBTITLE_VERIFY_MIN_RATIO")
+    # Servicio de transcripción por lotes (un modelo Whisper por proceso trabajador)
+    WHISPER_BATCH_SIZE: int = Field(8, env="WHISPER_BATCH_SIZE")
+    WHISPER_BATCH_WAIT: float = Field(0.05, env="WHISPER_BATCH_WAIT")  # s esperando a completar un lote
+    WHISPER_QUEUE_MAX: int = Field(64, env="WHISPER_QUEUE_MAX")
+
+    # 🔥 Recursos que cada trabajador carga al arrancar (whisper, openai, elevenlabs)
+    # Whisper solo hace falta con SUBTITLE_ENGINE=whisper o SUBTITLE_VERIFY; si no, se carga bajo demanda
+    PRELOAD_MODELS: str = Field("openai", env="PRELOAD_MODELS")
 
     # 📁 Rutas de carpetas (sobrescribibles desde .env)
     AUDIO_DIR: str = Field(default="assets/audio", env="AUDIO_DIR")
@@ -38,6 +57,90 @@ class Settings(BaseSettings):
     SUBTITLES_DIR: str = Field(default="assets/subtitles", env="SUBTITLES_DIR")
     TEXT_DIR: str = Field(default="assets/text", env="TEXT_DIR")
 
+    # 👷 Cola de trabajos y pool de procesos de generación
+    # (STORY_WORKERS=0 → la API solo encola y los trabajos los ejecuta `python -m tasks.worker`)
+    STORY_WORKERS: int = Field(2, env="STORY_WORKERS")
+    JOB_POLL_INTERVAL: float = Field(1.0, env="JOB_POLL_INTERVAL")
+    JOB_MAX_ATTEMPTS: int = Field(3, env="JOB_MAX_ATTEMPTS")
+    JOB_LEASE_SECONDS: int = Field(120, env="JOB_LEASE_SECONDS")
+    JOB_HEARTBEAT_INTERVAL: float = Field(20.0, env="JOB_HEARTBEAT_INTERVAL")
+    # Cada cuánto comprueba el trabajador si la historia en curso fue cancelada
+    JOB_CANCEL_CHECK_INTERVAL: float = Field(2.0, env="JOB_CANCEL_CHECK_INTERVAL")
+
+    # ⏱️ Tiempo máximo de generación de una historia (0 = sin límite). Cada llamada a un
+    # proveedor usa como timeout lo que queda de este presupuesto.
+    STORY_DEADLINE_SECONDS: float = Field(900, env="STORY_DEADLINE_SECONDS")
+
+    # 🎬 Motor de render de escenas: "ffmpeg" (imagen fija codificada directamente) o "moviepy"
+    RENDER_BACKEND: str = Field("ffmpeg", env="RENDER_BACKEND")
+    FFMPEG_BINARY: str = Field("", env="FFMPEG_BINARY")  # Vacío → binario de imageio-ffmpeg
+    SUBTITLE_FONT: str = Field("DejaVuSans-Bold", env="SUBTITLE_FONT")  # Nombre o ruta .ttf
+    # Subtítulos del video: "srt" (línea a línea según la narración), "parrafo" (texto completo)
+    # o "soft" (sin texto en la imagen; pista de subtítulos mov_text en el .mp4)
+    SUBTITLE_MODE: str = Field("srt", env="SUBTITLE_MODE")
+    # Caché de fotogramas pre-renderizados: tamaño máximo en MB (se expulsa lo usado hace más tiempo)
+    FRAME_CACHE_MAX_MB: int = Field(1024, env="FRAME_CACHE_MAX_MB")
+    # Procesos de render de segmentos por trabajador (0 = núcleos / STORY_WORKERS)
+    RENDER_PROCESSES: int = Field(0, env="RENDER_PROCESSES")
+    # Escenas que renderiza cada proceso antes de reciclarse (0 = nunca); acota la memoria retenida
+    RENDER_TASKS_PER_PROCESS: int = Field(25, env="RENDER_TASKS_PER_PROCESS")
+
+    # ⚙️ Gobierno de CPU: los hilos de ffmpeg y de torch se reparten según los trabajos concurrentes
+    CPU_CORES: int = Field(0, env="CPU_CORES")            # 0 = os.cpu_count()
+    WHISPER_THREADS: int = Field(0, env="WHISPER_THREADS")  # 0 = núcleos / STORY_WORKERS
+    # Perfil de codificación x264 de los segmentos (los hilos los decide el gobernador)
+    RENDER_PROFILE: str = Field("equilibrado", env="RENDER_PROFILE")
+    RENDER_PROFILES: dict = Field(default_factory=lambda: {
+        "rapido": {"preset": "ultrafast", "crf": 28},
+        "equilibrado": {"preset": "veryfast", "crf": 23},
+        "calidad": {"preset": "medium", "crf": 20},
+    }, env="RENDER_PROFILES")
+
+    # 🖼️ Portada, miniaturas y vista previa de baja resolución desde la primera escena
+    PREVIEW_ENABLED: bool = Field(True, env="PREVIEW_ENABLED")
+    PREVIEW_SIZE: int = Field(240, env="PREVIEW_SIZE")  # Lado en px de la vista previa
+
+    # 📺 Entrega HLS progresiva: cada escena se publica en una playlist EVENT al terminar su render
+    HLS_ENABLED: bool = Field(False, env="HLS_ENABLED")
+    HLS_SEGMENT_SECONDS: float = Field(6.0, env="HLS_SEGMENT_SECONDS")
+    # Variantes: alto en píxeles y bitrates de video/audio (la de 360p es para móviles)
+    HLS_RENDITIONS: list = Field(default_factory=lambda: [
+        {"alto": 720, "video": "1800k", "audio": "128k"},
+        {"alto": 360, "video": "500k", "audio": "64k"},
+    ], env="HLS_RENDITIONS")
+    # Vida del token firmado de las URLs HLS (los reproductores no envían la cabecera Authorization)
+    HLS_TOKEN_SECONDS: int = Field(3600, env="HLS_TOKEN_SECONDS")
+
+    # 📝 Generación de texto en streaming (las escenas arrancan antes de que termine el cuento)
+    TEXT_STREAMING: bool = Field(True, env="TEXT_STREAMING")
+
+    # 🚦 Límites por proveedor (la cuota real de la cuenta):
+    #    rpm = peticiones/min, tpm = tokens/min (caracteres en TTS): globales, compartidos por todos los trabajadores
+    #    max_en_curso = llamadas simultáneas por host (0 = sin límite), repartidas entre sus STORY_WORKERS
+    PROVIDER_LIMITS: dict = Field(default_factory=lambda: {
+        "openai_images": {"rpm": 5, "tpm": 0, "max_en_curso": 2},
+        "openai_tts": {"rpm": 50, "tpm": 0, "max_en_curso": 4},
+        "openai_chat": {"rpm": 500, "tpm": 10000, "max_en_curso": 4},
+        "elevenlabs": {"rpm": 100, "tpm": 0, "max_en_curso": 2},
+        "deepseek": {"rpm": 60, "tpm": 0, "max_en_curso": 4},
+    }, env="PROVIDER_LIMITS")
+
+    # ⚖️ Reparto justo de trabajadores entre cuentas adultas
+    #    ACCOUNT_WEIGHTS: {"correo": peso} (peso 1 por defecto; p. ej. cuentas escolares con más peso)
+    #    ACCOUNT_PRIORITIES: {"correo": nivel} (nivel 0 por defecto; los niveles altos se atienden antes)
+    FAIR_SHARE_WINDOW: int = Field(3600, env="FAIR_SHARE_WINDOW")
+    ACCOUNT_WEIGHTS: dict = Field(default_factory=dict, env="ACCOUNT_WEIGHTS")
+    ACCOUNT_PRIORITIES: dict = Field(default_factory=dict, env="ACCOUNT_PRIORITIES")
+
+    # 📡 Intervalo (s) con el que la API refresca el progreso de las historias observadas por SSE
+    PROGRESS_POLL_INTERVAL: float = Field(1.0, env="PROGRESS_POLL_INTERVAL")
+
+    # 🧩 Tamaño de los pools por tipo de etapa del pipeline de escenas
+    SCENE_POOL_IMAGE: int = Field(4, env="SCENE_POOL_IMAGE")
+    SCENE_POOL_AUDIO: int = Field(4, env="SCENE_POOL_AUDIO")
+    SCENE_POOL_SUBTITLES: int = Field(2, env="SCENE_POOL_SUBTITLES")
+    SCENE_POOL_VIDEO: int = Field(0, env="SCENE_POOL_VIDEO")  # 0 = tantos como procesos de render
+
     class Config:
         extra = "forbid"
         populate_by_name = True
@@ -58,6 +161,67 @@ class Settings(BaseSettings):
             logging.debug(f"📁 Carpeta verificada: {ruta}")
 
 
+# ─────────────────────────────────────────────────────────────────────────────
+# ⚙️ Gobernador de CPU
+# Cada trabajador de historias recibe núcleos / STORY_WORKERS; dentro de él, esos núcleos
+# se reparten entre los procesos de render (hilos de ffmpeg por proceso) y Whisper (hilos
+# de torch, una transcripción a la vez por modelo). Así el total de hilos ≈ núcleos del host
+# en lugar de que cada ffmpeg y cada torch intenten usar todas las CPU a la vez.
+# ─────────────────────────────────────────────────────────────────────────────
+class GobernadorCPU:
+    def __init__(self, config: Settings):
+        self.config = config
+
+    def nucleos(self) -> int:
+        return self.config.CPU_CORES or os.cpu_count() or 1
+
+    def nucleos_por_trabajador(self) -> int:
+        return max(1, self.nucleos() // max(1, self.config.STORY_WORKERS))
+
+    def procesos_render(self) -> int:
+        """
+        Procesos de render por trabajador: RENDER_PROCESSES o los núcleos del trabajador.
+        """
+        return self.config.RENDER_PROCESSES or self.nucleos_por_trabajador()
+
+    def hilos_ffmpeg(self) -> int:
+        """
+        Hilos de cada codificación: los núcleos del trabajador entre sus procesos de render.
+        """
+        return max(1, self.nucleos_por_trabajador() // self.procesos_render())
+
+    def hilos_torch(self) -> int:
+        return self.config.WHISPER_THREADS or self.nucleos_por_trabajador()
+
+    def perfil_render(self) -> dict:
+        """
+        Perfil de codificación activo con los hilos asignados.
+
+        Retorna:
+        - dict: {"preset": str, "crf": int, "hilos": int}
+        """
+        perfiles = self.config.RENDER_PROFILES
+        if self.config.RENDER_PROFILE not in perfiles:
+            raise ValueError(f"Perfil de render desconocido: {self.config.RENDER_PROFILE}")
+        return {**perfiles[self.config.RENDER_PROFILE], "hilos": self.hilos_ffmpeg()}
+
+    def argumentos_x264(self) -> list:
+        """
+        Argumentos de ffmpeg del perfil activo (-preset, -crf y -threads).
+        """
+        perfil = self.perfil_render()
+        return ["-preset", perfil["preset"], "-crf", str(perfil["crf"]), "-threads", str(perfil["hilos"])]
+
+    def aplicar_torch(self) -> None:
+        """
+        Limita los hilos de torch del proceso (se llama antes de cargar Whisper).
+        """
+        import torch
+        torch.set_num_threads(self.hilos_torch())
+        logging.info(f"⚙️ torch limitado a {self.hilos_torch()} hilos")
+
+
 # Instancia compartida
 settings = Settings()
 settings.crear_carpetas()
+gobernador = GobernadorCPU(settings)
@@ -5,6 +5,7 @@
 import requests
 from config.settings import settings
 from utils.logger import get_logger
+from core.rate_limiter import obtener_limitador, estimar_tokens
 from tenacity import retry, stop_after_attempt, wait_exponential
 
 logger = get_logger(__name__)
@@ -35,7 +36,11 @@ def generar_texto_desde_deepseek(prompt: str) -> str:
         }
 
         logger.info("🧠 Enviando prompt a DeepSeek...")
-        response = requests.post("https://api.deepseek.com/v1/chat/completions", headers=headers, json=data, timeout=30)
+        limitador = obtener_limitador("deepseek")
+        with limitador.reservar(tokens=estimar_tokens(prompt)):
+            response = requests.post("https://api.deepseek.com/v1/chat/completions", headers=headers, json=data, timeout=30)
+        if response.status_code == 429:
+            limitador.penalizar()
         response.raise_for_status()
 
         texto_generado = response.json()["choices"][0]["message"]["content"]
@@ -5,19 +5,24 @@
 
 from config.settings import settings
 from utils.logger import get_logger
-from elevenlabs.client import ElevenLabs
+from core.model_registry import registro_modelos
+from core.rate_limiter import obtener_limitador
+from core.deadline import limitar_timeout
 
 import os
 
 logger = get_logger(__name__)
 
-def convertir_texto_a_audio_elevenlabs(texto: str, ruta_salida: str) -> str:
+MODELO_ELEVENLABS = "eleven_multilingual_v2"
+
+def convertir_texto_a_audio_elevenlabs(texto: str, ruta_salida: str, plazo=None) -> str:
     """
     Convierte texto a voz usando ElevenLabs API y guarda el audio como archivo MP3.
 
     Parámetros:
     - texto (str): Texto a convertir.
     - ruta_salida (str): Ruta completa donde guardar el archivo .mp3
+    - plazo (Plazo): Presupuesto de tiempo de la historia (limita el timeout).
 
     Retorna:
     - str: Ruta al archivo generado o "" si ocurre un error.
@@ -26,20 +31,22 @@ def convertir_texto_a_audio_elevenlabs(texto: str, ruta_salida: str) -> str:
         # Crear carpeta si no existe
         os.makedirs(os.path.dirname(ruta_salida), exist_ok=True)
 
-        # Inicializar cliente ElevenLabs
-        client = ElevenLabs(api_key=settings.ELEVENLABS_API_KEY)
+        # Cliente ElevenLabs compartido por todo el proceso
+        client = registro_modelos.obtener("elevenlabs")
 
         logger.info("🎤 Enviando texto a ElevenLabs TTS...")
 
-        audio = client.text_to_speech.convert(
-            voice_id=settings.ELEVENLABS_VOICE_ID,
-            text=texto,
-            model_id="eleven_multilingual_v2",
-            output_format="mp3_44100"
-        )
-
-        with open(ruta_salida, "wb") as f:
-            f.write(audio)
+        with obtener_limitador("elevenlabs").reservar(tokens=len(texto), plazo=plazo):
+            audio = client.text_to_speech.convert(
+                voice_id=settings.ELEVENLABS_VOICE_ID,
+                text=texto,
+                model_id=MODELO_ELEVENLABS,
+                output_format="mp3_44100",
+                request_options={"timeout_in_seconds": int(limitar_timeout(plazo, 60))}
+            )
+
+            with open(ruta_salida, "wb") as f:
+                f.write(audio)
 
         logger.info(f"✅ Audio generado con ElevenLabs en: {ruta_salida}")
         return ruta_salida
@@ -4,19 +4,27 @@ import requests
 import os
 from config.settings import settings
 from utils.logger import get_logger
+from core.rate_limiter import obtener_limitador
+from core.deadline import limitar_timeout, sin_plazo_para_reintentar
 from tenacity import retry, stop_after_attempt, wait_exponential
 
 logger = get_logger(__name__)
 
-@retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=2, max=10))
-def convertir_texto_a_audio_openai(texto: str, ruta_salida: str, voz: str = "alloy") -> str:
+MODELO_TTS = "tts-1"
+VOZ_TTS = "alloy"
+
+@retry(stop=stop_after_attempt(3) | sin_plazo_para_reintentar, wait=wait_exponential(multiplier=1, min=2, max=10))
+def convertir_texto_a_audio_openai(texto: str, ruta_salida: str, voz: str = VOZ_TTS, plazo=None,
+                                   formato: str = "mp3") -> str:
     """
-    Convierte texto a voz usando la API de OpenAI TTS y guarda el resultado como archivo .mp3.
+    Convierte texto a voz usando la API de OpenAI TTS y guarda el resultado (.mp3 por defecto).
 
     Parámetros:
     - texto (str): Texto a convertir en voz.
     - ruta_salida (str): Ruta completa donde guardar el archivo.
     - voz (str): Voz seleccionada (alloy, echo, fable, onyx, nova, shimmer).
+    - plazo (Plazo): Presupuesto de tiempo de la historia (limita timeout y reintentos).
+    - formato (str): response_format de la API (mp3, aac, opus...).
 
     Retorna:
     - str: Ruta al archivo generado o "" si ocurre un error.
@@ -28,14 +36,20 @@ def convertir_texto_a_audio_openai(texto: str, ruta_salida: str, voz: str = "all
     }
 
     data = {
-        "model": "tts-1",
+        "model": MODELO_TTS,
         "input": texto,
-        "voice": voz
+        "voice": voz,
+        "response_format": formato
     }
 
     try:
         logger.info("🎤 Enviando texto a OpenAI TTS...")
-        response = requests.post("https://api.openai.com/v1/audio/speech", headers=headers, json=data, timeout=30)
+        limitador = obtener_limitador("openai_tts")
+        with limitador.reservar(tokens=len(texto), plazo=plazo):
+            response = requests.post("https://api.openai.com/v1/audio/speech", headers=headers, json=data,
+                                     timeout=limitar_timeout(plazo, 30))
+        if response.status_code == 429:
+            limitador.penalizar()
         response.raise_for_status()
 
         with open(ruta_salida, "wb") as f:
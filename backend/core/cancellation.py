@@ -0,0 +1,36 @@
+# core/cancellation.py
+# Cancelación cooperativa de la generación de una historia.
+# La API marca el trabajo como cancelado en la base de datos; el latido del trabajador
+# lo detecta y activa el token, y el pipeline lo comprueba entre etapas para dejar
+# de pedir imágenes, voz y subtítulos y liberar su hueco en el trabajador.
+
+import threading
+
+
+class GeneracionCancelada(Exception):
+    """
+    Se lanza cuando el usuario canceló la historia en curso.
+    """
+
+
+class TokenCancelacion:
+    """
+    Señal de cancelación compartida por todos los hilos de una historia.
+    """
+
+    def __init__(self):
+        self._evento = threading.Event()
+
+    def cancelar(self) -> None:
+        self._evento.set()
+
+    @property
+    def cancelado(self) -> bool:
+        return self._evento.is_set()
+
+    def comprobar(self) -> None:
+        """
+        Lanza GeneracionCancelada si se pidió cancelar. Se llama entre etapas.
+        """
+        if self._evento.is_set():
+            raise GeneracionCancelada("Generación cancelada por el usuario")
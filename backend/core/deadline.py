@@ -0,0 +1,95 @@
+# core/deadline.py
+# Presupuesto de tiempo por historia.
+# generate_story crea un Plazo a partir de STORY_DEADLINE_SECONDS y lo pasa a cada
+# generador: cada llamada a un proveedor usa como timeout lo que queda del presupuesto
+# (con su propio máximo), y los reintentos que ya no caben en el plazo no se hacen.
+# Así la latencia de una historia en el peor caso queda acotada y el trabajador no
+# se queda bloqueado minutos esperando a un proveedor lento.
+
+import math
+import time
+
+
+class PlazoAgotado(TimeoutError):
+    """
+    Se lanza cuando a la historia ya no le queda tiempo para la siguiente etapa.
+    """
+
+
+class Plazo:
+    """
+    Instante límite de una historia (reloj monotónico).
+
+    Parámetros:
+    - segundos (float): Presupuesto total. None o 0 → sin límite.
+    """
+
+    def __init__(self, segundos: float = None):
+        self.segundos = segundos or None
+        self.limite = time.monotonic() + segundos if segundos else None
+
+    def restante(self) -> float:
+        """
+        Segundos que quedan del presupuesto (infinito si no hay límite).
+        """
+        if self.limite is None:
+            return math.inf
+        return max(0.0, self.limite - time.monotonic())
+
+    def espera_max(self):
+        """
+        Lo que queda, para usarlo como timeout de una espera (None si no hay límite).
+        """
+        return None if self.limite is None else self.restante()
+
+    @property
+    def vencido(self) -> bool:
+        return self.restante() <= 0
+
+    def comprobar(self, etapa: str = "") -> None:
+        """
+        Lanza PlazoAgotado si ya no queda tiempo. Se llama antes de empezar cada etapa.
+        """
+        if self.vencido:
+            detalle = f" antes de {etapa}" if etapa else ""
+            raise PlazoAgotado(f"Tiempo máximo de la historia agotado{detalle} ({self.segundos:.0f}s)")
+
+    def timeout(self, maximo: float, minimo: float = 1.0) -> float:
+        """
+        Timeout para una llamada: lo que queda del plazo, sin pasar de `maximo`.
+
+        Parámetros:
+        - maximo (float): Timeout propio de la llamada (el que tenía sin plazo).
+        - minimo (float): Si queda menos que esto, la llamada no merece la pena.
+
+        Retorna:
+        - float: Segundos de timeout.
+        """
+        restante = self.restante()
+        if restante < minimo:
+            raise PlazoAgotado(f"Quedan {restante:.1f}s del plazo de la historia; no se inicia la llamada")
+        return min(maximo, restante)
+
+
+def limitar_timeout(plazo, maximo: float, minimo: float = 1.0) -> float:
+    """
+    Igual que Plazo.timeout, pero admite plazo=None (devuelve `maximo`).
+    """
+    return plazo.timeout(maximo, minimo) if plazo else maximo
+
+
+# Tiempo mínimo que debe quedar tras la espera para que un reintento tenga sentido
+MARGEN_REINTENTO = 5.0
+
+
+def sin_plazo_para_reintentar(retry_state) -> bool:
+    """
+    Condición de parada de tenacity: no reintenta si, tras la espera del backoff,
+    no queda plazo para un intento más. El plazo se toma del argumento `plazo`
+    de la función decorada (debe pasarse por nombre).
+    """
+    plazo = retry_state.kwargs.get("plazo")
+    if plazo is None:
+        return False
+    espera = getattr(retry_state, "upcoming_sleep", 0) or 0
+    return plazo.restante() < espera + MARGEN_REINTENTO
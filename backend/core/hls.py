@@ -0,0 +1,230 @@
+# core/hls.py
+# Empaquetado HLS progresivo de una historia.
+# En cuanto una escena tiene su segmento .mp4, se codifica a cada variante (resolución y
+# bitrate) en trozos MPEG-TS y se añade a una playlist EVENT. Las escenas se publican
+# en orden: la escena N solo aparece cuando ya están publicadas (u omitidas) las anteriores.
+# Así la reproducción puede empezar con la primera escena mientras el resto se renderiza.
+#
+#   assets/videos/hls/<story_id>/master.m3u8        → variantes
+#   assets/videos/hls/<story_id>/<alto>p/index.m3u8 → playlist EVENT de cada variante
+
+import math
+import os
+import shutil
+import threading
+from config.settings import settings, gobernador
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+HLS_DIR = os.path.abspath(os.path.join("assets", "videos", "hls"))
+MASTER = "master.m3u8"
+PLAYLIST = "index.m3u8"
+
+
+def directorio_hls(story_id: str) -> str:
+    return os.path.join(HLS_DIR, str(story_id))
+
+
+def ruta_master(story_id: str) -> str:
+    """
+    Ruta de la playlist maestra de la historia (existe desde que se publica la primera escena).
+    """
+    return os.path.join(directorio_hls(story_id), MASTER)
+
+
+def _escribir_atomico(ruta: str, contenido: str) -> None:
+    # El reproductor relee la playlist mientras se añade: nunca debe verla a medio escribir
+    temporal = f"{ruta}.tmp"
+    with open(temporal, "w", encoding="utf-8") as f:
+        f.write(contenido)
+    os.replace(temporal, ruta)
+
+
+class EmpaquetadorHLS:
+    """
+    Publica las escenas de una historia en playlists HLS a medida que se renderizan.
+
+    Parámetros:
+    - story_id (str): Historia.
+    - ancho, alto (int): Tamaño de los segmentos de origen (para la resolución de cada variante).
+    - variantes (list): [{"alto": 720, "video": "2000k", "audio": "128k"}, ...] (HLS_RENDITIONS).
+    - duracion_segmento (float): Duración objetivo de cada trozo .ts (HLS_SEGMENT_SECONDS).
+    """
+
+    def __init__(self, story_id: str, ancho: int, alto: int, variantes: list = None,
+                 duracion_segmento: float = None, directorio: str = None):
+        self.story_id = story_id
+        self.ancho = ancho
+        self.alto = alto
+        self.variantes = variantes or settings.HLS_RENDITIONS
+        self.duracion_segmento = duracion_segmento or settings.HLS_SEGMENT_SECONDS
+        self.directorio = directorio or directorio_hls(story_id)
+        self._lock = threading.Lock()
+        self._trozos = {}        # indice → [(archivo_relativo, duracion), ...] por variante
+        self._publicadas = []    # listas de trozos de las escenas ya publicadas, en orden
+        self._siguiente = 0
+        self._terminado = False
+
+        # Un reintento empieza las playlists de cero: las escenas se vuelven a publicar en orden
+        shutil.rmtree(self.directorio, ignore_errors=True)
+        for variante in self.variantes:
+            os.makedirs(os.path.join(self.directorio, self._nombre(variante)), exist_ok=True)
+
+    def agregar_escena(self, indice: int, ruta_segmento: str, plazo=None) -> None:
+        """
+        Codifica el segmento de una escena a todas las variantes y publica lo que ya está en orden.
+        Si la codificación falla, la escena se omite (la historia sigue sin ella).
+        """
+        try:
+            trozos = self._codificar(indice, ruta_segmento, plazo)
+        except Exception as e:
+            logger.warning(f"⚠️ No se pudo empaquetar en HLS la escena {indice} de {self.story_id}: {e}")
+            trozos = None
+        with self._lock:
+            self._trozos[indice] = trozos
+            self._publicar()
+
+    def omitir_escena(self, indice: int) -> None:
+        """
+        Marca una escena fallida para que no bloquee la publicación de las siguientes.
+        """
+        with self._lock:
+            self._trozos[indice] = None
+            self._publicar()
+
+    def finalizar(self) -> None:
+        """
+        Cierra las playlists (#EXT-X-ENDLIST): el reproductor deja de esperar más escenas.
+        """
+        with self._lock:
+            self._terminado = True
+            self._publicar()
+
+    def _publicar(self) -> None:
+        # Se llama con el lock tomado
+        while self._siguiente in self._trozos:
+            trozos = self._trozos.pop(self._siguiente)
+            if trozos:
+                self._publicadas.append(trozos)
+            self._siguiente += 1
+
+        if not self._publicadas:
+            return
+        for posicion, variante in enumerate(self.variantes):
+            _escribir_atomico(
+                os.path.join(self.directorio, self._nombre(variante), PLAYLIST),
+                self._playlist([trozos[posicion] for trozos in self._publicadas]),
+            )
+        ruta = os.path.join(self.directorio, MASTER)
+        if not os.path.exists(ruta):
+            _escribir_atomico(ruta, self._master())
+            logger.info(f"📺 Historia {self.story_id} disponible en HLS desde la primera escena")
+
+    def _playlist(self, escenas: list) -> str:
+        """
+        Playlist EVENT de una variante. Cada escena empieza con marcas de tiempo propias,
+        por eso va precedida de #EXT-X-DISCONTINUITY.
+        """
+        lineas = [
+            "#EXTM3U",
+            "#EXT-X-VERSION:3",
+            "#EXT-X-PLAYLIST-TYPE:EVENT",
+            f"#EXT-X-TARGETDURATION:{math.ceil(self.duracion_segmento) + 1}",
+            "#EXT-X-MEDIA-SEQUENCE:0",
+        ]
+        for numero, trozos in enumerate(escenas):
+            if numero > 0:
+                lineas.append("#EXT-X-DISCONTINUITY")
+            for archivo, duracion in trozos:
+                lineas += [f"#EXTINF:{duracion:.3f},", archivo]
+        if self._terminado:
+            lineas.append("#EXT-X-ENDLIST")
+        return "\n".join(lineas) + "\n"
+
+    def _master(self) -> str:
+        lineas = ["#EXTM3U", "#EXT-X-VERSION:3"]
+        for variante in self.variantes:
+            ancho, alto = self._resolucion(variante)
+            ancho_banda = _bits(variante["video"]) + _bits(variante["audio"])
+            lineas += [
+                f"#EXT-X-STREAM-INF:BANDWIDTH={ancho_banda},RESOLUTION={ancho}x{alto},"
+                f"CODECS=\"avc1.64001f,mp4a.40.2\"",
+                f"{self._nombre(variante)}/{PLAYLIST}",
+            ]
+        return "\n".join(lineas) + "\n"
+
+    def _codificar(self, indice: int, ruta_segmento: str, plazo=None) -> list:
+        """
+        Codifica el segmento a todas las variantes en una sola pasada de ffmpeg (un decodificado,
+        varias salidas), cortando en trozos .ts con un fotograma clave cada `duracion_segmento`.
+        La pasada ocupa un proceso del pool de render con sus hilos (gobernador.perfil_render()),
+        así no se suma a los renders de escenas que ya reparten los núcleos.
+
+        Retorna:
+        - list: Por variante, [(archivo_relativo, duracion), ...].
+        """
+        from core.render_pool import ejecutar_ffmpeg_en_pool
+
+        perfil = gobernador.perfil_render()
+        # Los codificadores de las variantes corren a la vez: se reparten los hilos del proceso
+        hilos = max(1, perfil["hilos"] // len(self.variantes))
+        argumentos = ["-threads", str(perfil["hilos"]), "-i", ruta_segmento]
+        listas = []
+        for variante in self.variantes:
+            nombre = self._nombre(variante)
+            ancho, alto = self._resolucion(variante)
+            ruta_lista = os.path.join(self.directorio, nombre, f"e{indice:03d}.csv")
+            listas.append((nombre, ruta_lista))
+            argumentos += [
+                "-map", "0:v", "-map", "0:a",
+                "-vf", f"scale={ancho}:{alto}",
+                "-c:v", "libx264", "-preset", perfil["preset"], "-tune", "stillimage", "-pix_fmt", "yuv420p",
+                "-threads", str(hilos),
+                "-b:v", variante["video"], "-maxrate", variante["video"],
+                "-bufsize", f"{2 * _bits(variante['video'])}",
+                "-force_key_frames", f"expr:gte(t,n_forced*{self.duracion_segmento})",
+                "-c:a", "aac", "-b:a", variante["audio"], "-ac", "2",
+                "-f", "segment", "-segment_time", str(self.duracion_segmento),
+                "-segment_format", "mpegts",
+                "-segment_list", ruta_lista, "-segment_list_type", "csv",
+                os.path.join(self.directorio, nombre, f"e{indice:03d}_%03d.ts"),
+            ]
+        ejecutar_ffmpeg_en_pool(argumentos, plazo=plazo, timeout=300)
+        return [[(f"{nombre}/{archivo}", duracion) for archivo, duracion in leer_lista_segmentos(ruta_lista)]
+                for nombre, ruta_lista in listas]
+
+    def _resolucion(self, variante: dict) -> tuple:
+        alto = min(int(variante["alto"]), self.alto)
+        # libx264 con yuv420p exige dimensiones pares
+        ancho = int(round(self.ancho * alto / self.alto / 2)) * 2
+        return ancho, alto - alto % 2
+
+    @staticmethod
+    def _nombre(variante: dict) -> str:
+        return f"{int(variante['alto'])}p"
+
+
+def leer_lista_segmentos(ruta_lista: str) -> list:
+    """
+    Lee la lista CSV del muxer segment de ffmpeg ("archivo,inicio,fin" por línea).
+
+    Retorna:
+    - list: [(archivo, duracion_s), ...].
+    """
+    trozos = []
+    with open(ruta_lista, encoding="utf-8") as f:
+        for fila in f:
+            partes = fila.strip().rsplit(",", 2)
+            if len(partes) == 3:
+                trozos.append((partes[0], float(partes[2]) - float(partes[1])))
+    return trozos
+
+
+def _bits(tasa: str) -> int:
+    """
+    "2000k" → 2000000, "1.5M" → 1500000.
+    """
+    tasa = str(tasa).strip().lower()
+    multiplicador = {"k": 1000, "m": 1000000}.get(tasa[-1:], 1)
+    return int(float(tasa.rstrip("km")) * multiplicador)
@@ -0,0 +1,342 @@
+# core/job_queue.py
+# Cola persistente de trabajos de generación respaldada por la tabla 'story_jobs'.
+# Los trabajadores reclaman trabajos con una actualización condicional (compare-and-swap),
+# lo que funciona igual en SQLite y en Postgres sin bloqueos explícitos.
+# Cada reclamo concede un lease que el trabajador renueva con latidos; si el trabajador
+# desaparece (caída del proceso o del host), el lease vence y el trabajo vuelve a la cola.
+#
+# Planificación: primero el nivel de prioridad más alto; dentro del nivel, reparto justo
+# ponderado entre cuentas adultas (se elige la cuenta con menos trabajos iniciados en la
+# ventana FAIR_SHARE_WINDOW en proporción a su peso) y, dentro de la cuenta, el más antiguo.
+
+import json
+from datetime import datetime, timedelta
+from sqlalchemy import func
+from config.database import SessionLocal
+from config.settings import settings
+from models.models import Story, StoryJob
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+def encolar_trabajo(story_id: str, datos: dict, owner: str = None, session_factory=SessionLocal) -> str:
+    """
+    Registra un nuevo trabajo de generación en estado 'queued'.
+
+    Parámetros:
+    - story_id (str): Historia a generar.
+    - datos (dict): Datos enviados desde el wizard.
+    - owner (str): Cuenta adulta que lo solicita (para el reparto justo).
+
+    Retorna:
+    - str: ID del trabajo creado.
+    """
+    db = session_factory()
+    try:
+        trabajo = StoryJob(
+            story_id=story_id,
+            payload=json.dumps(datos, ensure_ascii=False),
+            status="queued",
+            owner=owner,
+            priority=int(settings.ACCOUNT_PRIORITIES.get(owner, 0)) if owner else 0,
+        )
+        db.add(trabajo)
+        db.commit()
+        logger.info(f"📥 Trabajo {trabajo.id} encolado para la historia {story_id}")
+        return trabajo.id
+    finally:
+        db.close()
+
+
+def _elegir_candidato(db):
+    """
+    Elige el siguiente trabajo según prioridad y reparto justo entre cuentas.
+    """
+    while True:
+        nivel = db.query(func.max(StoryJob.priority)).filter(StoryJob.status == "queued").scalar()
+        if nivel is None:
+            return None
+
+        # Cuentas con trabajos esperando en el nivel más alto, con su trabajo más antiguo
+        cuentas = (
+            db.query(StoryJob.owner, func.min(StoryJob.created_at))
+            .filter(StoryJob.status == "queued", StoryJob.priority == nivel)
+            .group_by(StoryJob.owner)
+            .all()
+        )
+        # Otro trabajador pudo vaciar el nivel entre ambas consultas
+        if cuentas:
+            break
+
+    # Servicio reciente de cada cuenta: trabajos iniciados dentro de la ventana
+    desde = datetime.utcnow() - timedelta(seconds=settings.FAIR_SHARE_WINDOW)
+    servicio = dict(
+        db.query(StoryJob.owner, func.count(StoryJob.id))
+        .filter(StoryJob.started_at >= desde)
+        .group_by(StoryJob.owner)
+        .all()
+    )
+
+    def turno(cuenta):
+        owner, mas_antiguo = cuenta
+        peso = float(settings.ACCOUNT_WEIGHTS.get(owner, 1)) if owner else 1.0
+        return (servicio.get(owner, 0) / max(peso, 0.001), mas_antiguo)
+
+    owner = min(cuentas, key=turno)[0]
+    return (
+        db.query(StoryJob.id, StoryJob.story_id, StoryJob.payload)
+        .filter(StoryJob.status == "queued", StoryJob.priority == nivel, StoryJob.owner == owner)
+        .order_by(StoryJob.created_at)
+        .first()
+    )
+
+
+def reclamar_trabajo(worker_id: str, session_factory=SessionLocal):
+    """
+    Reclama de forma atómica el siguiente trabajo (por prioridad y reparto justo
+    entre cuentas) y le asigna un lease de JOB_LEASE_SECONDS.
+
+    Retorna:
+    - dict | None: {"id", "story_id", "datos"} del trabajo reclamado, o None si la cola está vacía.
+    """
+    db = session_factory()
+    try:
+        while True:
+            candidato = _elegir_candidato(db)
+            if candidato is None:
+                return None
+
+            # Solo gana quien consiga cambiar el estado mientras sigue en 'queued'
+            ahora = datetime.utcnow()
+            actualizados = (
+                db.query(StoryJob)
+                .filter(StoryJob.id == candidato.id, StoryJob.status == "queued")
+                .update({
+                    StoryJob.status: "running",
+                    StoryJob.worker_id: worker_id,
+                    StoryJob.started_at: ahora,
+                    StoryJob.heartbeat_at: ahora,
+                    StoryJob.lease_expires_at: ahora + timedelta(seconds=settings.JOB_LEASE_SECONDS),
+                    StoryJob.attempts: StoryJob.attempts + 1,
+                }, synchronize_session=False)
+            )
+            db.commit()
+
+            if actualizados == 1:
+                return {
+                    "id": candidato.id,
+                    "story_id": candidato.story_id,
+                    "datos": json.loads(candidato.payload),
+                }
+            # Otro trabajador se adelantó: probamos con el siguiente
+    finally:
+        db.close()
+
+
+def renovar_lease(job_id: str, worker_id: str, session_factory=SessionLocal) -> bool:
+    """
+    Latido del trabajador: extiende el lease de un trabajo que sigue en curso.
+
+    Retorna:
+    - bool: False si el trabajo ya no pertenece a este trabajador (lease perdido).
+    """
+    db = session_factory()
+    try:
+        ahora = datetime.utcnow()
+        actualizados = (
+            db.query(StoryJob)
+            .filter(StoryJob.id == job_id, StoryJob.worker_id == worker_id, StoryJob.status == "running")
+            .update({
+                StoryJob.heartbeat_at: ahora,
+                StoryJob.lease_expires_at: ahora + timedelta(seconds=settings.JOB_LEASE_SECONDS),
+            }, synchronize_session=False)
+        )
+        db.commit()
+        return actualizados == 1
+    finally:
+        db.close()
+
+
+def finalizar_trabajo(job_id: str, exito: bool, error: str = None, worker_id: str = None,
+                      cancelado: bool = False, session_factory=SessionLocal) -> bool:
+    """
+    Marca un trabajo como terminado ('done'), fallido ('failed') o cancelado ('cancelled').
+    Si se indica worker_id, solo se actualiza mientras el trabajo siga siendo suyo,
+    para que un trabajador con el lease vencido no pise al que lo reclamó después.
+
+    Retorna:
+    - bool: True si el estado se registró.
+    """
+    db = session_factory()
+    try:
+        consulta = db.query(StoryJob).filter(StoryJob.id == job_id)
+        if worker_id is not None:
+            consulta = consulta.filter(StoryJob.worker_id == worker_id, StoryJob.status == "running")
+        actualizados = consulta.update({
+            StoryJob.status: "cancelled" if cancelado else ("done" if exito else "failed"),
+            StoryJob.error_message: error,
+            StoryJob.finished_at: datetime.utcnow(),
+            StoryJob.lease_expires_at: None,
+        }, synchronize_session=False)
+        db.commit()
+        return actualizados == 1
+    finally:
+        db.close()
+
+
+def reencolar_expirados(session_factory=SessionLocal) -> int:
+    """
+    Devuelve a la cola los trabajos en 'running' cuyo lease ha vencido
+    (su trabajador dejó de enviar latidos). Puede llamarlo cualquier nodo.
+    Los que ya agotaron JOB_MAX_ATTEMPTS se marcan como fallidos junto con su historia.
+
+    Retorna:
+    - int: Número de trabajos devueltos a la cola.
+    """
+    db = session_factory()
+    try:
+        ahora = datetime.utcnow()
+        expirados = (
+            db.query(StoryJob)
+            .filter(StoryJob.status == "running", StoryJob.lease_expires_at < ahora)
+            .all()
+        )
+        recuperados = 0
+        for trabajo in expirados:
+            # Compare-and-swap sobre el lease observado: si el trabajador renovó entretanto, no se toca
+            condicion = (
+                db.query(StoryJob)
+                .filter(StoryJob.id == trabajo.id, StoryJob.status == "running",
+                        StoryJob.lease_expires_at == trabajo.lease_expires_at)
+            )
+            if trabajo.cancel_requested:
+                # Se canceló mientras su trabajador estaba caído: no se vuelve a encolar
+                condicion.update({
+                    StoryJob.status: "cancelled",
+                    StoryJob.finished_at: ahora,
+                    StoryJob.lease_expires_at: None,
+                }, synchronize_session=False)
+            elif (trabajo.attempts or 0) >= settings.JOB_MAX_ATTEMPTS:
+                error = "Intentos agotados: el trabajador dejó de responder"
+                if condicion.update({
+                    StoryJob.status: "failed",
+                    StoryJob.error_message: error,
+                    StoryJob.finished_at: ahora,
+                    StoryJob.lease_expires_at: None,
+                }, synchronize_session=False) == 1:
+                    db.query(Story).filter(Story.id == trabajo.story_id).update({
+                        Story.status: "failed",
+                        Story.error_message: error,
+                    }, synchronize_session=False)
+            elif condicion.update({
+                StoryJob.status: "queued",
+                StoryJob.worker_id: None,
+                StoryJob.lease_expires_at: None,
+            }, synchronize_session=False) == 1:
+                recuperados += 1
+        db.commit()
+        if expirados:
+            logger.info(f"♻️ {recuperados} trabajo(s) con lease vencido devueltos a la cola")
+        return recuperados
+    finally:
+        db.close()
+
+
+def cancelar_trabajos(story_id: str, session_factory=SessionLocal) -> dict:
+    """
+    Cancela los trabajos pendientes de una historia. Los que esperan en cola se
+    cancelan al momento; a los que están en curso se les marca la petición y su
+    trabajador los detiene en el siguiente latido.
+
+    Retorna:
+    - dict: {"en_cola": int, "en_curso": int} trabajos afectados.
+    """
+    db = session_factory()
+    try:
+        ahora = datetime.utcnow()
+        en_cola = (
+            db.query(StoryJob)
+            .filter(StoryJob.story_id == story_id, StoryJob.status == "queued")
+            .update({
+                StoryJob.status: "cancelled",
+                StoryJob.finished_at: ahora,
+            }, synchronize_session=False)
+        )
+        en_curso = (
+            db.query(StoryJob)
+            .filter(StoryJob.story_id == story_id, StoryJob.status == "running")
+            .update({StoryJob.cancel_requested: True}, synchronize_session=False)
+        )
+        db.commit()
+        logger.info(f"🛑 Historia {story_id} cancelada ({en_cola} en cola, {en_curso} en curso)")
+        return {"en_cola": en_cola, "en_curso": en_curso}
+    finally:
+        db.close()
+
+
+def cancelacion_solicitada(job_id: str, session_factory=SessionLocal) -> bool:
+    """
+    Indica si el usuario pidió cancelar el trabajo (lo consulta el latido del trabajador).
+    """
+    db = session_factory()
+    try:
+        marcado = db.query(StoryJob.cancel_requested).filter(StoryJob.id == job_id).scalar()
+        return bool(marcado)
+    finally:
+        db.close()
+
+
+def datos_ultimo_trabajo(story_id: str, session_factory=SessionLocal):
+    """
+    Datos del wizard con los que se encoló la historia por última vez (para reintentos).
+
+    Retorna:
+    - dict | None: Datos del trabajo más reciente, o None si la historia nunca se encoló.
+    """
+    db = session_factory()
+    try:
+        trabajo = (
+            db.query(StoryJob.payload)
+            .filter(StoryJob.story_id == story_id)
+            .order_by(StoryJob.created_at.desc())
+            .first()
+        )
+        return json.loads(trabajo.payload) if trabajo else None
+    finally:
+        db.close()
+
+
+def profundidad_cola(session_factory=SessionLocal) -> int:
+    """
+    Número de trabajos esperando un trabajador libre.
+    """
+    db = session_factory()
+    try:
+        return db.query(StoryJob).filter(StoryJob.status == "queued").count()
+    finally:
+        db.close()
+
+
+def profundidad_por_cuenta(session_factory=SessionLocal) -> dict:
+    """
+    Trabajos en cola y en curso por cuenta adulta.
+
+    Retorna:
+    - dict: {owner: {"en_cola": int, "en_curso": int}}
+    """
+    db = session_factory()
+    try:
+        filas = (
+            db.query(StoryJob.owner, StoryJob.status, func.count(StoryJob.id))
+            .filter(StoryJob.status.in_(["queued", "running"]))
+            .group_by(StoryJob.owner, StoryJob.status)
+            .all()
+        )
+        profundidad = {}
+        for owner, estado, total in filas:
+            cuenta = profundidad.setdefault(owner, {"en_cola": 0, "en_curso": 0})
+            cuenta["en_cola" if estado == "queued" else "en_curso"] = total
+        return profundidad
+    finally:
+        db.close()
@@ -0,0 +1,151 @@
+# core/manifest.py
+# Manifiesto de artefactos por historia: qué escenas tiene el cuento y qué recursos
+# (imagen, audio, subtítulo, clip) ya se generaron para cada una.
+# Permite reanudar una historia fallida rehaciendo solo las etapas que faltan,
+# sin volver a pagar las llamadas de imagen y voz que ya terminaron bien.
+
+import hashlib
+import json
+import os
+import threading
+from config.database import SessionLocal
+from models.models import StoryManifest
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Etapas de una escena cuyo artefacto se guarda en disco
+# (la vista previa solo la tiene la primera escena)
+ETAPAS_ESCENA = ("imagen", "audio", "subtitulo", "clip", "vista_previa")
+
+
+def hash_texto(texto: str) -> str:
+    """
+    Huella del texto de una escena; si cambia, sus artefactos dejan de valer.
+    """
+    return hashlib.sha256(texto.strip().encode("utf-8")).hexdigest()
+
+
+class ManifiestoHistoria:
+    """
+    Estado persistente de la generación de una historia.
+
+    Estructura del contenido:
+    {
+        "texto_completo": bool,             # el cuento terminó de generarse
+        "escenas": {
+            "0": {"texto": str, "texto_hash": str, "imagen": ruta, "audio": ruta,
+                  "subtitulo": ruta, "clip": ruta, "vista_previa": ruta,
+                  "estado": "pending|completed|failed"},
+            ...
+        },
+        "video": ruta                       # video final, si existe
+    }
+    """
+
+    def __init__(self, story_id: str, contenido: dict = None, session_factory=SessionLocal):
+        self.story_id = story_id
+        self.contenido = contenido or {"texto_completo": False, "escenas": {}, "video": None}
+        self.session_factory = session_factory
+        self._lock = threading.Lock()
+
+    @classmethod
+    def cargar(cls, story_id: str, session_factory=SessionLocal) -> "ManifiestoHistoria":
+        """
+        Lee el manifiesto de una historia (vacío si aún no existe).
+        """
+        db = session_factory()
+        try:
+            fila = db.query(StoryManifest).filter_by(story_id=story_id).first()
+            contenido = json.loads(fila.contenido) if fila and fila.contenido else None
+            return cls(story_id, contenido, session_factory)
+        finally:
+            db.close()
+
+    def guardar(self) -> None:
+        """
+        Persiste el manifiesto en la base de datos.
+        """
+        with self._lock:
+            serializado = json.dumps(self.contenido, ensure_ascii=False)
+        db = self.session_factory()
+        try:
+            fila = db.query(StoryManifest).filter_by(story_id=self.story_id).first()
+            if fila is None:
+                db.add(StoryManifest(story_id=self.story_id, contenido=serializado))
+            else:
+                fila.contenido = serializado
+            db.commit()
+        finally:
+            db.close()
+
+    # ── Escenas ────────────────────────────────────────────────────────
+
+    def textos_escenas(self) -> list:
+        """
+        Textos de las escenas guardadas, en orden. Solo son reutilizables si texto_completo es True.
+        """
+        escenas = self.contenido["escenas"]
+        return [escenas[clave]["texto"] for clave in sorted(escenas, key=int)]
+
+    def registrar_escena(self, indice: int, texto: str) -> dict:
+        """
+        Da de alta (o valida) la escena `indice`. Si su texto cambió respecto a un intento
+        anterior, se descartan sus artefactos.
+        """
+        huella = hash_texto(texto)
+        with self._lock:
+            escena = self.contenido["escenas"].get(str(indice))
+            if escena is None or escena.get("texto_hash") != huella:
+                escena = {"texto": texto, "texto_hash": huella, "estado": "pending"}
+                escena.update({etapa: None for etapa in ETAPAS_ESCENA})
+                self.contenido["escenas"][str(indice)] = escena
+        self.guardar()
+        return escena
+
+    def marcar_texto_completo(self, total_escenas: int) -> None:
+        with self._lock:
+            self.contenido["texto_completo"] = True
+            # Escenas sobrantes de un intento anterior más largo
+            for clave in [c for c in self.contenido["escenas"] if int(c) >= total_escenas]:
+                del self.contenido["escenas"][clave]
+        self.guardar()
+
+    def artefacto(self, indice: int, etapa: str):
+        """
+        Ruta del artefacto de una etapa si ya se generó y sigue existiendo en disco; si no, None.
+        """
+        with self._lock:
+            ruta = self.contenido["escenas"].get(str(indice), {}).get(etapa)
+        return ruta if ruta and os.path.exists(ruta) else None
+
+    def registrar_artefacto(self, indice: int, etapa: str, ruta: str) -> None:
+        if not ruta:
+            return
+        with self._lock:
+            self.contenido["escenas"][str(indice)][etapa] = ruta
+        self.guardar()
+
+    def marcar_estado(self, indice: int, estado: str) -> None:
+        with self._lock:
+            self.contenido["escenas"][str(indice)]["estado"] = estado
+        self.guardar()
+
+    def registrar_video(self, ruta: str) -> None:
+        with self._lock:
+            self.contenido["video"] = ruta
+        self.guardar()
+
+    def etapa(self, indice: int, etapa: str, generar) -> str:
+        """
+        Devuelve el artefacto de la etapa si ya existe; si no, lo genera con `generar()`
+        y lo registra. `generar` debe devolver la ruta creada ("" si falla).
+        """
+        existente = self.artefacto(indice, etapa)
+        if existente:
+            logger.info(f"♻️ Reutilizando {etapa} de la escena {indice}: {existente}")
+            return existente
+        ruta = generar()
+        if ruta and os.path.exists(ruta):
+            self.registrar_artefacto(indice, etapa, ruta)
+        return ruta
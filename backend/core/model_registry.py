@@ -0,0 +1,145 @@
+# core/model_registry.py
+# Registro de modelos y clientes pesados compartidos por todo el proceso trabajador.
+# Whisper y los clientes de OpenAI/ElevenLabs se cargan una sola vez (al arrancar el
+# trabajador o en el primer uso) y se reutilizan en todas las historias y escenas.
+
+import threading
+import time
+from contextlib import contextmanager
+from config.settings import settings, gobernador
+from core.deadline import PlazoAgotado
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class RegistroModelos:
+    """
+    Carga perezosa y única de recursos costosos, segura entre hilos.
+
+    Estados por recurso: "cold" (sin cargar), "loading", "warm" (listo) o "error".
+    """
+
+    def __init__(self):
+        self._cargadores = {}
+        self._instancias = {}
+        self._estado = {}
+        self._tiempos_carga = {}
+        self._locks_carga = {}
+        self._locks_uso = {}
+        self._lock = threading.Lock()
+
+    def registrar(self, nombre: str, cargador) -> None:
+        """
+        Declara un recurso y la función que lo construye.
+        """
+        with self._lock:
+            self._cargadores[nombre] = cargador
+            self._estado.setdefault(nombre, "cold")
+            self._locks_carga.setdefault(nombre, threading.Lock())
+            self._locks_uso.setdefault(nombre, threading.Lock())
+
+    def obtener(self, nombre: str):
+        """
+        Devuelve la instancia compartida del recurso, cargándola si aún no existe.
+        """
+        if nombre in self._instancias:
+            return self._instancias[nombre]
+        if nombre not in self._cargadores:
+            raise KeyError(f"Recurso no registrado: {nombre}")
+
+        with self._locks_carga[nombre]:
+            # Otro hilo pudo cargarlo mientras esperábamos el lock
+            if nombre in self._instancias:
+                return self._instancias[nombre]
+
+            self._estado[nombre] = "loading"
+            logger.info(f"🧠 Cargando recurso compartido '{nombre}'...")
+            inicio = time.monotonic()
+            try:
+                instancia = self._cargadores[nombre]()
+            except Exception:
+                self._estado[nombre] = "error"
+                raise
+            self._tiempos_carga[nombre] = time.monotonic() - inicio
+            self._instancias[nombre] = instancia
+            self._estado[nombre] = "warm"
+            logger.info(f"✅ Recurso '{nombre}' listo en {self._tiempos_carga[nombre]:.1f}s")
+            return instancia
+
+    @contextmanager
+    def en_uso(self, nombre: str, espera_max: float = None):
+        """
+        Uso exclusivo de un recurso que no admite llamadas concurrentes (p. ej. Whisper).
+
+        Parámetros:
+        - espera_max (float): Segundos máximos esperando turno; si se superan, lanza PlazoAgotado.
+        """
+        instancia = self.obtener(nombre)
+        lock = self._locks_uso[nombre]
+        if not lock.acquire(timeout=-1 if espera_max is None else espera_max):
+            raise PlazoAgotado(f"'{nombre}' sigue ocupado y no queda plazo para esperarlo")
+        try:
+            yield instancia
+        finally:
+            lock.release()
+
+    def precargar(self, nombres=None) -> None:
+        """
+        Calienta los recursos indicados (por defecto, los de settings.PRELOAD_MODELS).
+        Un fallo no impide arrancar: el recurso se reintentará en su primer uso.
+        """
+        if nombres is None:
+            nombres = [n.strip() for n in settings.PRELOAD_MODELS.split(",") if n.strip()]
+        for nombre in nombres:
+            try:
+                self.obtener(nombre)
+            except Exception as e:
+                logger.error(f"❌ No se pudo precargar '{nombre}': {e}")
+
+    def estado(self) -> dict:
+        """
+        Estado de cada recurso registrado y su tiempo de carga (si está caliente).
+        """
+        return {
+            nombre: {"estado": self._estado[nombre], "carga_segundos": self._tiempos_carga.get(nombre)}
+            for nombre in self._cargadores
+        }
+
+
+def _cargar_whisper():
+    tamano = settings.WHISPER_MODEL_SIZE or "base"
+    if settings.WHISPER_ENGINE == "faster-whisper":
+        # Pesos cuantizados (int8 por defecto) en CTranslate2: más rápido y ligero en CPU
+        try:
+            from faster_whisper import WhisperModel
+        except ImportError as e:
+            raise ImportError(
+                "WHISPER_ENGINE=faster-whisper requiere el paquete opcional: "
+                "pip install -r requirements-faster-whisper.txt"
+            ) from e
+        return WhisperModel(tamano, device="cpu", compute_type=settings.WHISPER_COMPUTE_TYPE,
+                            cpu_threads=gobernador.hilos_torch())
+    if settings.WHISPER_ENGINE != "openai-whisper":
+        raise ValueError(f"Motor de Whisper no soportado: {settings.WHISPER_ENGINE}")
+    # torch usaría todos los núcleos por defecto y competiría con los procesos de render
+    gobernador.aplicar_torch()
+    import whisper
+    return whisper.load_model(tamano)
+
+
+def _cargar_openai():
+    from openai import OpenAI
+    return OpenAI(api_key=settings.OPENAI_API_KEY)
+
+
+def _cargar_elevenlabs():
+    from elevenlabs.client import ElevenLabs
+    return ElevenLabs(api_key=settings.ELEVENLABS_API_KEY)
+
+
+# Instancia compartida
+registro_modelos = RegistroModelos()
+registro_modelos.registrar("whisper", _cargar_whisper)
+registro_modelos.registrar("openai", _cargar_openai)
+registro_modelos.registrar("elevenlabs", _cargar_elevenlabs)
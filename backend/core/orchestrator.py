@@ -1,21 +1,110 @@
 # core/orchestrator.py
 
+import atexit
+import multiprocessing
+import os
+import socket
 import threading
-from tasks.generate_story import generate_story
+import uuid
+from config.settings import settings
+from core.job_queue import encolar_trabajo, reencolar_expirados, datos_ultimo_trabajo, cancelar_trabajos
+from tasks.worker import ejecutar_trabajador
+from utils.logger import get_logger
 
-def start_story_generation(story_id, data):
+logger = get_logger(__name__)
+
+# Pool fijo de procesos trabajadores (se arranca la primera vez que se necesita)
+_procesos = []
+_evento_parada = None
+_lock_pool = threading.Lock()
+
+
+def iniciar_pool(num_trabajadores: int = None) -> None:
+    """
+    Arranca (o completa) el pool fijo de procesos trabajadores.
+    Los trabajos pendientes esperan en la cola hasta que haya un trabajador libre,
+    por lo que nunca hay más historias en curso que procesos en el pool.
+    """
+    global _evento_parada
+
+    num_trabajadores = num_trabajadores or settings.STORY_WORKERS
+    contexto = multiprocessing.get_context("spawn")
+
+    with _lock_pool:
+        if _evento_parada is None:
+            # Primer arranque en este proceso: recuperar trabajos cuyo trabajador murió
+            reencolar_expirados()
+            _evento_parada = contexto.Event()
+            atexit.unregister(detener_pool)
+            atexit.register(detener_pool)
+
+        _procesos[:] = [p for p in _procesos if p.is_alive()]
+        for i in range(len(_procesos), num_trabajadores):
+            worker_id = f"{socket.gethostname()}-{os.getpid()}-{i}-{uuid.uuid4().hex[:6]}"
+            proceso = contexto.Process(
+                target=ejecutar_trabajador,
+                args=(worker_id, _evento_parada),
+                name=f"cuentix-worker-{i}",
+            )
+            proceso.start()
+            _procesos.append(proceso)
+            logger.info(f"👷 Trabajador {worker_id} lanzado (pid {proceso.pid})")
+
+
+def detener_pool(timeout: float = 10.0) -> None:
+    """
+    Pide a los trabajadores que terminen y espera a que salgan.
+    """
+    global _evento_parada
+
+    with _lock_pool:
+        if _evento_parada is not None:
+            _evento_parada.set()
+            _evento_parada = None
+        for proceso in _procesos:
+            proceso.join(timeout)
+            if proceso.is_alive():
+                proceso.terminate()
+        _procesos.clear()
+
+
+def start_story_generation(story_id, data, owner=None):
     """
-    Inicia la generación de una historia de manera asíncrona.
-    Lanza un hilo para no bloquear la API.
-    
+    Encola la generación de una historia en la cola persistente.
+    Un trabajador (del pool local o de `python -m tasks.worker` en otro host)
+    la reclamará en cuanto quede libre; mientras tanto la historia permanece en 'pending'.
+
     Args:
         story_id (str): ID único de la historia.
         data (dict): Datos enviados desde el wizard.
+        owner (str): Cuenta adulta que la solicita (reparto justo entre cuentas).
+    """
+    encolar_trabajo(story_id, data, owner=owner)
+    if settings.STORY_WORKERS > 0:
+        iniciar_pool()
+
+
+def retry_story_generation(story_id, owner=None) -> bool:
+    """
+    Vuelve a encolar una historia con los mismos datos del wizard.
+    La generación se reanuda desde su manifiesto, así que solo se rehacen las etapas que faltan.
+
+    Returns:
+        bool: False si no hay datos previos con los que reintentar.
     """
+    datos = datos_ultimo_trabajo(story_id)
+    if datos is None:
+        return False
+    start_story_generation(story_id, datos, owner=owner)
+    return True
 
-    def background_task():
-        generate_story(story_id, data)
 
-    # Lanzamos la tarea en segundo plano usando un hilo
-    thread = threading.Thread(target=background_task)
-    thread.start()
+def cancel_story_generation(story_id) -> dict:
+    """
+    Cancela la generación de una historia: si aún espera en cola no llega a ejecutarse,
+    y si está en curso su trabajador la detiene entre etapas y queda libre para otra.
+
+    Returns:
+        dict: {"en_cola": int, "en_curso": int} trabajos cancelados y trabajos en curso avisados.
+    """
+    return cancelar_trabajos(story_id)
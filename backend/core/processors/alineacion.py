@@ -0,0 +1,150 @@
+# core/processors/alineacion.py
+# Subtítulos por alineación: el texto de la escena ya se conoce (la narración se sintetizó
+# a partir de él), así que no hace falta transcribir. Se decodifica el audio a PCM, se mide
+# la energía por tramas para encontrar los tramos con voz y las pausas, y las líneas del
+# subtítulo se reparten sobre el tiempo con voz según su longitud, ajustando cada corte a la
+# pausa más cercana. Si no se detecta voz, el reparto es proporcional sobre toda la duración.
+# Cuesta milisegundos de procesado de señal en lugar de segundos de inferencia de Whisper.
+# Las muestras salen del RecursoAudio de la escena, que Whisper reutiliza si hay que verificar.
+
+import re
+import numpy as np
+from core.processors.recurso_audio import RecursoAudio, FRECUENCIA_PCM
+
+FRECUENCIA_ANALISIS = FRECUENCIA_PCM
+TRAMA_S = 0.02            # 20 ms por trama de energía
+SILENCIO_MIN_S = 0.15     # pausas más cortas se consideran parte de la voz
+AJUSTE_MAX_S = 0.6        # distancia máxima para llevar un corte a una pausa
+CARACTERES_POR_LINEA = 42
+
+
+def energia_por_tramas(muestras: np.ndarray, frecuencia: int = FRECUENCIA_ANALISIS,
+                       trama_s: float = TRAMA_S) -> np.ndarray:
+    """
+    Energía RMS de cada trama de `trama_s` segundos.
+    """
+    tamano = max(1, int(frecuencia * trama_s))
+    n_tramas = len(muestras) // tamano
+    if n_tramas == 0:
+        return np.zeros(0, dtype=np.float32)
+    tramas = muestras[:n_tramas * tamano].reshape(n_tramas, tamano)
+    return np.sqrt(np.mean(tramas ** 2, axis=1))
+
+
+def detectar_voz(energia: np.ndarray, trama_s: float = TRAMA_S, silencio_min_s: float = SILENCIO_MIN_S) -> list:
+    """
+    Tramos con voz a partir de la energía: umbral adaptativo entre el ruido de fondo y el
+    nivel de la voz; las pausas más cortas que `silencio_min_s` no separan tramos.
+
+    Retorna:
+    - list: [(inicio_s, fin_s), ...] ordenados.
+    """
+    if len(energia) == 0 or float(np.max(energia)) <= 1e-4:
+        return []
+    fondo = float(np.percentile(energia, 10))
+    voz = float(np.percentile(energia, 90))
+    umbral = fondo + 0.15 * (voz - fondo)
+    activas = energia > umbral
+
+    tramos = []
+    inicio = None
+    for i, activa in enumerate(activas):
+        if activa and inicio is None:
+            inicio = i
+        elif not activa and inicio is not None:
+            tramos.append([inicio, i])
+            inicio = None
+    if inicio is not None:
+        tramos.append([inicio, len(activas)])
+
+    # Unir tramos separados por pausas muy cortas (entre palabras)
+    unidos = []
+    for tramo in tramos:
+        if unidos and (tramo[0] - unidos[-1][1]) * trama_s < silencio_min_s:
+            unidos[-1][1] = tramo[1]
+        else:
+            unidos.append(tramo)
+    return [(a * trama_s, b * trama_s) for a, b in unidos]
+
+
+def dividir_en_lineas(texto: str, max_caracteres: int = CARACTERES_POR_LINEA) -> list:
+    """
+    Divide el párrafo en líneas de subtítulo: primero por frases y después por palabras,
+    sin pasar de `max_caracteres`.
+    """
+    lineas = []
+    for frase in re.split(r"(?<=[.!?;:…])\s+", " ".join(texto.split())):
+        actual = ""
+        for palabra in frase.split():
+            if actual and len(actual) + 1 + len(palabra) > max_caracteres:
+                lineas.append(actual)
+                actual = palabra
+            else:
+                actual = f"{actual} {palabra}".strip()
+        if actual:
+            lineas.append(actual)
+    return lineas
+
+
+def alinear_lineas(lineas: list, tramos_voz: list, duracion: float, ajuste_max_s: float = AJUSTE_MAX_S) -> list:
+    """
+    Reparte las líneas sobre el tiempo con voz según su número de caracteres y ajusta
+    cada corte entre líneas a la pausa más cercana.
+
+    Parámetros:
+    - lineas (list): Texto de cada línea, en orden.
+    - tramos_voz (list): [(inicio_s, fin_s), ...] de detectar_voz. Vacío → reparto proporcional.
+    - duracion (float): Duración total del audio.
+
+    Retorna:
+    - list: [(inicio_s, fin_s, texto), ...]
+    """
+    if not lineas or duracion <= 0:
+        return []
+    tramos = tramos_voz or [(0.0, duracion)]
+    total_voz = sum(fin - inicio for inicio, fin in tramos)
+    pesos = np.array([max(len(linea), 1) for linea in lineas], dtype=np.float64)
+    cortes_voz = np.cumsum(pesos) / pesos.sum() * total_voz
+
+    def a_tiempo_real(t_voz: float) -> float:
+        # Posición en el tiempo con voz → instante real (saltando las pausas)
+        acumulado = 0.0
+        for inicio, fin in tramos:
+            if t_voz <= acumulado + (fin - inicio):
+                return inicio + (t_voz - acumulado)
+            acumulado += fin - inicio
+        return tramos[-1][1]
+
+    pausas = [(tramos[i][1], tramos[i + 1][0]) for i in range(len(tramos) - 1)]
+    resultado = []
+    inicio = tramos[0][0]
+    for i, linea in enumerate(lineas):
+        if i == len(lineas) - 1:
+            fin, siguiente = tramos[-1][1], None
+        else:
+            corte = a_tiempo_real(float(cortes_voz[i]))
+            fin, siguiente = corte, corte
+            # Solo pausas posteriores al inicio de la línea (cada pausa se usa una vez)
+            candidatas = [p for p in pausas if p[0] > inicio]
+            cercana = min(candidatas, key=lambda p: abs((p[0] + p[1]) / 2 - corte), default=None)
+            if cercana and abs((cercana[0] + cercana[1]) / 2 - corte) <= ajuste_max_s:
+                fin, siguiente = cercana
+        fin = max(fin, inicio + 0.01)
+        resultado.append((round(inicio, 3), round(min(fin, duracion), 3), linea))
+        if siguiente is not None:
+            inicio = max(siguiente, fin)
+    return resultado
+
+
+def alinear_texto_audio(texto: str, audio, timeout: float = 30) -> list:
+    """
+    Subtítulos de `texto` sincronizados con la narración `audio` (RecursoAudio o ruta).
+
+    Retorna:
+    - list: [(inicio_s, fin_s, texto), ...] para escribir_srt.
+    """
+    recurso = RecursoAudio.de(audio)
+    muestras = recurso.cargar(timeout=timeout)
+    duracion = recurso.duracion
+    tramos = detectar_voz(energia_por_tramas(muestras, recurso.frecuencia))
+    return alinear_lineas(dividir_en_lineas(texto), tramos, duracion)
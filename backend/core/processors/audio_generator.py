@@ -1,10 +1,22 @@
 # core/processors/audio_generator.py
 
 # Módulo que gestiona la generación de audio desde texto, con soporte para múltiples motores (gTTS, OpenAI, ElevenLabs).
+# Si la ruta de salida es .m4a, la narración queda en AAC: OpenAI la entrega ya en AAC (solo se
+# reempaqueta) y el resto se transcodifica una única vez aquí. El render copia esa pista al video
+# tal cual, sin volver a codificar el audio.
+# cargar_recurso entrega la narración como RecursoAudio: se decodifica una sola vez y la
+# comparten la alineación, Whisper y el render.
+# Delante de los motores hay una caché en disco (tts_cache.py): el mismo texto con el mismo
+# motor, voz y modelo no se vuelve a sintetizar.
 
 import os
 from pathlib import Path
 from utils.logger import get_logger
+from config.settings import settings
+from core.deadline import limitar_timeout
+from core.tts_cache import cache_tts, clave_tts
+from core.processors.ffmpeg_utils import ejecutar_ffmpeg, codec_aac
+from core.processors.recurso_audio import RecursoAudio
 
 logger = get_logger(__name__)
 
@@ -15,28 +27,93 @@ class AudioGenerator:
         self.logger = get_logger(__name__)
         self.logger.info(f"🔈 AudioGenerator inicializado con motor: {self.motor}")
 
-    def generate_audio(self, texto: str, nombre_archivo: str) -> str:
+    def generate_audio(self, texto: str, nombre_archivo: str, plazo=None) -> str:
         try:
+            if plazo:
+                plazo.comprobar("generar el audio")
+
             ruta = Path(nombre_archivo)
             ruta.parent.mkdir(parents=True, exist_ok=True)
 
-            if self.motor == "gtts":
-                from gtts import gTTS
-                tts = gTTS(text=texto, lang="es")
-                tts.save(nombre_archivo)
-                return str(nombre_archivo)
-
-            elif self.motor == "openai":
-                from core.apis.openai_tts_api import convertir_texto_a_audio_openai
-                return convertir_texto_a_audio_openai(texto, str(ruta))
-
-            elif self.motor == "elevenlabs":
-                from core.apis.elevenlabs_api import convertir_texto_a_audio_elevenlabs
-                return convertir_texto_a_audio_elevenlabs(texto, os.path.basename(nombre_archivo))
-
-            else:
-                raise ValueError(f"Motor {self.motor} no soportado")
+            voz, modelo = self._voz_y_modelo()
+            clave = clave_tts(self.motor, voz, modelo, ruta.suffix.lower(), texto)
+            return cache_tts.obtener_o_generar(
+                clave, str(ruta), lambda: self._generar(texto, ruta, plazo), plazo=plazo
+            )
 
         except Exception as e:
             self.logger.error(f"❌ Error al generar audio con {self.motor}: {e}")
             return ""
+
+    def _generar(self, texto: str, ruta: Path, plazo=None) -> str:
+        """
+        Sintetiza la narración en `ruta` (sin caché). Con .m4a la deja en AAC.
+        """
+        if ruta.suffix.lower() != ".m4a":
+            return self._sintetizar(texto, ruta, plazo)
+
+        # AAC: se pide directamente al motor si lo admite; si no, MP3 → AAC una sola vez
+        nativo = self.motor == "openai"
+        intermedio = ruta.with_suffix(".aac" if nativo else ".mp3")
+        generado = self._sintetizar(texto, intermedio, plazo, formato="aac" if nativo else "mp3")
+        if not generado:
+            return ""
+        try:
+            convertir_a_m4a(generado, str(ruta), copiar=nativo, plazo=plazo)
+        finally:
+            os.remove(generado)
+        return str(ruta)
+
+    def _voz_y_modelo(self) -> tuple:
+        """
+        Voz y modelo con los que sintetiza el motor (forman parte de la clave de la caché).
+        """
+        if self.motor == "openai":
+            from core.apis.openai_tts_api import VOZ_TTS, MODELO_TTS
+            return VOZ_TTS, MODELO_TTS
+        if self.motor == "elevenlabs":
+            from core.apis.elevenlabs_api import MODELO_ELEVENLABS
+            return settings.ELEVENLABS_VOICE_ID, MODELO_ELEVENLABS
+        return "es", "gtts"
+
+    def cargar_recurso(self, ruta_audio: str):
+        """
+        Narración generada (o reutilizada del manifiesto) como RecursoAudio, o None si no hay audio.
+        """
+        return RecursoAudio(ruta_audio) if ruta_audio else None
+
+    def _sintetizar(self, texto: str, ruta: Path, plazo=None, formato: str = "mp3") -> str:
+        """
+        Llama al motor de voz y guarda su salida en `ruta` (MP3, o AAC si `formato="aac"` y el motor lo admite).
+        """
+        if self.motor == "gtts":
+            from gtts import gTTS
+            tts = gTTS(text=texto, lang="es", timeout=limitar_timeout(plazo, 30))
+            tts.save(str(ruta))
+            return str(ruta)
+
+        elif self.motor == "openai":
+            from core.apis.openai_tts_api import convertir_texto_a_audio_openai
+            return convertir_texto_a_audio_openai(texto, str(ruta), plazo=plazo, formato=formato)
+
+        elif self.motor == "elevenlabs":
+            from core.apis.elevenlabs_api import convertir_texto_a_audio_elevenlabs
+            return convertir_texto_a_audio_elevenlabs(texto, str(ruta), plazo=plazo)
+
+        else:
+            raise ValueError(f"Motor {self.motor} no soportado")
+
+
+def convertir_a_m4a(ruta_origen: str, ruta_destino: str, copiar: bool = False, plazo=None) -> str:
+    """
+    Deja la narración en un .m4a (AAC) listo para copiarse al video.
+
+    Parámetros:
+    - copiar (bool): True si el origen ya es AAC (solo se reempaqueta, sin recodificar).
+    """
+    codec = ["-c:a", "copy"] if copiar else codec_aac()
+    ejecutar_ffmpeg(
+        ["-i", ruta_origen, "-vn", "-map", "0:a"] + codec + ["-movflags", "+faststart", ruta_destino],
+        timeout=limitar_timeout(plazo, 60)
+    )
+    return ruta_destino
@@ -0,0 +1,60 @@
+# core/processors/ffmpeg_utils.py
+# Utilidades de ffmpeg compartidas por las etapas de audio, portadas, HLS y render.
+# No dependen de ningún motor de render: la narración y las portadas las usan sin
+# importar el generador de video.
+
+import os
+import re
+import subprocess
+from config.settings import settings
+
+FRECUENCIA_AUDIO = 44100
+TIMEOUT_DURACION = 30  # s: leer la cabecera es inmediato; más que esto es un ffmpeg colgado
+
+
+def obtener_ffmpeg() -> str:
+    """
+    Ruta del ejecutable de ffmpeg (FFMPEG_BINARY o el que incluye imageio-ffmpeg).
+    """
+    if settings.FFMPEG_BINARY:
+        return settings.FFMPEG_BINARY
+    import imageio_ffmpeg
+    return imageio_ffmpeg.get_ffmpeg_exe()
+
+
+def duracion_medio(ruta: str, timeout: float = TIMEOUT_DURACION) -> float:
+    """
+    Duración en segundos de un archivo de audio o video (leída de la cabecera con ffmpeg).
+    Lanza RuntimeError si no se puede leer o si ffmpeg no responde en `timeout` segundos.
+    """
+    try:
+        resultado = subprocess.run([obtener_ffmpeg(), "-hide_banner", "-i", os.fspath(ruta)],
+                                   capture_output=True, text=True, timeout=timeout)
+    except subprocess.TimeoutExpired:
+        raise RuntimeError(f"ffmpeg no respondió en {timeout}s leyendo la duración de {ruta}")
+    coincidencia = re.search(r"Duration:\s*(\d+):(\d+):(\d+(?:\.\d+)?)", resultado.stderr)
+    if not coincidencia:
+        raise RuntimeError(f"No se pudo leer la duración de {ruta}")
+    horas, minutos, segundos = coincidencia.groups()
+    return int(horas) * 3600 + int(minutos) * 60 + float(segundos)
+
+
+def codec_aac() -> list:
+    """
+    Argumentos de ffmpeg del audio de los videos: AAC 128k estéreo a FRECUENCIA_AUDIO.
+    """
+    return ["-c:a", "aac", "-b:a", "128k", "-ar", str(FRECUENCIA_AUDIO), "-ac", "2"]
+
+
+def ejecutar_ffmpeg(argumentos: list, timeout: float = None) -> None:
+    """
+    Ejecuta ffmpeg (sin banner, sobrescribiendo la salida) y lanza RuntimeError con el final
+    de su salida si falla o si no termina en `timeout` segundos.
+    """
+    comando = [obtener_ffmpeg(), "-hide_banner", "-loglevel", "error", "-y"] + argumentos
+    try:
+        resultado = subprocess.run(comando, capture_output=True, text=True, timeout=timeout)
+    except subprocess.TimeoutExpired:
+        raise RuntimeError(f"ffmpeg no terminó en {timeout}s")
+    if resultado.returncode != 0:
+        raise RuntimeError(f"ffmpeg falló ({resultado.returncode}): {resultado.stderr.strip()[-500:]}")
@@ -0,0 +1,203 @@
+# core/processors/fotogramas.py
+# Fotogramas pre-renderizados de cada escena: la ilustración escalada a 720p con el subtítulo
+# ya dibujado encima, una sola vez con Pillow. El video de la escena solo repite estos
+# fotogramas fijos, en lugar de componer imagen + TextClip y reescalar en cada fotograma.
+#
+# Modos:
+# - Un único fotograma con el texto completo del párrafo.
+# - Fotogramas temporizados a partir del .srt de la escena (uno por línea de subtítulo).
+# - Sin texto, cuando los subtítulos van como pista aparte (SUBTITLE_MODE="soft").
+#
+# Los fotogramas se guardan en una caché en disco indexada por imagen, texto y estilo.
+# Su tamaño está acotado (FRAME_CACHE_MAX_MB): cada proceso, tras escribir un 10 % del
+# límite, expulsa las entradas usadas hace más tiempo (la fecha de modificación marca el
+# último uso, como en tts_cache.py). Las usadas hace menos de EDAD_MIN_EXPULSION_S no se
+# tocan: un render en curso de otro proceso puede estar leyéndolas.
+
+import hashlib
+import os
+import textwrap
+import threading
+import time
+from PIL import Image, ImageDraw, ImageFont
+from config.settings import settings
+from utils.logger import get_logger
+from utils.subtitulos import leer_srt
+
+logger = get_logger(__name__)
+
+CACHE_DIR = os.path.abspath(os.path.join("assets", "cache", "fotogramas"))
+EDAD_MIN_EXPULSION_S = 600
+
+_fuentes = {}
+_lock_fuentes = threading.Lock()
+
+_bytes_escritos = {}  # directorio → bytes escritos por este proceso desde la última limpieza
+_lock_limpieza = threading.Lock()
+
+
+def _cargar_fuente(tamano: int):
+    """
+    Fuente del subtítulo (SUBTITLE_FONT por nombre o ruta), cargada una vez por proceso.
+    """
+    with _lock_fuentes:
+        if tamano not in _fuentes:
+            nombre = settings.SUBTITLE_FONT
+            candidatos = [nombre] if nombre.lower().endswith((".ttf", ".otf")) else [f"{nombre}.ttf", nombre]
+            for candidato in candidatos:
+                try:
+                    _fuentes[tamano] = ImageFont.truetype(candidato, tamano)
+                    break
+                except OSError:
+                    continue
+            else:
+                logger.warning(f"⚠️ Fuente '{nombre}' no encontrada; se usa la fuente por defecto de Pillow")
+                try:
+                    _fuentes[tamano] = ImageFont.load_default(size=tamano)
+                except TypeError:
+                    # Pillow < 10.1 (requirements fija 9.5): fuente de mapa de bits sin tamaño
+                    _fuentes[tamano] = ImageFont.load_default()
+        return _fuentes[tamano]
+
+
+def limpiar_cache(directorio: str = CACHE_DIR, max_bytes: int = None,
+                  edad_min: float = EDAD_MIN_EXPULSION_S) -> int:
+    """
+    Expulsa los fotogramas usados hace más tiempo hasta que la caché cabe en `max_bytes`,
+    sin tocar los usados en los últimos `edad_min` segundos.
+
+    Retorna:
+    - int: Fotogramas expulsados.
+    """
+    max_bytes = settings.FRAME_CACHE_MAX_MB * 1024 * 1024 if max_bytes is None else max_bytes
+    entradas = []
+    for entrada in os.scandir(directorio):
+        if entrada.is_file() and entrada.name.endswith(".png"):
+            try:
+                estado = entrada.stat()
+            except FileNotFoundError:
+                continue  # Expulsada por otro proceso
+            entradas.append((estado.st_mtime, entrada.path, estado.st_size))
+
+    total = sum(tamano for _, _, tamano in entradas)
+    limite_uso = time.time() - edad_min
+    expulsados = 0
+    for usado, ruta, tamano in sorted(entradas):
+        if total <= max_bytes or usado > limite_uso:
+            break
+        try:
+            os.remove(ruta)
+            expulsados += 1
+        except OSError:
+            pass
+        total -= tamano
+    if expulsados:
+        logger.info(f"🧹 Caché de fotogramas: {expulsados} expulsados, quedan {total / (1024 * 1024):.0f} MB")
+    return expulsados
+
+
+class CompositorFotogramas:
+    """
+    Genera (o reutiliza de la caché) los fotogramas fijos de una escena.
+    """
+
+    def __init__(self, ancho: int, alto: int, tamano_fuente: int = 30, margen: int = 30,
+                 cache_dir: str = CACHE_DIR, max_bytes: int = None):
+        self.ancho = ancho
+        self.alto = alto
+        self.tamano_fuente = tamano_fuente
+        self.margen = margen
+        self.cache_dir = cache_dir
+        self.max_bytes = settings.FRAME_CACHE_MAX_MB * 1024 * 1024 if max_bytes is None else max_bytes
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def fotograma(self, ruta_imagen: str, texto: str) -> str:
+        """
+        Fotograma de la ilustración con `texto` dibujado abajo (sin texto si está vacío).
+
+        Retorna:
+        - str: Ruta del PNG en la caché.
+        """
+        ruta = os.path.join(self.cache_dir, f"{self._clave(ruta_imagen, texto)}.png")
+        if os.path.exists(ruta):
+            try:
+                os.utime(ruta)  # último uso, para la expulsión de todos los procesos
+                return ruta
+            except FileNotFoundError:
+                pass  # Expulsada entre la consulta y el uso: se vuelve a generar
+
+        with Image.open(ruta_imagen) as original:
+            fondo = self._encajar(original.convert("RGB"))
+        if texto.strip():
+            self._dibujar_texto(fondo, texto.strip())
+
+        # Escritura atómica: otro proceso de render puede estar generando la misma entrada
+        temporal = f"{ruta}.{os.getpid()}.{threading.get_ident()}.tmp"
+        fondo.save(temporal, format="PNG")
+        os.replace(temporal, ruta)
+        self._anotar_escritura(os.path.getsize(ruta))
+        return ruta
+
+    def fotogramas_srt(self, ruta_imagen: str, ruta_srt: str) -> list:
+        """
+        Fotogramas temporizados según el .srt: uno por línea de subtítulo y uno sin texto
+        para los huecos entre líneas.
+
+        Retorna:
+        - list: [(ruta_png, duracion_s), ...]. La última entrada dura hasta el final del audio
+          (duración None).
+        """
+        tramos = []
+        cursor = 0.0
+        for inicio, fin, texto in leer_srt(ruta_srt):
+            if inicio > cursor + 0.01:
+                tramos.append((self.fotograma(ruta_imagen, ""), inicio - cursor))
+            tramos.append((self.fotograma(ruta_imagen, texto), max(fin - max(inicio, cursor), 0.01)))
+            cursor = max(cursor, fin)
+        tramos.append((self.fotograma(ruta_imagen, ""), None))
+        return tramos
+
+    def _anotar_escritura(self, tamano: int) -> None:
+        """
+        Suma lo escrito por el proceso y limpia la caché cada 10 % del límite.
+        """
+        with _lock_limpieza:
+            escritos = _bytes_escritos.get(self.cache_dir, 0) + tamano
+            limpiar = escritos >= self.max_bytes // 10
+            _bytes_escritos[self.cache_dir] = 0 if limpiar else escritos
+        if limpiar:
+            limpiar_cache(self.cache_dir, self.max_bytes)
+
+    def _clave(self, ruta_imagen: str, texto: str) -> str:
+        estado = os.stat(ruta_imagen)
+        datos = "|".join([
+            os.path.abspath(ruta_imagen), str(estado.st_size), str(estado.st_mtime_ns),
+            texto.strip(), settings.SUBTITLE_FONT, str(self.tamano_fuente),
+            f"{self.ancho}x{self.alto}", str(self.margen),
+        ])
+        return hashlib.sha256(datos.encode("utf-8")).hexdigest()[:32]
+
+    def _encajar(self, imagen: Image.Image) -> Image.Image:
+        """
+        Escala la imagen al fotograma conservando proporción (con bandas negras si hace falta).
+        """
+        escala = min(self.ancho / imagen.width, self.alto / imagen.height)
+        tamano = (max(1, round(imagen.width * escala)), max(1, round(imagen.height * escala)))
+        lienzo = Image.new("RGB", (self.ancho, self.alto))
+        lienzo.paste(imagen.resize(tamano, Image.Resampling.LANCZOS),
+                     ((self.ancho - tamano[0]) // 2, (self.alto - tamano[1]) // 2))
+        return lienzo
+
+    def _dibujar_texto(self, fondo: Image.Image, texto: str) -> None:
+        dibujo = ImageDraw.Draw(fondo)
+        fuente = _cargar_fuente(self.tamano_fuente)
+
+        # Ancho de línea aproximado según el ancho medio de carácter de la fuente
+        ancho_caracter = max(1.0, dibujo.textlength("abcdefghij", font=fuente) / 10)
+        columnas = max(10, int((self.ancho - 2 * self.margen) / ancho_caracter))
+        parrafo = textwrap.fill(texto, width=columnas)
+
+        caja = dibujo.multiline_textbbox((0, 0), parrafo, font=fuente, align="center")
+        x = (self.ancho - (caja[2] - caja[0])) / 2
+        y = self.alto - (caja[3] - caja[1]) - self.margen
+        dibujo.multiline_text((x, y), parrafo, font=fuente, fill="white", align="center")
@@ -4,7 +4,9 @@ import os
 import requests
 from pathlib import Path
 from config.settings import settings
-from openai import OpenAI
+from core.model_registry import registro_modelos
+from core.rate_limiter import obtener_limitador
+from core.deadline import limitar_timeout, sin_plazo_para_reintentar
 from utils.logger import get_logger
 from tenacity import retry, stop_after_attempt, wait_exponential, retry_if_exception_type
 import openai
@@ -13,15 +15,15 @@ logger = get_logger(__name__)
 
 class ImageGenerator:
     def __init__(self):
-        # Inicializa el cliente de OpenAI con la clave API definida en settings
-        self.client = OpenAI(api_key=settings.OPENAI_API_KEY)
+        # Cliente de OpenAI compartido por todo el proceso (clave API definida en settings)
+        self.client = registro_modelos.obtener("openai")
 
     @retry(
-        stop=stop_after_attempt(3),  # Reintenta hasta 3 veces en caso de error
+        stop=stop_after_attempt(3) | sin_plazo_para_reintentar,  # Hasta 3 veces, si cabe en el plazo
         wait=wait_exponential(multiplier=2, min=5, max=30),  # Espera exponencial
         retry=retry_if_exception_type(openai.APIError)  # Solo reintenta si ocurre un APIError
     )
-    def generate_image(self, texto: str, ruta_salida: str) -> str:
+    def generate_image(self, texto: str, ruta_salida: str, plazo=None) -> str:
         try:
             # Crea el directorio destino si no existe
             ruta = Path(ruta_salida)
@@ -29,21 +31,27 @@ class ImageGenerator:
 
             logger.info("🖼️ Enviando texto a la API de imagen para generar ilustración...")
 
-            # Llamada a la API de OpenAI para generar la imagen
-            response = self.client.images.generate(
-                model="dall-e-3",
-                prompt=texto,
-                n=1,
-                size="1024x1024",
-                timeout=60  # Tiempo de espera extendido para dar margen de respuesta
-            )
+            # Llamada a la API de OpenAI para generar la imagen (respetando la cuota compartida)
+            limitador = obtener_limitador("openai_images")
+            try:
+                with limitador.reservar(plazo=plazo):
+                    response = self.client.images.generate(
+                        model="dall-e-3",
+                        prompt=texto,
+                        n=1,
+                        size="1024x1024",
+                        timeout=limitar_timeout(plazo, 60)  # Hasta 60s, sin pasar del plazo de la historia
+                    )
+            except openai.RateLimitError:
+                limitador.penalizar()
+                raise
 
             # Obtiene la URL de la imagen generada
             image_url = response.data[0].url
             logger.info(f"📅 Descargando imagen desde URL: {image_url}")
 
             # Descarga el contenido binario de la imagen
-            img_data = requests.get(image_url, timeout=30).content
+            img_data = requests.get(image_url, timeout=limitar_timeout(plazo, 30)).content
 
             # Guarda la imagen en disco
             with open(ruta, "wb") as handler:
@@ -0,0 +1,140 @@
+# core/processors/portadas.py
+# Portada, miniaturas y vista previa de una historia, generadas por la vía rápida:
+# en cuanto existe la ilustración de la primera escena se crean la portada (JPEG y WebP)
+# y las miniaturas, y con su narración una vista previa de baja resolución, antes del
+# render completo. Así el historial y el panel tienen algo ligero que mostrar sin
+# descargar el video.
+#
+#   assets/portadas/<story_id>/portada.jpg | portada.webp
+#   assets/portadas/<story_id>/miniatura_320.webp | miniatura_160.webp
+#   assets/portadas/<story_id>/vista_previa.mp4
+
+import os
+from PIL import Image
+from config.settings import settings
+from core.deadline import limitar_timeout
+from core.processors.ffmpeg_utils import ejecutar_ffmpeg
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+PORTADAS_DIR = os.path.abspath(os.path.join("assets", "portadas"))
+TAMANO_PORTADA = 720
+TAMANOS_MINIATURA = (320, 160)
+CALIDAD_JPEG = 85
+CALIDAD_WEBP = 80
+
+
+def directorio_portadas(story_id: str) -> str:
+    return os.path.join(PORTADAS_DIR, str(story_id))
+
+
+def ruta_portada(story_id: str, formato: str = "webp") -> str:
+    return os.path.join(directorio_portadas(story_id), f"portada.{formato}")
+
+
+def ruta_miniatura(story_id: str, tamano: int = TAMANOS_MINIATURA[0]) -> str:
+    return os.path.join(directorio_portadas(story_id), f"miniatura_{tamano}.webp")
+
+
+def ruta_vista_previa(story_id: str) -> str:
+    return os.path.join(directorio_portadas(story_id), "vista_previa.mp4")
+
+
+def _guardar_atomico(imagen: Image.Image, ruta: str, formato: str, **opciones) -> None:
+    # La API puede estar sirviendo la portada mientras un reintento la regenera
+    temporal = f"{ruta}.{os.getpid()}.tmp"
+    imagen.save(temporal, format=formato, **opciones)
+    os.replace(temporal, ruta)
+
+
+class GeneradorPortadas:
+    """
+    Genera los recursos ligeros de una historia a partir de su primera escena.
+    """
+
+    def generar_portada(self, story_id: str, ruta_imagen: str) -> str:
+        """
+        Crea la portada (JPEG y WebP) y las miniaturas WebP desde la ilustración.
+
+        Parámetros:
+        - story_id (str): Historia.
+        - ruta_imagen (str): Ilustración de la primera escena.
+
+        Retorna:
+        - str: Ruta de la portada WebP o "" si falla.
+        """
+        try:
+            os.makedirs(directorio_portadas(story_id), exist_ok=True)
+            with Image.open(ruta_imagen) as original:
+                imagen = original.convert("RGB")
+
+            # Una sola decodificación: cada tamaño se reduce a partir del anterior
+            imagen.thumbnail((TAMANO_PORTADA, TAMANO_PORTADA), Image.Resampling.LANCZOS)
+            _guardar_atomico(imagen, ruta_portada(story_id, "jpg"), "JPEG",
+                             quality=CALIDAD_JPEG, optimize=True, progressive=True)
+            _guardar_atomico(imagen, ruta_portada(story_id, "webp"), "WEBP", quality=CALIDAD_WEBP, method=4)
+            for tamano in sorted(TAMANOS_MINIATURA, reverse=True):
+                imagen.thumbnail((tamano, tamano), Image.Resampling.LANCZOS)
+                _guardar_atomico(imagen, ruta_miniatura(story_id, tamano), "WEBP", quality=CALIDAD_WEBP, method=4)
+
+            logger.info(f"🖼️ Portada y miniaturas de {story_id} generadas")
+            return ruta_portada(story_id, "webp")
+
+        except Exception as e:
+            logger.warning(f"⚠️ No se pudo generar la portada de {story_id}: {e}")
+            return ""
+
+    def generar_vista_previa(self, story_id: str, ruta_imagen: str, ruta_audio: str, plazo=None) -> str:
+        """
+        Render barato de la primera escena (PREVIEW_SIZE px, sin subtítulos, preset ultrafast)
+        a partir de la ilustración y la narración, sin esperar a Whisper ni al render completo.
+
+        Retorna:
+        - str: Ruta de la vista previa o "" si falla.
+        """
+        ruta_salida = ruta_vista_previa(story_id)
+        temporal = f"{ruta_salida}.{os.getpid()}.tmp.mp4"
+        try:
+            if plazo:
+                plazo.comprobar("la vista previa")
+            os.makedirs(directorio_portadas(story_id), exist_ok=True)
+            lado = settings.PREVIEW_SIZE - settings.PREVIEW_SIZE % 2
+
+            ejecutar_ffmpeg([
+                "-loop", "1", "-framerate", "12", "-i", ruta_imagen,
+                "-i", ruta_audio,
+                "-map", "0:v", "-map", "1:a",
+                "-vf", f"scale={lado}:{lado}:force_original_aspect_ratio=decrease,"
+                       f"pad={lado}:{lado}:(ow-iw)/2:(oh-ih)/2,format=yuv420p",
+                "-c:v", "libx264", "-preset", "ultrafast", "-tune", "stillimage", "-crf", "32",
+                "-threads", "1",
+                "-c:a", "aac", "-b:a", "48k", "-ac", "1",
+                "-shortest", "-movflags", "+faststart",
+                temporal,
+            ], timeout=limitar_timeout(plazo, 120))
+            os.replace(temporal, ruta_salida)
+
+            logger.info(f"🎬 Vista previa de {story_id} generada")
+            return ruta_salida
+
+        except Exception as e:
+            logger.warning(f"⚠️ No se pudo generar la vista previa de {story_id}: {e}")
+            return ""
+        finally:
+            if os.path.exists(temporal):
+                os.remove(temporal)
+
+
+def recursos_portada(story_id: str) -> dict:
+    """
+    URLs de la API de los recursos ligeros que ya existen para una historia.
+    """
+    urls = {}
+    if os.path.isfile(ruta_portada(story_id, "webp")):
+        urls["poster_url"] = f"/api/stories/{story_id}/poster"
+    if os.path.isfile(ruta_miniatura(story_id)):
+        urls["thumbnail_url"] = f"/api/stories/{story_id}/thumbnail"
+    if os.path.isfile(ruta_vista_previa(story_id)):
+        urls["preview_url"] = f"/api/stories/{story_id}/preview"
+    return urls
@@ -0,0 +1,124 @@
+# core/processors/recurso_audio.py
+# Narración de una escena decodificada una sola vez.
+# AudioGenerator entrega un RecursoAudio con la ruta del archivo; la primera etapa que necesita
+# las muestras (alineación o Whisper) lo decodifica con ffmpeg a PCM mono float32 a 16 kHz
+# (el formato que esperan Whisper y la detección de voz) y las demás lo reutilizan, igual
+# que la duración. Las narraciones largas quedan en un archivo temporal mapeado en memoria
+# en lugar de ocupar RAM del trabajador.
+#
+# Al pasar al proceso de render solo viajan la ruta y la duración, no las muestras: el render
+# copia la pista AAC del archivo original.
+
+import os
+import tempfile
+import threading
+import weakref
+import numpy as np
+from core.processors.ffmpeg_utils import ejecutar_ffmpeg, duracion_medio
+
+FRECUENCIA_PCM = 16000
+BYTES_MUESTRA = 4                       # float32
+UMBRAL_MEMMAP_BYTES = 16 * 1024 * 1024  # ~4 min a 16 kHz: a partir de aquí, mapeado en memoria
+
+
+def _borrar(ruta: str) -> None:
+    try:
+        os.remove(ruta)
+    except OSError:
+        pass
+
+
+class RecursoAudio:
+    """
+    Narración de una escena: ruta del archivo y, a demanda, sus muestras PCM y su duración.
+
+    Parámetros:
+    - ruta (str): Archivo de audio (.m4a o .mp3).
+    - frecuencia (int): Frecuencia de las muestras decodificadas.
+    """
+
+    def __init__(self, ruta: str, frecuencia: int = FRECUENCIA_PCM):
+        self.ruta = os.path.abspath(os.fspath(ruta))
+        self.frecuencia = frecuencia
+        self._muestras = None
+        self._duracion = None
+        self._ruta_pcm = None
+        self._finalizador = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def de(cls, audio) -> "RecursoAudio":
+        """
+        Acepta un RecursoAudio o una ruta (los llamadores antiguos siguen pasando rutas).
+        """
+        return audio if isinstance(audio, cls) else cls(audio)
+
+    def cargar(self, timeout: float = 60) -> np.ndarray:
+        """
+        Muestras PCM mono float32 en [-1, 1]. Se decodifican la primera vez; las siguientes
+        llamadas (desde cualquier hilo) devuelven el mismo buffer.
+        """
+        with self._lock:
+            if self._muestras is None:
+                self._decodificar(timeout)
+            return self._muestras
+
+    @property
+    def duracion(self) -> float:
+        """
+        Duración en segundos: de las muestras si ya se decodificó; si no, de la cabecera del archivo.
+        """
+        if self._duracion is None:
+            self._duracion = duracion_medio(self.ruta)
+        return self._duracion
+
+    def liberar(self) -> None:
+        """
+        Suelta las muestras y borra el archivo mapeado (la duración se conserva).
+        """
+        with self._lock:
+            self._muestras = None
+            if self._finalizador is not None:
+                self._finalizador()
+                self._finalizador = None
+            self._ruta_pcm = None
+
+    def _decodificar(self, timeout: float) -> None:
+        # ffmpeg escribe el PCM en un archivo: si es grande se mapea tal cual, sin copiarlo a memoria
+        descriptor, ruta_pcm = tempfile.mkstemp(prefix="narracion_", suffix=".f32")
+        os.close(descriptor)
+        try:
+            self._extraer_pcm(ruta_pcm, timeout)
+            if os.path.getsize(ruta_pcm) >= UMBRAL_MEMMAP_BYTES:
+                # Copia al escribir: Whisper puede modificar el buffer sin tocar el archivo
+                self._muestras = np.memmap(ruta_pcm, dtype=np.float32, mode="c")
+                self._ruta_pcm = ruta_pcm
+                self._finalizador = weakref.finalize(self, _borrar, ruta_pcm)
+            else:
+                self._muestras = np.fromfile(ruta_pcm, dtype=np.float32)
+                _borrar(ruta_pcm)
+        except Exception:
+            _borrar(ruta_pcm)
+            raise
+        self._duracion = len(self._muestras) / self.frecuencia
+
+    def _extraer_pcm(self, ruta_pcm: str, timeout: float) -> None:
+        """
+        Decodifica el archivo a PCM mono float32 (f32le) en `ruta_pcm` con ffmpeg.
+        """
+        ejecutar_ffmpeg(["-i", self.ruta, "-f", "f32le", "-ac", "1", "-ar", str(self.frecuencia), ruta_pcm],
+                        timeout=timeout)
+
+    def __getstate__(self) -> dict:
+        # Al proceso de render solo le hacen falta la ruta y la duración
+        return {"ruta": self.ruta, "frecuencia": self.frecuencia, "duracion": self._duracion}
+
+    def __setstate__(self, estado: dict) -> None:
+        self.__init__(estado["ruta"], estado["frecuencia"])
+        self._duracion = estado["duracion"]
+
+    def __fspath__(self) -> str:
+        return self.ruta
+
+    def __str__(self) -> str:
+        return self.ruta
@@ -1,48 +1,118 @@
 # core/processors/subtitles_generator.py
 
-# Este módulo usa Whisper para transcribir archivos de audio y generar subtítulos en formato .srt.
-# Usa el modelo local de Whisper especificado en la variable de entorno WHISPER_MODEL_SIZE.
+# Este módulo genera los subtítulos .srt de cada escena.
+# - SUBTITLE_ENGINE="alineacion": el texto de la escena se alinea con la narración por energía
+#   de la señal (ver alineacion.py), sin transcribir. Es el modo por defecto.
+# - SUBTITLE_ENGINE="whisper": transcripción completa con el modelo local de Whisper
+#   (WHISPER_MODEL_SIZE, motor WHISPER_ENGINE). También se usa si no se conoce el texto de la escena.
+# Con SUBTITLE_VERIFY=true, Whisper verifica la alineación: si lo que se oye no coincide con
+# el texto, se usa su transcripción.
 
+import difflib
 import os
-import whisper
 from utils.logger import get_logger
+from utils.subtitulos import escribir_srt, leer_srt
 from config.settings import settings
+from core.model_registry import registro_modelos
+from core.transcription import servicio_transcripcion
+from core.processors.alineacion import alinear_texto_audio
+from core.processors.recurso_audio import RecursoAudio
+from core.deadline import limitar_timeout
 
 logger = get_logger(__name__)
 
 class SubtitlesGenerator:
     """
-    Clase encargada de convertir audio a subtítulos usando Whisper (modelo local).
+    Clase encargada de convertir audio a subtítulos: por alineación con el texto conocido
+    o transcribiendo con Whisper (modelo local).
     """
 
-    def __init__(self):
+    def __init__(self, motor: str = None):
+        self.motor = (motor or settings.SUBTITLE_ENGINE).lower()
+        if self.motor not in ("alineacion", "whisper"):
+            raise ValueError(f"Motor de subtítulos no soportado: {self.motor}")
         self.model_size = settings.WHISPER_MODEL_SIZE or "base"
-        logger.info(f"🧠 Cargando modelo Whisper ({self.model_size})...")
+        # El modelo se carga (o se reutiliza) en el registro del proceso, compartido entre historias;
+        # el servicio de transcripción lo toma de allí. Con alineación sin verificación no se carga
+        if self.motor == "whisper" or settings.SUBTITLE_VERIFY:
+            try:
+                registro_modelos.obtener("whisper")
+            except Exception as e:
+                logger.error(f"❌ No se pudo cargar el modelo Whisper: {e}")
+                raise
+
+    def generar_subtitulo(self, ruta_audio: str, ruta_salida: str, plazo=None, texto: str = None) -> str:
+        """
+        Genera el .srt de una escena.
+
+        Parámetros:
+        - ruta_audio (RecursoAudio | str): Narración de la escena (decodificada una sola vez).
+        - ruta_salida (str): Archivo .srt.
+        - plazo (Plazo): Presupuesto de tiempo de la historia.
+        - texto (str): Texto narrado; sin él se transcribe con Whisper.
+
+        Retorna:
+        - str: Ruta del .srt o "" si falla.
+        """
+        ruta_audio = RecursoAudio.de(ruta_audio) if ruta_audio else ""
+        if self.motor == "whisper" or not (texto and texto.strip()):
+            return self._transcribir(ruta_audio, ruta_salida, plazo)
+
         try:
-            self.model = whisper.load_model(self.model_size)
+            if not os.path.exists(ruta_audio):
+                raise FileNotFoundError(f"El archivo de audio no existe: {ruta_audio}")
+            if plazo:
+                plazo.comprobar("alinear los subtítulos")
+
+            lineas = alinear_texto_audio(texto, ruta_audio, timeout=limitar_timeout(plazo, 30))
+            if not lineas:
+                raise ValueError("La alineación no produjo ninguna línea")
+
+            if settings.SUBTITLE_VERIFY and not self._verificar(texto, ruta_audio, ruta_salida, plazo):
+                # Lo que se oye no es el texto: manda la transcripción de Whisper (ya escrita)
+                return ruta_salida
+
+            os.makedirs(os.path.dirname(ruta_salida) or ".", exist_ok=True)
+            escribir_srt(lineas, ruta_salida)
+            logger.info(f"✅ Subtítulo alineado en: {ruta_salida}")
+            return ruta_salida
+
         except Exception as e:
-            logger.error(f"❌ No se pudo cargar el modelo Whisper: {e}")
-            raise
+            logger.warning(f"⚠️ Falló la alineación de subtítulos ({e}); se transcribe con Whisper")
+            return self._transcribir(ruta_audio, ruta_salida, plazo)
+
+    def _verificar(self, texto: str, ruta_audio: str, ruta_salida: str, plazo=None) -> bool:
+        """
+        Transcribe con Whisper y compara con el texto. Si no coinciden, deja escrita la
+        transcripción en `ruta_salida` y retorna False.
+        """
+        if not self._transcribir(ruta_audio, ruta_salida, plazo):
+            return True
+        transcrito = " ".join(texto for _, _, texto in leer_srt(ruta_salida))
+        similitud = difflib.SequenceMatcher(None, _normalizar(texto), _normalizar(transcrito)).ratio()
+        if similitud < settings.SUBTITLE_VERIFY_MIN_RATIO:
+            logger.warning(f"⚠️ La narración no coincide con el texto (similitud {similitud:.2f}); se usa Whisper")
+            return False
+        return True
 
-    def generar_subtitulo(self, ruta_audio: str, ruta_salida: str) -> str:
+    def _transcribir(self, ruta_audio: str, ruta_salida: str, plazo=None) -> str:
         """
         Transcribe un archivo de audio a subtítulos en formato SRT.
+        El audio va al servicio de transcripción del proceso, que lo agrupa en lotes con
+        los de otras escenas; con un plazo, solo se espera el resultado mientras quede tiempo.
         """
         try:
             if not os.path.exists(ruta_audio):
                 raise FileNotFoundError(f"El archivo de audio no existe: {ruta_audio}")
-            
-            ruta_audio = os.path.abspath(ruta_audio)
-            logger.info(f"🔊 Transcribiendo archivo '{ruta_audio}' con modelo Whisper '{self.model_size}'...")
-            resultado = self.model.transcribe(ruta_audio, task="transcribe")
+
+            audio = RecursoAudio.de(ruta_audio)
+            logger.info(f"🔊 Transcribiendo archivo '{audio.ruta}' con modelo Whisper '{self.model_size}'...")
+            if plazo:
+                plazo.comprobar("transcribir el audio")
+            segmentos = servicio_transcripcion.transcribir(audio, plazo=plazo)
 
             os.makedirs(os.path.dirname(ruta_salida) or ".", exist_ok=True)
-            with open(ruta_salida, "w", encoding="utf-8") as f:
-                for i, segmento in enumerate(resultado["segments"]):
-                    inicio = self._formatear_tiempo(segmento["start"])
-                    fin = self._formatear_tiempo(segmento["end"])
-                    texto = segmento["text"].strip()
-                    f.write(f"{i+1}\n{inicio} --> {fin}\n{texto}\n\n")
+            escribir_srt([(s["start"], s["end"], s["text"].strip()) for s in segmentos], ruta_salida)
 
             logger.info(f"✅ Subtítulo generado en: {ruta_salida}")
             return ruta_salida
@@ -51,12 +121,6 @@ class SubtitlesGenerator:
             logger.error(f"❌ Error al generar subtítulo: {e}")
             return ""
 
-    def _formatear_tiempo(self, segundos: float) -> str:
-        """
-        Convierte segundos a formato SRT hh:mm:ss,ms
-        """
-        horas = int(segundos // 3600)
-        minutos = int((segundos % 3600) // 60)
-        segundos_rest = int(segundos % 60)
-        milisegundos = int((segundos - int(segundos)) * 1000)
-        return f"{horas:02}:{minutos:02}:{segundos_rest:02},{milisegundos:03}"
+
+def _normalizar(texto: str) -> str:
+    return " ".join("".join(c for c in texto.lower() if c.isalnum() or c.isspace()).split())
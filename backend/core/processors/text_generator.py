@@ -3,23 +3,111 @@
 from config.settings import settings
 from utils.prompts import cargar_plantilla_prompt, formatear_prompt
 from utils.logger import get_logger
-from openai import OpenAI
-from typing import Optional
+from core.model_registry import registro_modelos
+from core.rate_limiter import obtener_limitador, estimar_tokens
+from core.deadline import PlazoAgotado, limitar_timeout, sin_plazo_para_reintentar
+from contextlib import contextmanager
+from typing import Iterator
 from tenacity import retry, stop_after_attempt, wait_exponential, retry_if_exception_type
 import openai
+import re
 
 logger = get_logger(__name__)
 
+# Etiquetas de estructura que el prompt pide al modelo
+MARCADOR_ESCENA = re.compile(r"\[(Intro|Conflicto|Resoluci[oó]n|Moraleja)\]")
+# Resto de la línea de una etiqueta que no es contenido, p. ej. " (20-25s): "
+CABECERA_ESCENA = re.compile(r"\s*(\([^)]*\))?\s*:?\s*")
+
+SISTEMA_CUENTOS = "Eres un experto en cuentos infantiles."
+# Longitud máxima de la respuesta (también es lo que se reserva de cuota para ella)
+MAX_TOKENS_CUENTO = 800
+
+
+class DetectorEscenas:
+    """
+    Detecta escenas completas en un texto que llega por fragmentos (streaming).
+
+    - Mientras no aparezcan etiquetas, cada párrafo (línea) cerrado es una escena.
+    - En cuanto aparece una etiqueta [Intro]/[Conflicto]/[Resolución]/[Moraleja],
+      cada escena es el texto entre una etiqueta y la siguiente (sin la cabecera).
+    """
+
+    def __init__(self):
+        self.buffer = ""
+        self.modo_etiquetas = False
+
+    def alimentar(self, fragmento: str) -> list:
+        """
+        Añade un fragmento de texto y devuelve las escenas que han quedado cerradas.
+        """
+        self.buffer += fragmento
+        escenas = []
+        while True:
+            escena = self._extraer()
+            if escena is None:
+                return escenas
+            if escena:
+                escenas.append(escena)
+
+    def cerrar(self) -> list:
+        """
+        Marca el final del texto y devuelve las escenas que quedaban abiertas.
+        """
+        escenas = self.alimentar("\n")
+        resto = MARCADOR_ESCENA.sub("", self.buffer).strip()
+        self.buffer = ""
+        if resto:
+            escenas.append(resto)
+        return escenas
+
+    def _extraer(self):
+        # Devuelve una escena cerrada, "" si se consumió algo sin escena, o None si hay que esperar más texto
+        marcador = MARCADOR_ESCENA.search(self.buffer)
+        salto = self.buffer.find("\n")
+
+        if not self.modo_etiquetas and salto != -1 and (marcador is None or salto < marcador.start()):
+            linea, self.buffer = self.buffer[:salto], self.buffer[salto + 1:]
+            return linea.strip()
+
+        if marcador is None:
+            return None
+
+        if marcador.start() > 0:
+            escena, self.buffer = self.buffer[:marcador.start()], self.buffer[marcador.start():]
+            return escena.strip()
+
+        # La etiqueta está al inicio: esperar a que termine su línea para descartar la cabecera
+        fin_linea = self.buffer.find("\n", marcador.end())
+        if fin_linea == -1:
+            return None
+        self.modo_etiquetas = True
+        resto_linea = self.buffer[marcador.end():fin_linea]
+        if CABECERA_ESCENA.fullmatch(resto_linea):
+            self.buffer = self.buffer[fin_linea + 1:]
+        else:
+            self.buffer = resto_linea.lstrip(" :") + self.buffer[fin_linea:]
+        return ""
+
+
+def dividir_texto_en_escenas(texto: str) -> list:
+    """
+    Divide un cuento completo en escenas con las mismas reglas que el modo streaming.
+    """
+    detector = DetectorEscenas()
+    return detector.alimentar(texto) + detector.cerrar()
+
+
 class TextGenerator:
     def __init__(self):
-        self.client = OpenAI(api_key=settings.OPENAI_API_KEY)
+        # Cliente de OpenAI compartido por todo el proceso
+        self.client = registro_modelos.obtener("openai")
 
-    @retry(
-        stop=stop_after_attempt(3),
-        wait=wait_exponential(multiplier=1, min=2, max=10),
-        retry=retry_if_exception_type(openai.RateLimitError)
-    )
     def generar_cuento(self, datos_usuario: dict) -> str:
+        """
+        Genera el cuento a partir de los datos del formulario usando la plantilla base.
+        La petición pasa por generate_text (mismos reintentos y cuota del proveedor).
+        """
         campos_requeridos = [
             "nombre", "edad", "personaje_principal", "lugar",
             "villano", "objeto_magico", "tipo_final"
@@ -38,27 +126,103 @@ class TextGenerator:
         prompt_formateado = formatear_prompt(plantilla, datos_usuario)
 
         try:
-            logger.info("🧠 Solicitando historia al modelo de lenguaje...")
-
-            respuesta = self.client.chat.completions.create(
-                model="gpt-4",
-                messages=[
-                    {"role": "system", "content": "Eres un experto en cuentos infantiles."},
-                    {"role": "user", "content": prompt_formateado}
-                ],
-                temperature=0.8,
-                max_tokens=800,
-                timeout=60  # ⏱️ Extiende el tiempo de espera (por defecto suele ser 10s)
-            )
+            return self.generate_text(prompt_formateado)
+        except (openai.RateLimitError, PlazoAgotado) as e:
+            logger.error(f"❌ Error al generar cuento: {e}")
+            return ""
 
+    @retry(
+        stop=stop_after_attempt(3) | sin_plazo_para_reintentar,
+        wait=wait_exponential(multiplier=1, min=2, max=10),
+        retry=retry_if_exception_type(openai.RateLimitError)
+    )
+    def generate_text(self, prompt: str, plazo=None) -> str:
+        """
+        Genera el cuento completo a partir de un prompt ya construido (sin streaming).
+        """
+        try:
+            logger.info("🧠 Solicitando historia al modelo de lenguaje...")
+            respuesta = self._solicitar(prompt, plazo)
             cuento = respuesta.choices[0].message.content.strip()
             logger.info("✅ Cuento generado correctamente.")
             return cuento
 
+        except (openai.RateLimitError, PlazoAgotado):
+            raise
         except Exception as e:
             logger.error(f"❌ Error al generar cuento: {e}")
             return ""
 
+    def generar_escenas_stream(self, prompt: str, plazo=None) -> Iterator[str]:
+        """
+        Pide el cuento en modo streaming y va entregando cada escena en cuanto se cierra,
+        para que el pipeline de imagen/audio empiece antes de que termine el texto.
+
+        Retorna:
+        - Iterator[str]: Escenas en orden de llegada.
+        """
+        logger.info("🧠 Solicitando historia al modelo de lenguaje (streaming)...")
+        detector = DetectorEscenas()
+
+        # La llamada cuenta como "en curso" hasta que termina de llegar el texto
+        with self._cuota_chat(prompt, plazo) as limitador:
+            stream = self._abrir_stream(prompt, limitador, plazo=plazo)
+            for chunk in stream:
+                if not chunk.choices:
+                    continue
+                fragmento = chunk.choices[0].delta.content
+                if fragmento:
+                    yield from detector.alimentar(fragmento)
+
+        yield from detector.cerrar()
+        logger.info("✅ Cuento recibido por completo (streaming).")
+
+    @retry(
+        stop=stop_after_attempt(3) | sin_plazo_para_reintentar,
+        wait=wait_exponential(multiplier=1, min=2, max=10),
+        retry=retry_if_exception_type(openai.RateLimitError)
+    )
+    def _abrir_stream(self, prompt: str, limitador, plazo=None):
+        """
+        Abre el stream del chat. Un 429 al abrirlo se reintenta como en generate_text:
+        todavía no se ha entregado ninguna escena, así que repetir la llamada es seguro.
+        """
+        return self._crear_completion(prompt, limitador, stream=True, plazo=plazo)
+
+    def _solicitar(self, prompt: str, plazo=None):
+        """
+        Llamada al chat de OpenAI respetando la cuota compartida del proveedor.
+        """
+        with self._cuota_chat(prompt, plazo) as limitador:
+            return self._crear_completion(prompt, limitador, plazo=plazo)
+
+    @contextmanager
+    def _cuota_chat(self, prompt: str, plazo=None):
+        """
+        Reserva en el limitador del chat lo que costará la petición (prompt + respuesta máxima).
+        Es el único punto por el que pasan las llamadas con y sin streaming.
+        """
+        limitador = obtener_limitador("openai_chat")
+        with limitador.reservar(tokens=estimar_tokens(SISTEMA_CUENTOS + prompt) + MAX_TOKENS_CUENTO, plazo=plazo):
+            yield limitador
+
+    def _crear_completion(self, prompt: str, limitador, stream: bool = False, plazo=None):
+        try:
+            return self.client.chat.completions.create(
+                model="gpt-4",
+                messages=[
+                    {"role": "system", "content": SISTEMA_CUENTOS},
+                    {"role": "user", "content": prompt}
+                ],
+                temperature=0.8,
+                max_tokens=MAX_TOKENS_CUENTO,
+                timeout=limitar_timeout(plazo, 60),  # ⏱️ Hasta 60s, sin pasar del plazo de la historia
+                stream=stream
+            )
+        except openai.RateLimitError:
+            limitador.penalizar()
+            raise
+
     def dividir_en_escenas(self, cuento: str) -> list:
         import re
         escenas = re.split(r"\[(Intro|Conflicto|Resolucion|Moraleja)\]", cuento)
@@ -1,43 +1,130 @@
 # backend/core/processors/video_generator.py
 # ──────────────────────────────────────────────────────────────────────────────
-# Descripción: Ensambla clips de video usando MoviePy (API v2.x)
-# - Combina imagen, audio y subtítulos por escena
+# Descripción: Ensambla clips de video usando MoviePy (API v2.x) o ffmpeg directo
+# - Combina imagen, audio y subtítulos por escena a partir de fotogramas pre-renderizados
+#   (ilustración a 720p + subtítulo dibujado una sola vez con Pillow, ver fotogramas.py)
+# - Cada escena se codifica a su propio segmento .mp4 y el video final se une sin recodificar
+# - Motor seleccionable con RENDER_BACKEND ("ffmpeg" o "moviepy") para compararlos
+# - Memoria acotada: se materializa una escena a la vez y sus lectores se cierran al codificarla
+#   (MoviePy solo se importa si se usa ese motor)
+# - Narración en AAC (.m4a): la pista de audio se copia al segmento sin recodificar
+# - La narración llega como RecursoAudio (o ruta): su duración ya se conoce y el render no la decodifica
 # - Compatible con Pillow >= 9.2 y MoviePy >= 2.0
 # ──────────────────────────────────────────────────────────────────────────────
 
-# Parche para compatibilidad con Pillow ≥10 (por eliminación de ANTIALIAS)
-from PIL import Image
-if not hasattr(Image, "ANTIALIAS"):
-    Image.ANTIALIAS = Image.Resampling.LANCZOS
-
 import os
-from moviepy import ImageClip, AudioFileClip, TextClip, CompositeVideoClip
-from moviepy.video.fx import resize, margin  # ✅ forma correcta # Importación correcta de efectos
+import tempfile
+from config.settings import settings, gobernador
+from core.processors.ffmpeg_utils import codec_aac, ejecutar_ffmpeg
+from core.processors.fotogramas import CompositorFotogramas
+from core.deadline import limitar_timeout
 from utils.logger import get_logger
 
 logger = get_logger(__name__)
 
+# Parámetros comunes de todos los segmentos: deben coincidir para poder unirlos sin recodificar
+FPS = 24
+ANCHO_VIDEO = 720   # Las ilustraciones de DALL·E son cuadradas (1024x1024 → 720x720)
+ALTO_VIDEO = 720
+ESCALA_TIEMPO = 90000
+TAMANO_FUENTE = 30
+MARGEN_SUBTITULO = 30
+EXTENSIONES_AUDIO_COPIABLE = (".m4a", ".aac")
+
+
+def audio_copiable(ruta_audio) -> bool:
+    """
+    True si la narración ya está en AAC y puede copiarse tal cual al contenedor MP4.
+    """
+    return os.path.splitext(os.fspath(ruta_audio))[1].lower() in EXTENSIONES_AUDIO_COPIABLE
+
+
+def argumentos_audio(ruta_audio: str) -> list:
+    """
+    Códec de audio del segmento: copia si la narración ya es AAC; si no, AAC 128k estéreo.
+    """
+    if audio_copiable(ruta_audio):
+        return ["-c:a", "copy"]
+    return codec_aac()
+
+
+def entrada_concat(ruta: str) -> str:
+    """
+    Línea `file '...'` del demuxer concat de ffmpeg, con la ruta absoluta y las comillas escapadas.
+    """
+    ruta = os.path.abspath(ruta).replace("\\", "/").replace("'", "'\\''")
+    return f"file '{ruta}'"
+
+
+def _cerrar_clip(clip) -> None:
+    """
+    Cierra un clip de MoviePy y su lector de audio: libera la imagen decodificada y el
+    proceso ffmpeg del audio en cuanto la escena está codificada.
+    """
+    if clip is None:
+        return
+    if clip.audio is not None:
+        clip.audio.close()
+    clip.close()
+
+
 class VideoGenerator:
     """
     Clase encargada de combinar imagen, audio y subtítulos en un clip de video.
-    Utiliza MoviePy para crear escenas a partir de ilustraciones generadas,
+    Utiliza MoviePy o ffmpeg para crear escenas a partir de ilustraciones generadas,
     narración en audio y subtítulos sincronizados.
     """
 
-    def create_clip(self, ruta_imagen: str, ruta_audio: str, texto: str) -> CompositeVideoClip:
+    def __init__(self, backend: str = None):
+        # Motor de render de los segmentos ("ffmpeg" o "moviepy")
+        self.backend = (backend or settings.RENDER_BACKEND).lower()
+        if self.backend not in ("ffmpeg", "moviepy"):
+            raise ValueError(f"Motor de render no soportado: {self.backend}")
+        self.compositor = CompositorFotogramas(ANCHO_VIDEO, ALTO_VIDEO, TAMANO_FUENTE, MARGEN_SUBTITULO)
+
+    def fotogramas_escena(self, ruta_imagen: str, texto: str, ruta_subtitulo: str = None) -> list:
+        """
+        Fotogramas fijos de la escena con el subtítulo ya dibujado.
+        Con SUBTITLE_MODE="srt" y un .srt disponible, el texto sigue a la narración línea a línea;
+        con "soft" no se dibuja texto (los subtítulos van como pista mov_text del video final);
+        si no, se muestra el párrafo completo durante toda la escena.
+
+        Retorna:
+        - list: [(ruta_png, duracion_s | None), ...]; None = hasta el final del audio.
+        """
+        if settings.SUBTITLE_MODE == "soft":
+            return [(self.compositor.fotograma(ruta_imagen, ""), None)]
+        if settings.SUBTITLE_MODE == "srt" and ruta_subtitulo and os.path.exists(ruta_subtitulo):
+            tramos = self.compositor.fotogramas_srt(ruta_imagen, ruta_subtitulo)
+            if len(tramos) > 1:
+                return tramos
+        return [(self.compositor.fotograma(ruta_imagen, texto), None)]
+
+    def create_clip(self, ruta_imagen: str, ruta_audio, texto: str, plazo=None,
+                    ruta_subtitulo: str = None, con_audio: bool = True) -> "VideoClip":
         """
         Crea un videoclip a partir de una imagen, un archivo de audio y texto.
 
         Parámetros:
         - ruta_imagen (str): Ruta a la imagen de fondo.
-        - ruta_audio (str): Ruta al archivo de audio narrado.
+        - ruta_audio (RecursoAudio | str): Narración de la escena.
         - texto (str): Texto del párrafo que será mostrado como subtítulo.
+        - plazo (Plazo): Presupuesto de tiempo de la historia; si venció, no se crea el clip.
+        - ruta_subtitulo (str): .srt de la escena para subtítulos temporizados (opcional).
+        - con_audio (bool): False → clip mudo con la duración de la narración, sin abrir un
+          lector de audio (el render añade la pista después).
 
         Retorna:
-        - CompositeVideoClip: Clip de video listo para unirse con otros clips.
+        - VideoClip: Clip de video listo para unirse con otros clips.
         """
+        from moviepy import ImageClip, AudioFileClip, concatenate_videoclips
+        from core.processors.recurso_audio import RecursoAudio
+
+        audio_clip = None
         try:
             logger.info(f"Creando clip de video para: {ruta_imagen}")
+            if plazo:
+                plazo.comprobar("crear el clip")
 
             # Verificar existencia de archivos requeridos
             if not (ruta_imagen and os.path.exists(ruta_imagen)):
@@ -45,36 +132,172 @@ class VideoGenerator:
             if not (ruta_audio and os.path.exists(ruta_audio)):
                 raise FileNotFoundError(f"Audio no encontrado: {ruta_audio}")
 
-            # Crear clip de imagen y aplicar duración + audio
-            imagen_clip = ImageClip(ruta_imagen)
-            audio_clip = AudioFileClip(ruta_audio)
+            # Fotogramas ya compuestos (720p + subtítulo): nada se compone ni reescala por fotograma
+            audio = RecursoAudio.de(ruta_audio)
+            if con_audio:
+                audio_clip = AudioFileClip(audio.ruta)
+                duracion_audio = audio_clip.duration
+            else:
+                duracion_audio = audio.duracion
+            tramos = self.fotogramas_escena(ruta_imagen, texto, ruta_subtitulo)
 
-            imagen_clip = (
-                imagen_clip.with_duration(audio_clip.duration)
-                           .with_audio(audio_clip)
-            )
-            imagen_clip = resize.resize(imagen_clip, height=720)  # Redimensionar a 720p
+            clips = []
+            transcurrido = 0.0
+            for ruta_fotograma, duracion in tramos:
+                if duracion is None:
+                    duracion = max(duracion_audio - transcurrido, 0.01)
+                clips.append(ImageClip(ruta_fotograma).with_duration(duracion))
+                transcurrido += duracion
 
-            # Crear clip de subtítulo
-            subtitulo = TextClip(
-                text=texto,
-                font="DejaVuSans-Bold",  # Asegúrate de tener esta fuente instalada
-                font_size=30,
-                color="white",
-                method="caption",
-                size=(1080, None)
-            ).with_duration(audio_clip.duration) \
-             .with_position(("center", "bottom"))
-            subtitulo = margin.margin(subtitulo, bottom=30)
+            video_clip = clips[0] if len(clips) == 1 else concatenate_videoclips(clips)
+            video_clip = video_clip.with_duration(duracion_audio)
+            return video_clip.with_audio(audio_clip) if audio_clip is not None else video_clip
 
-            # Componer el clip final con imagen + subtítulo
-            video_clip = CompositeVideoClip([imagen_clip, subtitulo])
+        except Exception as e:
+            logger.error(f"Error creando clip de video: {str(e)}")
+            if audio_clip is not None:
+                audio_clip.close()
+            return None
 
-            # Liberar recursos
-            audio_clip.close()
+    def render_segmento(self, ruta_imagen: str, ruta_audio, texto: str, ruta_salida: str, plazo=None,
+                        ruta_subtitulo: str = None) -> str:
+        """
+        Codifica una escena completa (imagen fija + narración + subtítulo) en un archivo .mp4.
 
-            return video_clip
+        Parámetros:
+        - ruta_imagen (str): Ilustración de la escena.
+        - ruta_audio (RecursoAudio | str): Narración de la escena.
+        - texto (str): Texto mostrado como subtítulo.
+        - ruta_salida (str): Archivo .mp4 del segmento.
+        - plazo (Plazo): Presupuesto de tiempo de la historia (timeout del render).
+        - ruta_subtitulo (str): .srt de la escena para subtítulos temporizados (opcional).
+
+        Retorna:
+        - str: Ruta del segmento generado o "" si falla.
+        """
+        try:
+            if plazo:
+                plazo.comprobar("renderizar la escena")
+            os.makedirs(os.path.dirname(ruta_salida) or ".", exist_ok=True)
+
+            if self.backend == "moviepy":
+                # MoviePy solo codifica el video (clip mudo, sin lector de audio): la narración
+                # se añade después, copiada si ya es AAC
+                clip = self.create_clip(ruta_imagen, ruta_audio, texto, plazo=plazo, ruta_subtitulo=ruta_subtitulo,
+                                        con_audio=False)
+                if clip is None:
+                    return ""
+                perfil = gobernador.perfil_render()
+                ruta_video = f"{ruta_salida}.video.mp4"
+                try:
+                    clip.write_videofile(
+                        ruta_video, fps=FPS, codec="libx264", audio=False,
+                        preset=perfil["preset"], threads=perfil["hilos"],
+                        ffmpeg_params=["-crf", str(perfil["crf"]), "-pix_fmt", "yuv420p",
+                                       "-video_track_timescale", str(ESCALA_TIEMPO)],
+                        logger=None
+                    )
+                finally:
+                    # La escena se libera antes de que el proceso de render tome la siguiente
+                    _cerrar_clip(clip)
+                    del clip
+                try:
+                    ejecutar_ffmpeg([
+                        "-i", ruta_video, "-i", os.fspath(ruta_audio),
+                        "-map", "0:v", "-map", "1:a", "-c:v", "copy", *argumentos_audio(ruta_audio),
+                        "-shortest", "-movflags", "+faststart",
+                        ruta_salida,
+                    ], timeout=limitar_timeout(plazo, 120))
+                finally:
+                    os.remove(ruta_video)
+            else:
+                self._render_ffmpeg(ruta_imagen, ruta_audio, texto, ruta_salida, plazo, ruta_subtitulo)
+
+            logger.info(f"🎞️ Segmento renderizado ({self.backend}): {ruta_salida}")
+            return ruta_salida
 
         except Exception as e:
-            logger.error(f"Error creando clip de video: {str(e)}")
-            return None
+            logger.error(f"❌ Error renderizando segmento {ruta_salida}: {e}")
+            return ""
+
+    def _render_ffmpeg(self, ruta_imagen: str, ruta_audio, texto: str, ruta_salida: str, plazo=None,
+                       ruta_subtitulo: str = None) -> None:
+        """
+        Render directo con ffmpeg: los fotogramas pre-renderizados (imagen + subtítulo) se repiten
+        como imagen fija (-tune stillimage), sin escalar ni dibujar texto en cada fotograma.
+        """
+        if not (ruta_imagen and os.path.exists(ruta_imagen)):
+            raise FileNotFoundError(f"Imagen no encontrada: {ruta_imagen}")
+        if not (ruta_audio and os.path.exists(ruta_audio)):
+            raise FileNotFoundError(f"Audio no encontrado: {ruta_audio}")
+
+        tramos = self.fotogramas_escena(ruta_imagen, texto, ruta_subtitulo)
+        ruta_lista = None
+        if len(tramos) == 1:
+            entrada_video = ["-loop", "1", "-framerate", str(FPS), "-i", tramos[0][0]]
+        else:
+            # Subtítulos temporizados: lista concat de fotogramas con su duración.
+            # El último se repite para que su duración se aplique; -shortest lo recorta al audio.
+            with tempfile.NamedTemporaryFile("w", suffix=".ffconcat", delete=False, encoding="utf-8") as f:
+                f.write("ffconcat version 1.0\n")
+                for ruta_fotograma, duracion in tramos:
+                    duracion = duracion if duracion is not None else 3600
+                    f.write(f"{entrada_concat(ruta_fotograma)}\nduration {duracion:.3f}\n")
+                f.write(f"{entrada_concat(ruta_fotograma)}\n")
+                ruta_lista = f.name
+            entrada_video = ["-f", "concat", "-safe", "0", "-i", ruta_lista]
+
+        try:
+            ejecutar_ffmpeg(entrada_video + [
+                "-i", os.fspath(ruta_audio),
+                "-map", "0:v", "-map", "1:a",
+                "-vf", "format=yuv420p",
+                "-c:v", "libx264", "-tune", "stillimage", *gobernador.argumentos_x264(), "-r", str(FPS),
+                *argumentos_audio(ruta_audio),
+                "-video_track_timescale", str(ESCALA_TIEMPO),
+                "-shortest", "-movflags", "+faststart",
+                ruta_salida,
+            ], timeout=limitar_timeout(plazo, 600))
+        finally:
+            if ruta_lista:
+                os.remove(ruta_lista)
+
+    def unir_segmentos(self, segmentos: list, ruta_salida: str, plazo=None, ruta_subtitulos: str = None) -> str:
+        """
+        Une los segmentos de las escenas en el video final con el demuxer concat de ffmpeg,
+        copiando los flujos (sin recodificar): tarda segundos aunque la historia sea larga.
+        Si los segmentos no son compatibles (p. ej. mezcla de motores), se recodifica.
+        Con `ruta_subtitulos` (.srt de toda la historia) se añade como pista de subtítulos mov_text.
+
+        Retorna:
+        - str: Ruta del video final.
+        """
+        if plazo:
+            plazo.comprobar("unir el video final")
+        with tempfile.NamedTemporaryFile("w", suffix=".txt", delete=False, encoding="utf-8") as f:
+            for segmento in segmentos:
+                f.write(f"{entrada_concat(segmento)}\n")
+            ruta_lista = f.name
+        entradas = ["-f", "concat", "-safe", "0", "-i", ruta_lista]
+        pista_subtitulos = []
+        if ruta_subtitulos and os.path.exists(ruta_subtitulos):
+            entradas += ["-i", ruta_subtitulos]
+            pista_subtitulos = ["-map", "0:v", "-map", "0:a", "-map", "1:s",
+                                "-c:s", "mov_text", "-metadata:s:s:0", "language=spa"]
+        try:
+            try:
+                ejecutar_ffmpeg(entradas + pista_subtitulos + [
+                    "-c:v", "copy", "-c:a", "copy", "-movflags", "+faststart",
+                    ruta_salida,
+                ], timeout=limitar_timeout(plazo, 300))
+            except RuntimeError as e:
+                logger.warning(f"⚠️ No se pudieron unir los segmentos copiando flujos; se recodifica: {e}")
+                ejecutar_ffmpeg(entradas + pista_subtitulos + [
+                    "-c:v", "libx264", *gobernador.argumentos_x264(), "-pix_fmt", "yuv420p",
+                    "-c:a", "aac", "-b:a", "128k", "-movflags", "+faststart",
+                    ruta_salida,
+                ], timeout=limitar_timeout(plazo, 900))
+        finally:
+            os.remove(ruta_lista)
+        logger.info(f"🎬 Video final unido ({len(segmentos)} segmentos): {ruta_salida}")
+        return ruta_salida
@@ -0,0 +1,195 @@
+# core/progress.py
+# Progreso detallado de la generación de historias.
+#
+# - ProgresoHistoria: lo usa el pipeline (en el proceso trabajador) para registrar la etapa
+#   actual, las escenas terminadas sobre el total y una estimación del tiempo restante.
+#   Se guarda en la columna 'progress' del trabajo en curso, con escrituras limitadas.
+# - BusProgreso: pub/sub dentro del proceso de la API. Un único hilo consulta la base de datos
+#   para todas las historias observadas y reparte cada cambio a todos sus suscriptores,
+#   así que N clientes mirando la misma historia cuestan una sola consulta por intervalo.
+
+import json
+import queue
+import threading
+import time
+from config.database import SessionLocal
+from config.settings import settings
+from models.models import Story, StoryJob
+from core.processors.portadas import recursos_portada
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+ESTADOS_FINALES = ("completed", "failed", "cancelled")
+
+
+class ProgresoHistoria:
+    """
+    Registro de progreso de una historia en generación.
+    """
+
+    def __init__(self, story_id: str, session_factory=SessionLocal, intervalo_escritura: float = 1.0):
+        self.story_id = story_id
+        self.session_factory = session_factory
+        self.intervalo_escritura = intervalo_escritura
+        self.etapa_actual = "pending"
+        self.escenas_total = 0
+        self.escenas_completadas = 0
+        self.total_definitivo = False
+        self.inicio_escenas = None
+        self._ultima_escritura = 0.0
+        self._lock = threading.Lock()
+
+    def etapa(self, nombre: str) -> None:
+        """
+        Cambia la etapa global de la historia (texto, escenas, render...).
+        """
+        with self._lock:
+            self.etapa_actual = nombre
+            if nombre == "escenas" and self.inicio_escenas is None:
+                self.inicio_escenas = time.monotonic()
+        self._guardar(forzar=True)
+
+    def escena_agregada(self) -> None:
+        with self._lock:
+            self.escenas_total += 1
+        self._guardar()
+
+    def total_escenas(self, total: int) -> None:
+        """
+        Fija el número definitivo de escenas (cuando el texto terminó de generarse).
+        """
+        with self._lock:
+            self.escenas_total = total
+            self.total_definitivo = True
+        self._guardar(forzar=True)
+
+    def escena_terminada(self) -> None:
+        with self._lock:
+            self.escenas_completadas += 1
+        self._guardar(forzar=True)
+
+    def instantanea(self) -> dict:
+        with self._lock:
+            eta = None
+            if self.inicio_escenas and self.escenas_completadas and self.total_definitivo:
+                por_escena = (time.monotonic() - self.inicio_escenas) / self.escenas_completadas
+                eta = round(por_escena * (self.escenas_total - self.escenas_completadas))
+            return {
+                "etapa": self.etapa_actual,
+                "escenas_completadas": self.escenas_completadas,
+                "escenas_total": self.escenas_total,
+                "total_definitivo": self.total_definitivo,
+                "eta_segundos": eta,
+            }
+
+    def _guardar(self, forzar: bool = False) -> None:
+        ahora = time.monotonic()
+        if not forzar and ahora - self._ultima_escritura < self.intervalo_escritura:
+            return
+        self._ultima_escritura = ahora
+        db = self.session_factory()
+        try:
+            db.query(StoryJob).filter(
+                StoryJob.story_id == self.story_id, StoryJob.status == "running"
+            ).update({StoryJob.progress: json.dumps(self.instantanea())}, synchronize_session=False)
+            db.commit()
+        except Exception as e:
+            # El progreso es informativo: nunca debe tumbar la generación
+            logger.warning(f"⚠️ No se pudo guardar el progreso de {self.story_id}: {e}")
+        finally:
+            db.close()
+
+
+class BusProgreso:
+    """
+    Pub/sub de eventos de progreso dentro del proceso de la API.
+    """
+
+    def __init__(self, session_factory=SessionLocal, intervalo: float = None):
+        self.session_factory = session_factory
+        self.intervalo = intervalo or settings.PROGRESS_POLL_INTERVAL
+        self._suscriptores = {}   # story_id -> set(queue.Queue)
+        self._ultimo = {}         # story_id -> último evento publicado
+        self._lock = threading.Lock()
+        self._hilo = None
+
+    def suscribir(self, story_id: str) -> queue.Queue:
+        """
+        Registra un suscriptor y le entrega de inmediato el último estado conocido (si lo hay).
+        """
+        cola = queue.Queue()
+        with self._lock:
+            self._suscriptores.setdefault(story_id, set()).add(cola)
+            if story_id in self._ultimo:
+                cola.put(self._ultimo[story_id])
+            self._arrancar_hilo()
+        return cola
+
+    def desuscribir(self, story_id: str, cola: queue.Queue) -> None:
+        with self._lock:
+            colas = self._suscriptores.get(story_id)
+            if colas is None:
+                return
+            colas.discard(cola)
+            if not colas:
+                del self._suscriptores[story_id]
+                self._ultimo.pop(story_id, None)
+
+    def publicar(self, story_id: str, evento: dict) -> None:
+        """
+        Reparte un evento a todos los suscriptores de la historia si cambió respecto al anterior.
+        """
+        with self._lock:
+            if self._ultimo.get(story_id) == evento:
+                return
+            self._ultimo[story_id] = evento
+            for cola in self._suscriptores.get(story_id, ()):
+                cola.put(evento)
+
+    def consultar(self) -> None:
+        """
+        Una sola consulta para todas las historias observadas; publica los cambios.
+        """
+        with self._lock:
+            observadas = list(self._suscriptores)
+        if not observadas:
+            return
+
+        db = self.session_factory()
+        try:
+            historias = db.query(Story.id, Story.status, Story.video_path).filter(Story.id.in_(observadas)).all()
+            progresos = dict(
+                db.query(StoryJob.story_id, StoryJob.progress)
+                .filter(StoryJob.story_id.in_(observadas), StoryJob.status == "running")
+                .all()
+            )
+        finally:
+            db.close()
+
+        for story_id, estado, video_path in historias:
+            evento = {"story_id": story_id, "status": estado}
+            if progresos.get(story_id):
+                evento.update(json.loads(progresos[story_id]))
+            if estado == "completed" and video_path:
+                evento["video_url"] = video_path
+            # Portada, miniatura y vista previa aparecen en cuanto existen (vía rápida)
+            evento.update(recursos_portada(story_id))
+            self.publicar(story_id, evento)
+
+    def _arrancar_hilo(self) -> None:
+        if self._hilo is None or not self._hilo.is_alive():
+            self._hilo = threading.Thread(target=self._bucle, name="bus-progreso", daemon=True)
+            self._hilo.start()
+
+    def _bucle(self) -> None:
+        while True:
+            try:
+                self.consultar()
+            except Exception as e:
+                logger.warning(f"⚠️ Error consultando el progreso: {e}")
+            time.sleep(self.intervalo)
+
+
+# Instancia compartida del proceso de la API
+bus_progreso = BusProgreso()
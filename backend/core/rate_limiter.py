@@ -0,0 +1,301 @@
+# core/rate_limiter.py
+# Limitadores por proveedor compartidos por todas las historias del proceso.
+# Cada proveedor (DALL·E, TTS de OpenAI, chat de OpenAI, ElevenLabs, DeepSeek) tiene:
+#   - un máximo de peticiones en curso,
+#   - un cubo de tokens de peticiones por minuto,
+#   - un cubo opcional de "tokens" por minuto (tokens del LLM o caracteres de TTS),
+# y registra cuánto esperan las llamadas en cola, para ajustar el ritmo a la cuota
+# del proveedor en lugar de chocar con errores 429 y reintentos exponenciales.
+#
+# Los cubos de peticiones y tokens de PROVIDER_LIMITS son globales: su saldo vive en la tabla
+# 'provider_quotas' y los trabajadores (de este host o de otros) lo consumen con una
+# actualización condicional (compare-and-swap), como los reclamos de la cola de trabajos.
+# El máximo de llamadas en curso se reparte entre los STORY_WORKERS del host.
+
+import random
+import threading
+import time
+from contextlib import contextmanager
+from sqlalchemy.exc import IntegrityError
+from config.database import SessionLocal
+from config.settings import settings
+from core.deadline import PlazoAgotado
+from models.models import ProviderQuota
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class CuboTokens:
+    """
+    Cubo de tokens que se rellena a `por_minuto` unidades por minuto hasta `capacidad`.
+    """
+
+    def __init__(self, por_minuto: float, capacidad: float = None):
+        self.tasa = por_minuto / 60.0
+        self.capacidad = capacidad if capacidad is not None else por_minuto
+        self.disponibles = self.capacidad
+        self.ultimo = time.monotonic()
+        self._cond = threading.Condition()
+
+    def _rellenar(self):
+        ahora = time.monotonic()
+        self.disponibles = min(self.capacidad, self.disponibles + (ahora - self.ultimo) * self.tasa)
+        self.ultimo = ahora
+
+    def adquirir(self, cantidad: float = 1, espera_max: float = None) -> bool:
+        """
+        Bloquea hasta poder consumir `cantidad` unidades.
+        Una petición mayor que la capacidad se deja pasar cuando el cubo está lleno.
+
+        Retorna:
+        - bool: False si no hubo saldo dentro de `espera_max` segundos (no se consume nada).
+        """
+        cantidad = min(cantidad, self.capacidad)
+        limite = time.monotonic() + espera_max if espera_max is not None else None
+        with self._cond:
+            while True:
+                self._rellenar()
+                if self.disponibles >= cantidad:
+                    self.disponibles -= cantidad
+                    return True
+                espera = (cantidad - self.disponibles) / self.tasa
+                if limite is not None and time.monotonic() + espera > limite:
+                    return False
+                self._cond.wait(espera)
+
+    def vaciar(self) -> None:
+        """
+        Descarta el saldo acumulado (tras un 429 el proveedor ya nos considera al límite).
+        """
+        with self._cond:
+            self._rellenar()
+            self.disponibles = 0
+
+
+class CuboCompartido:
+    """
+    Cubo de tokens con el saldo en la base de datos, compartido por todos los trabajadores.
+    Misma interfaz que CuboTokens; el saldo se rellena con la hora del reloj al consumirlo.
+
+    Parámetros:
+    - clave (str): Fila de 'provider_quotas' ("<proveedor>:<límite>").
+    - por_minuto (float), capacidad (float): Como en CuboTokens.
+    - session_factory: Fábrica de sesiones de la base compartida.
+    """
+
+    def __init__(self, clave: str, por_minuto: float, capacidad: float = None, session_factory=SessionLocal):
+        self.clave = clave
+        self.tasa = por_minuto / 60.0
+        self.capacidad = capacidad if capacidad is not None else por_minuto
+        self.session_factory = session_factory
+        self._tabla_lista = False
+
+    def adquirir(self, cantidad: float = 1, espera_max: float = None) -> bool:
+        """
+        Bloquea hasta poder consumir `cantidad` unidades del saldo compartido.
+
+        Retorna:
+        - bool: False si no hubo saldo dentro de `espera_max` segundos (no se consume nada).
+        """
+        cantidad = min(cantidad, self.capacidad)
+        limite = time.monotonic() + espera_max if espera_max is not None else None
+        while True:
+            espera = self._consumir(cantidad)
+            if espera == 0:
+                return True
+            if limite is not None and time.monotonic() + espera > limite:
+                return False
+            # Un poco de holgura aleatoria para que los trabajadores no reintenten a la vez
+            time.sleep(espera + random.uniform(0, 0.05))
+
+    def vaciar(self) -> None:
+        """
+        Descarta el saldo acumulado para todos los trabajadores (tras un 429).
+        """
+        db = self.session_factory()
+        try:
+            (db.query(ProviderQuota)
+             .filter(ProviderQuota.clave == self.clave)
+             .update({
+                 ProviderQuota.disponibles: 0.0,
+                 ProviderQuota.actualizado: time.time(),
+                 ProviderQuota.version: ProviderQuota.version + 1,
+             }, synchronize_session=False))
+            db.commit()
+        finally:
+            db.close()
+
+    def _consumir(self, cantidad: float) -> float:
+        """
+        Intenta consumir `cantidad` con una actualización condicional sobre la versión leída.
+
+        Retorna:
+        - float: 0 si se consumió; si no, segundos hasta que haya saldo.
+        """
+        db = self.session_factory()
+        try:
+            if not self._tabla_lista:
+                # Procesos que no pasan por create_all (scripts de prueba, consolas)
+                ProviderQuota.__table__.create(bind=db.get_bind(), checkfirst=True)
+                self._tabla_lista = True
+            while True:
+                fila = db.get(ProviderQuota, self.clave)
+                ahora = time.time()
+                if fila is None:
+                    # Primer uso del cubo: se crea lleno (si otro trabajador se adelanta, se relee)
+                    db.add(ProviderQuota(clave=self.clave, disponibles=self.capacidad, actualizado=ahora, version=0))
+                    try:
+                        db.commit()
+                    except IntegrityError:
+                        db.rollback()
+                    continue
+
+                disponibles = min(self.capacidad, fila.disponibles + max(0.0, ahora - fila.actualizado) * self.tasa)
+                if disponibles < cantidad:
+                    return (cantidad - disponibles) / self.tasa
+
+                # Solo gana quien actualice la fila mientras sigue en la versión leída
+                actualizados = (
+                    db.query(ProviderQuota)
+                    .filter(ProviderQuota.clave == self.clave, ProviderQuota.version == fila.version)
+                    .update({
+                        ProviderQuota.disponibles: disponibles - cantidad,
+                        ProviderQuota.actualizado: ahora,
+                        ProviderQuota.version: fila.version + 1,
+                    }, synchronize_session=False)
+                )
+                db.commit()
+                if actualizados == 1:
+                    return 0.0
+                # Otro trabajador consumió antes: se relee el saldo
+                db.expire_all()
+        finally:
+            db.close()
+
+
+class LimitadorProveedor:
+    """
+    Limitador de un proveedor: concurrencia máxima + peticiones/min + tokens/min.
+    Con `session_factory`, los cubos de peticiones y tokens se comparten entre trabajadores
+    a través de la base de datos; sin ella, son locales del proceso.
+    """
+
+    def __init__(self, nombre: str, rpm: float = 0, tpm: float = 0, max_en_curso: int = 0, rafaga: float = None,
+                 session_factory=None):
+        self.nombre = nombre
+        self.en_curso = threading.BoundedSemaphore(max_en_curso) if max_en_curso > 0 else None
+        if session_factory is not None:
+            self.cubo_peticiones = (CuboCompartido(f"{nombre}:peticiones", rpm, rafaga, session_factory)
+                                    if rpm > 0 else None)
+            self.cubo_tokens = CuboCompartido(f"{nombre}:tokens", tpm, None, session_factory) if tpm > 0 else None
+        else:
+            self.cubo_peticiones = CuboTokens(rpm, rafaga) if rpm > 0 else None
+            self.cubo_tokens = CuboTokens(tpm) if tpm > 0 else None
+        self._lock = threading.Lock()
+        self._activas = 0
+        self._llamadas = 0
+        self._espera_total = 0.0
+        self._espera_max = 0.0
+
+    @contextmanager
+    def reservar(self, tokens: float = 0, plazo=None):
+        """
+        Espera turno para una llamada al proveedor y la mantiene "en curso" mientras dura el bloque.
+
+        Parámetros:
+        - tokens (float): Coste estimado de la llamada para el límite de tokens/min.
+        - plazo (Plazo): Si la espera por cuota no cabe en el plazo de la historia, lanza PlazoAgotado.
+        """
+        inicio = time.monotonic()
+
+        def espera_max():
+            return plazo.espera_max() if plazo else None
+
+        if self.en_curso:
+            if not self.en_curso.acquire(timeout=espera_max()):
+                raise PlazoAgotado(f"{self.nombre}: sin hueco libre dentro del plazo de la historia")
+        try:
+            if self.cubo_peticiones and not self.cubo_peticiones.adquirir(1, espera_max()):
+                raise PlazoAgotado(f"{self.nombre}: la cuota de peticiones no deja llamar dentro del plazo")
+            if self.cubo_tokens and tokens and not self.cubo_tokens.adquirir(tokens, espera_max()):
+                raise PlazoAgotado(f"{self.nombre}: la cuota de tokens no deja llamar dentro del plazo")
+
+            espera = time.monotonic() - inicio
+            with self._lock:
+                self._activas += 1
+                self._llamadas += 1
+                self._espera_total += espera
+                self._espera_max = max(self._espera_max, espera)
+            if espera >= 1:
+                logger.info(f"⏳ {self.nombre}: llamada en cola {espera:.1f}s por límite de cuota")
+
+            try:
+                yield
+            finally:
+                with self._lock:
+                    self._activas -= 1
+        finally:
+            if self.en_curso:
+                self.en_curso.release()
+
+    def penalizar(self) -> None:
+        """
+        Señal de que el proveedor respondió 429: se vacían los cubos para frenar el ritmo.
+        """
+        logger.warning(f"⚠️ {self.nombre}: 429 recibido, frenando el ritmo de peticiones")
+        for cubo in (self.cubo_peticiones, self.cubo_tokens):
+            if cubo:
+                cubo.vaciar()
+
+    def metricas(self) -> dict:
+        with self._lock:
+            return {
+                "llamadas": self._llamadas,
+                "en_curso": self._activas,
+                "espera_total_s": round(self._espera_total, 3),
+                "espera_media_s": round(self._espera_total / self._llamadas, 3) if self._llamadas else 0.0,
+                "espera_max_s": round(self._espera_max, 3),
+            }
+
+
+# Limitadores del proceso, creados bajo demanda a partir de settings.PROVIDER_LIMITS
+_limitadores = {}
+_lock_limitadores = threading.Lock()
+
+
+def obtener_limitador(proveedor: str) -> LimitadorProveedor:
+    """
+    Devuelve el limitador de un proveedor (sin límites si no está configurado): los cubos de
+    peticiones y tokens son globales (base de datos) y las llamadas en curso se reparten
+    entre los procesos trabajadores del host.
+    """
+    with _lock_limitadores:
+        if proveedor not in _limitadores:
+            config = settings.PROVIDER_LIMITS.get(proveedor, {})
+            max_en_curso = config.get("max_en_curso", 0)
+            if max_en_curso > 0:
+                max_en_curso = max(1, max_en_curso // max(1, settings.STORY_WORKERS))
+            _limitadores[proveedor] = LimitadorProveedor(
+                proveedor,
+                rpm=config.get("rpm", 0),
+                tpm=config.get("tpm", 0),
+                max_en_curso=max_en_curso,
+                session_factory=SessionLocal,
+            )
+        return _limitadores[proveedor]
+
+
+def metricas_limitadores() -> dict:
+    """
+    Métricas de espera y concurrencia de todos los proveedores usados en el proceso.
+    """
+    with _lock_limitadores:
+        return {nombre: limitador.metricas() for nombre, limitador in _limitadores.items()}
+
+
+def estimar_tokens(texto: str) -> int:
+    """
+    Estimación rápida de tokens de LLM (≈ 4 caracteres por token).
+    """
+    return max(1, len(texto) // 4)
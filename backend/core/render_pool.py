@@ -0,0 +1,141 @@
+# core/render_pool.py
+# Pool de procesos para codificar los segmentos de las escenas.
+# Cada escena se renderiza a su propio .mp4 en cuanto tiene imagen, audio y subtítulo,
+# repartiendo el trabajo entre núcleos (MoviePy compone fotogramas en Python y no
+# escala con hilos por el GIL). El video final se une después copiando los flujos.
+# Cada proceso materializa una sola escena a la vez y se recicla tras RENDER_TASKS_PER_PROCESS
+# escenas, así la memoria por trabajador no crece con el número de escenas ni de historias.
+# Las demás codificaciones de escena (variantes HLS) también pasan por este pool: así comparten
+# los hilos que el gobernador asigna al render en lugar de sumarse a ellos.
+
+import multiprocessing
+import sys
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from config.settings import settings, gobernador
+from core.deadline import Plazo, limitar_timeout
+from core.processors.ffmpeg_utils import ejecutar_ffmpeg
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+_pool = None
+_lock_pool = threading.Lock()
+
+
+def procesos_render() -> int:
+    """
+    Procesos de render por trabajador: RENDER_PROCESSES o, si es 0, los núcleos
+    repartidos entre los trabajadores de historias del host (ver GobernadorCPU).
+    """
+    return gobernador.procesos_render()
+
+
+def obtener_pool_render() -> ProcessPoolExecutor:
+    """
+    Devuelve el pool de render del proceso, creándolo la primera vez.
+    """
+    global _pool
+    with _lock_pool:
+        if _pool is None:
+            opciones = {}
+            if sys.version_info >= (3, 11) and settings.RENDER_TASKS_PER_PROCESS > 0:
+                # Reciclar procesos de render (max_tasks_per_child existe desde Python 3.11)
+                opciones["max_tasks_per_child"] = settings.RENDER_TASKS_PER_PROCESS
+            _pool = ProcessPoolExecutor(
+                max_workers=procesos_render(),
+                mp_context=multiprocessing.get_context("spawn"),
+                **opciones,
+            )
+            logger.info(f"🎞️ Pool de render iniciado con {procesos_render()} procesos "
+                        f"de {gobernador.hilos_ffmpeg()} hilos")
+        return _pool
+
+
+def detener_pool_render() -> None:
+    global _pool
+    with _lock_pool:
+        if _pool is not None:
+            _pool.shutdown(wait=True, cancel_futures=True)
+            _pool = None
+
+
+def _render_en_proceso(backend: str, ruta_imagen: str, ruta_audio, texto: str,
+                       ruta_salida: str, segundos_restantes: float = None, ruta_subtitulo: str = None) -> str:
+    # Se ejecuta en el proceso de render: el plazo se reconstruye con lo que quedaba al enviarlo
+    from core.processors.video_generator import VideoGenerator
+    plazo = Plazo(segundos_restantes) if segundos_restantes else None
+    return VideoGenerator(backend=backend).render_segmento(
+        ruta_imagen, ruta_audio, texto, ruta_salida, plazo=plazo, ruta_subtitulo=ruta_subtitulo
+    )
+
+
+def renderizar_segmento(backend: str, ruta_imagen: str, ruta_audio, texto: str,
+                        ruta_salida: str, plazo=None, ruta_subtitulo: str = None) -> str:
+    """
+    Renderiza el segmento de una escena en el pool de procesos y espera el resultado.
+
+    Parámetros:
+    - backend (str): Motor de render ("ffmpeg" o "moviepy").
+    - ruta_imagen (str), ruta_audio (RecursoAudio | str): Recursos de la escena. Del RecursoAudio
+      solo viajan al proceso de render la ruta y la duración, no las muestras.
+    - texto (str): Texto del subtítulo.
+    - ruta_salida (str): Archivo .mp4 del segmento.
+    - plazo (Plazo): Presupuesto de tiempo de la historia.
+    - ruta_subtitulo (str): .srt de la escena para subtítulos temporizados (opcional).
+
+    Retorna:
+    - str: Ruta del segmento o "" si falla.
+    """
+    restante = plazo.espera_max() if plazo else None
+    pool = obtener_pool_render()
+    try:
+        futuro = pool.submit(
+            _render_en_proceso, backend, ruta_imagen, ruta_audio, texto, ruta_salida, restante, ruta_subtitulo
+        )
+        return futuro.result(timeout=limitar_timeout(plazo, 900))
+    except BrokenProcessPool:
+        # Un proceso de render murió (p. ej. sin memoria): el siguiente uso crea un pool nuevo
+        logger.error(f"❌ El pool de render se rompió renderizando {ruta_salida}")
+        _descartar_pool(pool)
+        return ""
+
+
+def _ffmpeg_en_proceso(argumentos: list, timeout: float) -> None:
+    # Se ejecuta en el proceso de render
+    ejecutar_ffmpeg(argumentos, timeout=timeout)
+
+
+def ejecutar_ffmpeg_en_pool(argumentos: list, plazo=None, timeout: float = 300) -> None:
+    """
+    Ejecuta ffmpeg en un proceso del pool de render y espera a que termine. Los argumentos
+    deben usar como mucho los hilos de un proceso de render (gobernador.perfil_render()).
+
+    Parámetros:
+    - argumentos (list): Argumentos de ffmpeg (sin el binario).
+    - plazo (Plazo): Presupuesto de tiempo de la historia.
+    - timeout (float): Tiempo máximo de la codificación.
+
+    Lanza el error de ffmpeg; si el pool se rompe, lo descarta y relanza BrokenProcessPool.
+    """
+    pool = obtener_pool_render()
+    try:
+        futuro = pool.submit(_ffmpeg_en_proceso, argumentos, limitar_timeout(plazo, timeout))
+        futuro.result(timeout=limitar_timeout(plazo, 900))
+    except BrokenProcessPool:
+        logger.error("❌ El pool de render se rompió ejecutando ffmpeg")
+        _descartar_pool(pool)
+        raise
+
+
+def _descartar_pool(pool: ProcessPoolExecutor) -> None:
+    """
+    Cierra un pool roto (hilo de gestión, colas y procesos restantes) y, si sigue siendo el
+    pool del proceso, lo olvida para que el siguiente uso cree uno nuevo.
+    """
+    global _pool
+    with _lock_pool:
+        if _pool is pool:
+            _pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,129 @@
+# core/scene_graph.py
+# Ejecutor de grafos de dependencias para el pipeline de cada escena.
+# Cada tipo de etapa (imagen, audio, subtítulos, video) tiene su propio pool de hilos,
+# y un nodo se lanza en cuanto terminan sus dependencias: la imagen y la narración
+# se generan a la vez, los subtítulos esperan al audio y el clip espera a todo.
+
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from config.settings import settings
+from core.render_pool import procesos_render
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class EjecutorEtapas:
+    """
+    Conjunto de pools de hilos, uno por tipo de etapa.
+    Limita por separado cuántas llamadas de cada tipo pueden estar en curso.
+    """
+
+    def __init__(self, tamanos: dict):
+        self.pools = {
+            etapa: ThreadPoolExecutor(max_workers=max(1, tamano), thread_name_prefix=f"etapa-{etapa}")
+            for etapa, tamano in tamanos.items()
+        }
+
+    def enviar(self, etapa: str, fn, *args, **kwargs):
+        if etapa not in self.pools:
+            raise ValueError(f"Etapa desconocida: {etapa}")
+        return self.pools[etapa].submit(fn, *args, **kwargs)
+
+    def cerrar(self):
+        for pool in self.pools.values():
+            pool.shutdown(wait=True)
+
+
+class GrafoEscena:
+    """
+    Grafo acíclico de etapas para una escena.
+
+    Cada nodo recibe como argumentos con nombre los resultados de sus dependencias:
+        grafo.agregar("subtitulo", "subtitulos", generar_srt, depende_de=["audio"])
+        # → generar_srt(audio=<resultado del nodo "audio">)
+    """
+
+    def __init__(self, ejecutor: EjecutorEtapas):
+        self.ejecutor = ejecutor
+        self.nodos = {}
+
+    def agregar(self, nombre: str, etapa: str, fn, depende_de=()):
+        for dependencia in depende_de:
+            if dependencia not in self.nodos:
+                raise ValueError(f"El nodo '{nombre}' depende de '{dependencia}', que no existe todavía")
+        self.nodos[nombre] = (etapa, fn, tuple(depende_de))
+        return self
+
+    def ejecutar(self) -> dict:
+        """
+        Ejecuta el grafo respetando las dependencias.
+
+        Retorna:
+        - dict: Resultado de cada nodo por nombre.
+
+        Si un nodo lanza una excepción, se cancelan los nodos aún no iniciados y se propaga.
+        """
+        resultados = {}
+        en_curso = {}
+        pendientes = dict(self.nodos)
+
+        def lanzar_listos():
+            for nombre, (etapa, fn, deps) in list(pendientes.items()):
+                if all(dep in resultados for dep in deps):
+                    argumentos = {dep: resultados[dep] for dep in deps}
+                    en_curso[self.ejecutor.enviar(etapa, fn, **argumentos)] = nombre
+                    del pendientes[nombre]
+
+        lanzar_listos()
+        while en_curso:
+            terminados, _ = wait(list(en_curso), return_when=FIRST_COMPLETED)
+            for futuro in terminados:
+                nombre = en_curso.pop(futuro)
+                try:
+                    resultados[nombre] = futuro.result()
+                except Exception:
+                    for otro in en_curso:
+                        otro.cancel()
+                    raise
+            lanzar_listos()
+
+        return resultados
+
+
+# Pools de etapas compartidos por todas las escenas del proceso
+_ejecutor_etapas = None
+_lock_ejecutor = threading.Lock()
+
+
+def tamanos_etapas() -> dict:
+    """
+    Hilos de cada pool de etapas (el de video, tantos como procesos de render si no se fija).
+    """
+    return {
+        "imagen": settings.SCENE_POOL_IMAGE,
+        "audio": settings.SCENE_POOL_AUDIO,
+        "subtitulos": settings.SCENE_POOL_SUBTITLES,
+        "video": settings.SCENE_POOL_VIDEO or procesos_render(),
+    }
+
+
+def escenas_simultaneas() -> int:
+    """
+    Escenas de una historia en curso a la vez. Los hilos de escena solo coordinan su grafo:
+    el trabajo lo limitan los pools de etapas y, el render, los procesos que asigna el
+    gobernador. Con tantas escenas como el pool más grande ninguno se queda sin trabajo,
+    y no se retienen imágenes y narraciones que aún no se pueden procesar.
+    """
+    return max(1, *tamanos_etapas().values())
+
+
+def obtener_ejecutor_etapas() -> EjecutorEtapas:
+    """
+    Devuelve el ejecutor de etapas del proceso, creándolo con los tamaños de settings.
+    """
+    global _ejecutor_etapas
+    with _lock_ejecutor:
+        if _ejecutor_etapas is None:
+            _ejecutor_etapas = EjecutorEtapas(tamanos_etapas())
+        return _ejecutor_etapas
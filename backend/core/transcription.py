@@ -0,0 +1,264 @@
+# core/transcription.py
+# Servicio de transcripción del proceso trabajador.
+# Todas las escenas de todas las historias envían su audio a una única cola; un hilo
+# las agrupa en lotes (hasta WHISPER_BATCH_SIZE, esperando como mucho WHISPER_BATCH_WAIT
+# a que lleguen más) y los pasa por un solo modelo Whisper: un lote de espectrogramas
+# mel decodificado a la vez, en lugar de varias llamadas a transcribe compitiendo por
+# el mismo modelo y por los hilos de torch. Cada escena recibe sus segmentos por un Future.
+#
+# Motores (WHISPER_ENGINE), todos devuelven la misma estructura de segmentos
+# [{"start", "end", "text"}, ...] (faster-whisper añade "words" con tiempos por palabra):
+# - "openai-whisper": lote de espectrogramas mel decodificado con whisper.decode.
+# - "faster-whisper": CTranslate2 cuantizado; cada audio del lote se transcribe seguido con el
+#   modelo ya cargado (CTranslate2 paraleliza internamente).
+
+import queue
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from config.settings import settings
+from core.deadline import PlazoAgotado
+from core.model_registry import registro_modelos
+from core.processors.recurso_audio import RecursoAudio
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+IDIOMA = "es"
+SEGUNDOS_VENTANA = 30  # Ventana de audio de Whisper: lo más largo se transcribe aparte
+SEGUNDOS_POR_TIMESTAMP = 0.02
+
+
+class ColaTranscripcionLlena(RuntimeError):
+    """
+    Se lanza cuando la cola de transcripción está llena y no queda plazo para esperar.
+    """
+
+
+class ServicioTranscripcion:
+    """
+    Cola con lotes de transcripción servida por un hilo.
+
+    Parámetros:
+    - procesar_lote (callable): rutas → [segmentos por ruta]; por defecto, el motor de WHISPER_ENGINE.
+    - max_lote (int): Audios por lote.
+    - espera_lote (float): Segundos que se espera a completar un lote tras el primer audio.
+    - max_cola (int): Audios en espera como máximo (contrapresión para las escenas).
+    """
+
+    def __init__(self, procesar_lote=None, max_lote: int = None, espera_lote: float = None,
+                 max_cola: int = None):
+        self.procesar_lote = procesar_lote or transcribir_lote
+        self.max_lote = max(1, max_lote or settings.WHISPER_BATCH_SIZE)
+        self.espera_lote = settings.WHISPER_BATCH_WAIT if espera_lote is None else espera_lote
+        self._cola = queue.Queue(maxsize=max_cola or settings.WHISPER_QUEUE_MAX)
+        self._lock = threading.Lock()
+        self._hilo = None
+        self._metricas = {"lotes": 0, "audios": 0, "segundos_lote": 0.0, "segundos_espera": 0.0}
+
+    def enviar(self, ruta_audio, espera_max: float = None) -> Future:
+        """
+        Encola un audio (RecursoAudio o ruta) y devuelve el Future con sus segmentos [{"start", "end", "text"}, ...].
+        Si la cola está llena, espera hueco como mucho `espera_max` segundos.
+        """
+        self._arrancar_hilo()
+        futuro = Future()
+        try:
+            self._cola.put((ruta_audio, futuro, time.monotonic()), timeout=espera_max)
+        except queue.Full:
+            raise ColaTranscripcionLlena(f"Cola de transcripción llena ({self._cola.maxsize} audios)")
+        return futuro
+
+    def transcribir(self, ruta_audio: str, plazo=None) -> list:
+        """
+        Encola un audio y espera sus segmentos (como mucho, lo que quede del plazo).
+        """
+        espera_max = plazo.espera_max() if plazo else None
+        futuro = self.enviar(ruta_audio, espera_max=espera_max)
+        try:
+            return futuro.result(timeout=plazo.espera_max() if plazo else None)
+        except FutureTimeoutError:
+            futuro.cancel()
+            raise PlazoAgotado("No queda plazo para esperar la transcripción")
+
+    def metricas(self) -> dict:
+        """
+        Lotes procesados, tamaño medio, latencia media por lote y espera media en cola.
+        """
+        with self._lock:
+            lotes = self._metricas["lotes"]
+            audios = self._metricas["audios"]
+            return {
+                "lotes": lotes,
+                "audios": audios,
+                "tamano_medio_lote": audios / lotes if lotes else 0.0,
+                "segundos_medios_lote": self._metricas["segundos_lote"] / lotes if lotes else 0.0,
+                "segundos_medios_espera": self._metricas["segundos_espera"] / audios if audios else 0.0,
+                "en_cola": self._cola.qsize(),
+            }
+
+    def _arrancar_hilo(self) -> None:
+        with self._lock:
+            if self._hilo is None or not self._hilo.is_alive():
+                self._hilo = threading.Thread(target=self._bucle, name="transcripcion", daemon=True)
+                self._hilo.start()
+
+    def _bucle(self) -> None:
+        while True:
+            lote = [self._cola.get()]
+            limite = time.monotonic() + self.espera_lote
+            while len(lote) < self.max_lote:
+                restante = limite - time.monotonic()
+                try:
+                    lote.append(self._cola.get(timeout=restante) if restante > 0 else self._cola.get_nowait())
+                except queue.Empty:
+                    break
+            self._procesar(lote)
+
+    def _procesar(self, lote: list) -> None:
+        # Las escenas que ya no esperan (plazo agotado) no ocupan sitio en el lote
+        lote = [elemento for elemento in lote if elemento[1].set_running_or_notify_cancel()]
+        if not lote:
+            return
+
+        inicio = time.monotonic()
+        try:
+            resultados = self.procesar_lote([ruta for ruta, _, _ in lote])
+        except Exception as e:
+            logger.error(f"❌ Error transcribiendo un lote de {len(lote)} audios: {e}")
+            for _, futuro, _ in lote:
+                futuro.set_exception(e)
+            return
+        duracion = time.monotonic() - inicio
+
+        with self._lock:
+            self._metricas["lotes"] += 1
+            self._metricas["audios"] += len(lote)
+            self._metricas["segundos_lote"] += duracion
+            self._metricas["segundos_espera"] += sum(inicio - encolado for _, _, encolado in lote)
+        logger.info(f"📝 Lote de {len(lote)} audios transcrito en {duracion:.2f}s")
+
+        for (_, futuro, _), segmentos in zip(lote, resultados):
+            futuro.set_result(segmentos)
+
+
+def transcribir_lote(rutas: list) -> list:
+    """
+    Transcribe un lote con el motor configurado en WHISPER_ENGINE.
+    """
+    if settings.WHISPER_ENGINE == "faster-whisper":
+        return transcribir_lote_faster(rutas)
+    if settings.WHISPER_ENGINE == "openai-whisper":
+        return transcribir_lote_whisper(rutas)
+    raise ValueError(f"Motor de Whisper no soportado: {settings.WHISPER_ENGINE}")
+
+
+def transcribir_lote_faster(rutas: list) -> list:
+    """
+    Transcribe un lote con faster-whisper (int8, con tiempos por palabra).
+    """
+    with registro_modelos.en_uso("whisper") as modelo:
+        resultados = []
+        for ruta in rutas:
+            muestras = RecursoAudio.de(ruta).cargar()
+            segmentos, _ = modelo.transcribe(muestras, language=IDIOMA, task="transcribe", word_timestamps=True)
+            resultados.append(segmentos_faster(segmentos))
+        return resultados
+
+
+def segmentos_faster(segmentos) -> list:
+    """
+    Segmentos de faster-whisper → misma estructura que openai-whisper, con "words".
+    """
+    return [
+        {
+            "start": segmento.start,
+            "end": segmento.end,
+            "text": segmento.text.strip(),
+            "words": [
+                {"start": palabra.start, "end": palabra.end, "word": palabra.word.strip()}
+                for palabra in (segmento.words or [])
+            ],
+        }
+        for segmento in segmentos
+        if segmento.text.strip()
+    ]
+
+
+def transcribir_lote_whisper(rutas: list) -> list:
+    """
+    Transcribe varios audios con Whisper en un solo paso de decodificación.
+    Los audios de hasta 30 s (una ventana) se decodifican juntos como un lote de
+    espectrogramas mel; los más largos se transcriben aparte con transcribe. Las muestras
+    salen del RecursoAudio de cada escena (ya decodificado si la alineación lo usó).
+
+    Retorna:
+    - list: Por cada ruta, [{"start": s, "end": s, "text": str}, ...].
+    """
+    import torch
+    import whisper
+    from whisper.tokenizer import get_tokenizer
+
+    with registro_modelos.en_uso("whisper") as modelo:
+        audios = [RecursoAudio.de(ruta).cargar() for ruta in rutas]
+        resultados = [None] * len(rutas)
+        cortos = [i for i, audio in enumerate(audios) if len(audio) <= whisper.audio.N_SAMPLES]
+
+        if cortos:
+            mels = torch.stack([
+                whisper.log_mel_spectrogram(whisper.pad_or_trim(audios[i]), modelo.dims.n_mels)
+                for i in cortos
+            ]).to(modelo.device)
+            opciones = whisper.DecodingOptions(
+                task="transcribe", language=IDIOMA, without_timestamps=False,
+                fp16=modelo.device.type == "cuda",
+            )
+            decodificados = whisper.decode(modelo, mels, opciones)
+            tokenizer = get_tokenizer(modelo.is_multilingual, num_languages=modelo.num_languages,
+                                      language=IDIOMA, task="transcribe")
+            for i, decodificado in zip(cortos, decodificados):
+                duracion = len(audios[i]) / whisper.audio.SAMPLE_RATE
+                resultados[i] = segmentos_desde_tokens(decodificado.tokens, tokenizer, duracion)
+
+        for i in range(len(rutas)):
+            if resultados[i] is None:
+                resultados[i] = [
+                    {"start": s["start"], "end": s["end"], "text": s["text"]}
+                    for s in modelo.transcribe(audios[i], task="transcribe", language=IDIOMA)["segments"]
+                ]
+        return resultados
+
+
+def segmentos_desde_tokens(tokens: list, tokenizer, duracion: float = SEGUNDOS_VENTANA) -> list:
+    """
+    Convierte los tokens de Whisper con marcas de tiempo (<|0.00|> texto <|2.40|> ...) en segmentos.
+
+    Parámetros:
+    - duracion (float): Duración del clip. El audio se rellena hasta la ventana de 30 s, así que
+      ningún segmento termina después (el texto sin marca de cierre acaba con el clip).
+    """
+    primera_marca = tokenizer.timestamp_begin
+    segmentos = []
+    texto = []
+    inicio = None
+    for token in tokens:
+        if token >= primera_marca:
+            instante = (token - primera_marca) * SEGUNDOS_POR_TIMESTAMP
+            if inicio is not None and texto:
+                segmentos.append({"start": inicio, "end": min(instante, duracion),
+                                  "text": tokenizer.decode(texto).strip()})
+                texto = []
+                inicio = None
+            else:
+                inicio = instante
+        else:
+            texto.append(token)
+    if texto:
+        # Texto sin marca de cierre: dura hasta el final del clip
+        segmentos.append({"start": min(inicio or 0.0, duracion), "end": float(duracion),
+                          "text": tokenizer.decode(texto).strip()})
+    return [s for s in segmentos if s["text"]]
+
+
+# Instancia compartida (el hilo arranca con el primer audio)
+servicio_transcripcion = ServicioTranscripcion()
@@ -0,0 +1,204 @@
+# core/tts_cache.py
+# Caché en disco de narraciones sintetizadas.
+# Muchas historias repiten frases (moralejas, "Había una vez...") y los reintentos repiten el
+# mismo texto: la narración se guarda indexada por el hash de (motor, voz, modelo, formato,
+# texto normalizado) y un acierto se copia al destino sin llamar a la API.
+#
+# - El tamaño está acotado (TTS_CACHE_MAX_MB): al pasarse se borran las entradas usadas hace más
+#   tiempo (LRU; la fecha de modificación del archivo marca el último uso).
+# - Peticiones simultáneas de la misma clave en el proceso esperan a una única síntesis.
+# - Varios trabajadores comparten el directorio: las entradas se escriben de forma atómica.
+#
+#   assets/cache/tts/<clave>.<extension>
+
+import hashlib
+import os
+import shutil
+import threading
+import unicodedata
+from collections import OrderedDict
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from config.settings import settings
+from core.deadline import PlazoAgotado
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+CACHE_DIR = os.path.abspath(os.path.join("assets", "cache", "tts"))
+
+
+def normalizar_texto(texto: str) -> str:
+    """
+    Texto tal como lo oye el motor: Unicode NFC y espacios colapsados.
+    """
+    return " ".join(unicodedata.normalize("NFC", texto).split())
+
+
+def clave_tts(motor: str, voz: str, modelo: str, formato: str, texto: str) -> str:
+    """
+    Clave de contenido de una narración.
+    """
+    datos = "\x1f".join([motor, voz or "", modelo or "", formato, normalizar_texto(texto)])
+    return hashlib.sha256(datos.encode("utf-8")).hexdigest()
+
+
+class CacheTTS:
+    """
+    Caché LRU en disco de narraciones, con síntesis coalescidas por clave.
+
+    Parámetros:
+    - directorio (str): Carpeta de las entradas.
+    - max_bytes (int): Tamaño máximo de la caché (0 = desactivada).
+    """
+
+    def __init__(self, directorio: str = CACHE_DIR, max_bytes: int = None):
+        self.directorio = directorio
+        self.max_bytes = settings.TTS_CACHE_MAX_MB * 1024 * 1024 if max_bytes is None else max_bytes
+        self._lock = threading.Lock()
+        self._indice = None        # nombre de archivo → bytes, del menos al más reciente
+        self._bytes = 0
+        self._en_curso = {}        # clave → Future con (entrada en la caché, archivo generado), "" si faltan
+        self._metricas = {"aciertos": 0, "fallos": 0, "coalescidas": 0, "expulsadas": 0}
+
+    def obtener_o_generar(self, clave: str, ruta_destino: str, generar, plazo=None) -> str:
+        """
+        Deja en `ruta_destino` la narración de `clave`: copiada de la caché si existe; si no, la
+        genera `generar()` (que debe escribir `ruta_destino` y devolverla, o "" si falla) y se guarda.
+        Si otra escena del proceso ya está sintetizando la misma clave, se espera a su resultado.
+
+        Retorna:
+        - str: `ruta_destino` o "" si falla la síntesis.
+        """
+        if self.max_bytes <= 0:
+            return generar()
+
+        nombre = f"{clave}{os.path.splitext(ruta_destino)[1].lower()}"
+        with self._lock:
+            self._cargar_indice()
+            if self._acierto(nombre):
+                self._metricas["aciertos"] += 1
+                return self._copiar(nombre, ruta_destino)
+            futuro = self._en_curso.get(nombre)
+            propietario = futuro is None
+            if propietario:
+                futuro = self._en_curso[nombre] = Future()
+                self._metricas["fallos"] += 1
+            else:
+                self._metricas["coalescidas"] += 1
+
+        if not propietario:
+            try:
+                entrada, generado = futuro.result(timeout=plazo.espera_max() if plazo else None)
+            except FutureTimeoutError:
+                raise PlazoAgotado("No queda plazo para esperar la narración en síntesis")
+            copiada = self._copiar(nombre, ruta_destino) if entrada else ""
+            if copiada or not generado:
+                return copiada
+            # La síntesis salió bien pero no quedó en la caché (o ya se expulsó): se copia el
+            # archivo del propietario y, si ya no está, esta escena sintetiza por su cuenta
+            try:
+                shutil.copyfile(generado, ruta_destino)
+                return ruta_destino
+            except OSError:
+                return generar()
+
+        entrada = generado = ""
+        try:
+            generado = generar()
+            if generado and os.path.exists(generado):
+                entrada = self._guardar(nombre, generado)
+            return generado
+        finally:
+            with self._lock:
+                self._en_curso.pop(nombre, None)
+            futuro.set_result((entrada, generado or ""))
+
+    def metricas(self) -> dict:
+        """
+        Aciertos, fallos, síntesis coalescidas, expulsiones y ocupación de la caché.
+        """
+        with self._lock:
+            consultas = self._metricas["aciertos"] + self._metricas["fallos"] + self._metricas["coalescidas"]
+            return {
+                **self._metricas,
+                "tasa_aciertos": (self._metricas["aciertos"] + self._metricas["coalescidas"]) / consultas
+                if consultas else 0.0,
+                "entradas": len(self._indice or {}),
+                "megabytes": round(self._bytes / (1024 * 1024), 2),
+            }
+
+    def _cargar_indice(self) -> None:
+        # Se llama con el lock tomado: el índice se reconstruye del disco la primera vez
+        if self._indice is not None:
+            return
+        os.makedirs(self.directorio, exist_ok=True)
+        entradas = []
+        for entrada in os.scandir(self.directorio):
+            if entrada.is_file() and not entrada.name.endswith(".tmp"):
+                estado = entrada.stat()
+                entradas.append((estado.st_mtime, entrada.name, estado.st_size))
+        self._indice = OrderedDict((nombre, tamano) for _, nombre, tamano in sorted(entradas))
+        self._bytes = sum(self._indice.values())
+
+    def _acierto(self, nombre: str) -> bool:
+        # Se llama con el lock tomado
+        ruta = os.path.join(self.directorio, nombre)
+        if not os.path.exists(ruta):
+            # Otro trabajador pudo expulsarla; o pudo crearla sin que este proceso lo sepa
+            if nombre in self._indice:
+                self._bytes -= self._indice.pop(nombre)
+            return False
+        if nombre not in self._indice:
+            tamano = os.path.getsize(ruta)
+            self._indice[nombre] = tamano
+            self._bytes += tamano
+        self._indice.move_to_end(nombre)
+        try:
+            os.utime(ruta)  # último uso, para el LRU de todos los procesos
+        except OSError:
+            pass
+        return True
+
+    def _copiar(self, nombre: str, ruta_destino: str) -> str:
+        os.makedirs(os.path.dirname(ruta_destino) or ".", exist_ok=True)
+        try:
+            shutil.copyfile(os.path.join(self.directorio, nombre), ruta_destino)
+        except FileNotFoundError:
+            # Expulsada entre la consulta y la copia
+            return ""
+        logger.info(f"♻️ Narración reutilizada de la caché: {ruta_destino}")
+        return ruta_destino
+
+    def _guardar(self, nombre: str, ruta_generada: str) -> str:
+        """
+        Copia la narración recién generada a la caché (escritura atómica) y expulsa lo más antiguo.
+        """
+        ruta = os.path.join(self.directorio, nombre)
+        temporal = f"{ruta}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            shutil.copyfile(ruta_generada, temporal)
+            os.replace(temporal, ruta)
+        except OSError as e:
+            logger.warning(f"⚠️ No se pudo guardar la narración en la caché: {e}")
+            if os.path.exists(temporal):
+                os.remove(temporal)
+            return ""
+
+        with self._lock:
+            if nombre in self._indice:
+                self._bytes -= self._indice.pop(nombre)
+            self._indice[nombre] = os.path.getsize(ruta)
+            self._bytes += self._indice[nombre]
+            while self._bytes > self.max_bytes and len(self._indice) > 1:
+                antiguo, tamano = self._indice.popitem(last=False)
+                self._bytes -= tamano
+                self._metricas["expulsadas"] += 1
+                try:
+                    os.remove(os.path.join(self.directorio, antiguo))
+                except OSError:
+                    pass
+        return ruta
+
+
+# Instancia compartida por las historias del proceso
+cache_tts = CacheTTS()
@@ -1,7 +1,7 @@
 # models/models.py
 # Modelo ORM de la tabla 'stories' usando SQLAlchemy
 
-from sqlalchemy import Column, String, Integer, DateTime, ForeignKey, Text
+from sqlalchemy import Column, String, Integer, Boolean, DateTime, ForeignKey, Text, Float
 from config.database import Base
 from datetime import datetime
 import uuid
@@ -16,7 +16,7 @@ class Story(Base):
     # 👤 ID del perfil infantil asociado (por ahora texto libre)
     profile_id = Column(String, nullable=True)
 
-    # 🔄 Estado de la historia: pending, generating, completed, failed
+    # 🔄 Estado de la historia: pending, generating, completed, failed, cancelled
     status = Column(String, default="pending")
 
     # 🕒 Tiempos de creación y actualización
@@ -30,7 +30,85 @@ class Story(Base):
     error_message = Column(Text, nullable=True)
 
 
+# ────────────────────────────────────────────────────────────────────
+# Cola persistente de trabajos de generación – tabla 'story_jobs'
+# ────────────────────────────────────────────────────────────────────
+
+class StoryJob(Base):
+    __tablename__ = "story_jobs"
+
+    id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
+
+    # 📚 Historia que genera este trabajo
+    story_id = Column(String, ForeignKey("stories.id"), nullable=False, index=True)
+
+    # 🧾 Datos del wizard serializados en JSON
+    payload = Column(Text, nullable=False)
+
+    # 🔄 Estado del trabajo: queued, running, done, failed, cancelled
+    status = Column(String, default="queued", index=True)
+
+    # 👤 Cuenta adulta dueña del trabajo (JWT identity / ChildProfile.adulto_email)
+    owner = Column(String, nullable=True, index=True)
+
+    # ⭐ Nivel de prioridad: los trabajos de nivel más alto se atienden antes
+    priority = Column(Integer, default=0)
+
+    # 🔁 Número de veces que un trabajador lo ha reclamado
+    attempts = Column(Integer, default=0)
+
+    # 👷 Trabajador que lo está procesando (si está en curso)
+    worker_id = Column(String, nullable=True)
+
+    # ⏳ Lease: el trabajador debe renovarlo con latidos; si vence, el trabajo vuelve a la cola
+    lease_expires_at = Column(DateTime, nullable=True, index=True)
+    heartbeat_at = Column(DateTime, nullable=True)
+
+    error_message = Column(Text, nullable=True)
+
+    # 🛑 El usuario pidió cancelar un trabajo en curso (el trabajador lo detecta en su latido)
+    cancel_requested = Column(Boolean, default=False)
+
+    # 📊 Progreso detallado en JSON (etapa, escenas completadas/total, ETA)
+    progress = Column(Text, nullable=True)
+
+    created_at = Column(DateTime, default=datetime.utcnow)
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+
+
+# ────────────────────────────────────────────────────────────────────
+# Manifiesto de artefactos por historia – tabla 'story_manifests'
+# ────────────────────────────────────────────────────────────────────
+
+class StoryManifest(Base):
+    __tablename__ = "story_manifests"
+
+    # 📚 Una fila por historia
+    story_id = Column(String, ForeignKey("stories.id"), primary_key=True)
+
+    # 🧾 JSON con el texto de cada escena y las rutas de sus artefactos por etapa
+    contenido = Column(Text, nullable=False, default="{}")
+
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+# ────────────────────────────────────────────────────────────────────
+# Cuotas de proveedores compartidas por todos los trabajadores – tabla 'provider_quotas'
+# ────────────────────────────────────────────────────────────────────
+
+class ProviderQuota(Base):
+    __tablename__ = "provider_quotas"
+
+    # 🚦 Un cubo por proveedor y tipo de límite ("openai_chat:peticiones", "openai_chat:tokens")
+    clave = Column(String, primary_key=True)
+
+    # 🪣 Saldo del cubo en el instante `actualizado` (segundos epoch; se rellena al leerlo)
+    disponibles = Column(Float, nullable=False)
+    actualizado = Column(Float, nullable=False)
 
+    # 🔁 Versión para las actualizaciones condicionales (compare-and-swap)
+    version = Column(Integer, nullable=False, default=0)
 
 
 class ChildProfile(Base):
@@ -0,0 +1,39 @@
+# probar_render.py
+# Compara los motores de render de escenas (ffmpeg vs MoviePy) con la misma imagen, audio y texto.
+#
+#   python probar_render.py                       # imagen y audio sintéticos de 20 s
+#   python probar_render.py imagen.png audio.mp3  # recursos reales
+
+import os
+import sys
+import time
+from PIL import Image
+from core.processors.video_generator import VideoGenerator
+from core.processors.ffmpeg_utils import obtener_ffmpeg, ejecutar_ffmpeg
+
+SALIDA = "assets/videos/prueba_render"
+TEXTO = "Había una vez un dragón que quería aprender a volar sin quemar las nubes del reino."
+
+os.makedirs(SALIDA, exist_ok=True)
+
+if len(sys.argv) >= 3:
+    ruta_imagen, ruta_audio = sys.argv[1], sys.argv[2]
+else:
+    # Recursos sintéticos: ilustración 1024x1024 y 20 s de tono
+    ruta_imagen = os.path.join(SALIDA, "imagen.png")
+    ruta_audio = os.path.join(SALIDA, "audio.mp3")
+    Image.new("RGB", (1024, 1024), (90, 140, 200)).save(ruta_imagen)
+    ejecutar_ffmpeg(["-f", "lavfi", "-i", "sine=frequency=440:duration=20", ruta_audio])
+
+print(f"🎬 ffmpeg: {obtener_ffmpeg()}")
+for backend in ("ffmpeg", "moviepy"):
+    ruta_salida = os.path.join(SALIDA, f"escena_{backend}.mp4")
+    inicio = time.perf_counter()
+    resultado = VideoGenerator(backend=backend).render_segmento(ruta_imagen, ruta_audio, TEXTO, ruta_salida)
+    segundos = time.perf_counter() - inicio
+
+    if resultado:
+        tamano = os.path.getsize(resultado) / 1024
+        print(f"✅ {backend:8} {segundos:6.2f}s  {tamano:8.0f} KB  → {resultado}")
+    else:
+        print(f"❌ {backend:8} falló tras {segundos:.2f}s")
@@ -0,0 +1,118 @@
+# probar_transcripcion.py
+# Compara los motores de Whisper (openai-whisper fp32 vs faster-whisper int8) con las mismas narraciones.
+# Cada motor corre en su propio proceso para medir su memoria sin mezclarla con el otro.
+# faster-whisper es opcional: instalar antes requirements-faster-whisper.txt.
+#
+#   python probar_transcripcion.py                     # narraciones de assets/audio
+#   python probar_transcripcion.py escena_1.m4a ...    # clips concretos
+#
+# Si junto a un clip existe <clip>.txt con el texto narrado, se calcula el WER.
+# La precisión temporal se estima como el % de palabras cuyo centro cae dentro de un
+# tramo con voz (detección por energía de alineacion.py); sin tiempos por palabra se
+# usa el reparto uniforme de cada segmento.
+
+import glob
+import multiprocessing
+import os
+import resource
+import sys
+import time
+
+MOTORES = ("openai-whisper", "faster-whisper")
+CARPETA_AUDIO = "assets/audio"
+
+
+def _palabras(texto: str) -> list:
+    return "".join(c.lower() if c.isalnum() or c.isspace() else " " for c in texto).split()
+
+
+def wer(referencia: str, hipotesis: str) -> float:
+    """
+    Tasa de error por palabra (distancia de edición entre listas de palabras).
+    """
+    ref, hip = _palabras(referencia), _palabras(hipotesis)
+    if not ref:
+        return 0.0 if not hip else 1.0
+    fila = list(range(len(hip) + 1))
+    for i, palabra in enumerate(ref, 1):
+        anterior, fila[0] = fila[0], i
+        for j, candidata in enumerate(hip, 1):
+            anterior, fila[j] = fila[j], min(fila[j] + 1, fila[j - 1] + 1, anterior + (palabra != candidata))
+    return fila[-1] / len(ref)
+
+
+def centros_palabras(segmentos: list) -> list:
+    centros = []
+    for segmento in segmentos:
+        if segmento.get("words"):
+            centros += [(p["start"] + p["end"]) / 2 for p in segmento["words"]]
+        else:
+            palabras = segmento["text"].split()
+            paso = (segmento["end"] - segmento["start"]) / max(len(palabras), 1)
+            centros += [segmento["start"] + paso * (i + 0.5) for i in range(len(palabras))]
+    return centros
+
+
+def _medir(motor: str, clips: list, cola) -> None:
+    # Proceso hijo (spawn): el motor se fija antes de importar la configuración
+    os.environ["WHISPER_ENGINE"] = motor
+    from core.model_registry import registro_modelos
+    from core.processors.alineacion import detectar_voz, energia_por_tramas
+    from core.processors.recurso_audio import RecursoAudio
+    from core.transcription import transcribir_lote
+
+    inicio = time.perf_counter()
+    registro_modelos.obtener("whisper")
+    carga = time.perf_counter() - inicio
+
+    latencias, errores, dentro, total = [], [], 0, 0
+    for clip in clips:
+        # El clip se decodifica una vez: lo comparten la transcripción y la detección de voz
+        recurso = RecursoAudio(clip)
+        inicio = time.perf_counter()
+        segmentos = transcribir_lote([recurso])[0]
+        latencias.append(time.perf_counter() - inicio)
+
+        ruta_texto = os.path.splitext(clip)[0] + ".txt"
+        if os.path.exists(ruta_texto):
+            with open(ruta_texto, encoding="utf-8") as f:
+                errores.append(wer(f.read(), " ".join(s["text"] for s in segmentos)))
+
+        tramos = detectar_voz(energia_por_tramas(recurso.cargar(), recurso.frecuencia))
+        recurso.liberar()
+        for centro in centros_palabras(segmentos):
+            total += 1
+            dentro += any(a <= centro <= b for a, b in tramos)
+
+    cola.put({
+        "motor": motor,
+        "carga": carga,
+        "latencia": sum(latencias) / len(latencias),
+        "rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        "wer": sum(errores) / len(errores) if errores else None,
+        "en_voz": dentro / total if total else None,
+    })
+
+
+if __name__ == "__main__":
+    clips = sys.argv[1:] or sorted(
+        ruta for extension in ("m4a", "mp3") for ruta in glob.glob(os.path.join(CARPETA_AUDIO, f"*.{extension}"))
+    )
+    if not clips:
+        sys.exit(f"❌ No hay clips: pásalos como argumentos o deja narraciones en {CARPETA_AUDIO}/")
+
+    print(f"📝 {len(clips)} clips")
+    contexto = multiprocessing.get_context("spawn")
+    for motor in MOTORES:
+        cola = contexto.Queue()
+        proceso = contexto.Process(target=_medir, args=(motor, clips, cola))
+        proceso.start()
+        proceso.join()
+        if proceso.exitcode != 0 or cola.empty():
+            print(f"❌ {motor:15} falló (¿está instalado?)")
+            continue
+        r = cola.get()
+        texto_wer = f"{r['wer']:.1%}" if r["wer"] is not None else "  -  "
+        texto_voz = f"{r['en_voz']:.1%}" if r["en_voz"] is not None else "  -  "
+        print(f"✅ {motor:15} carga {r['carga']:6.2f}s  latencia media {r['latencia']:6.2f}s  "
+              f"RSS {r['rss_mb']:7.0f} MB  WER {texto_wer}  palabras en voz {texto_voz}")
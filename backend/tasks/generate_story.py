@@ -3,15 +3,24 @@
 
 import os
 from concurrent.futures import ThreadPoolExecutor
-from core.processors.text_generator import TextGenerator
+from core.processors.text_generator import TextGenerator, dividir_texto_en_escenas
 from core.processors.image_generator import ImageGenerator
 from core.processors.audio_generator import AudioGenerator
 from core.processors.subtitles_generator import SubtitlesGenerator
-from core.processors.video_generator import VideoGenerator
-from moviepy.editor import concatenate_videoclips
-from utils.helpers import generar_id_unico
+from core.processors.video_generator import VideoGenerator, ANCHO_VIDEO, ALTO_VIDEO
+from core.processors.ffmpeg_utils import duracion_medio
+from core.processors.portadas import GeneradorPortadas
+from core.scene_graph import GrafoEscena, obtener_ejecutor_etapas, escenas_simultaneas
+from core.render_pool import renderizar_segmento
+from core.hls import EmpaquetadorHLS
+from core.manifest import ManifiestoHistoria
+from core.progress import ProgresoHistoria
+from core.cancellation import TokenCancelacion, GeneracionCancelada
+from core.deadline import Plazo
 from utils.logger import get_logger
+from utils.subtitulos import unir_subtitulos, escribir_srt, escribir_vtt
 from utils.db_memory import STORIES_DB  # Fallback si aún usamos memoria
+from config.settings import settings
 
 # ORM: importar sesión y modelo
 from config.database import SessionLocal
@@ -26,43 +35,128 @@ IMAGES_DIR = os.path.join(ASSETS_DIR, "images")
 AUDIO_DIR = os.path.join(ASSETS_DIR, "audio")
 SUBTITLES_DIR = os.path.join(ASSETS_DIR, "subtitles")
 VIDEO_DIR = os.path.join(ASSETS_DIR, "videos")
+SEGMENTS_DIR = os.path.join(VIDEO_DIR, "segmentos")
 
 # Asegurar que los directorios existen
-for path in [TEXT_DIR, IMAGES_DIR, AUDIO_DIR, SUBTITLES_DIR, VIDEO_DIR]:
+for path in [TEXT_DIR, IMAGES_DIR, AUDIO_DIR, SUBTITLES_DIR, VIDEO_DIR, SEGMENTS_DIR]:
     os.makedirs(path, exist_ok=True)
 
-def procesar_escena(parrafo, image_generator, audio_generator, subtitle_generator, video_generator):
+def procesar_escena(parrafo, escena_id, indice, manifiesto, image_generator, audio_generator, subtitle_generator, video_generator,
+                    cancelacion=None, plazo=None, hls=None, portadas=None):
     """
-    Genera imagen, audio, subtítulo y clip de video para una escena (párrafo).
-    Devuelve el clip o None si falla.
+    Genera imagen, audio, subtítulo y segmento de video para una escena (párrafo).
+    La imagen y el audio se piden en paralelo; el subtítulo espera al audio
+    y el segmento se renderiza (en el pool de procesos de render) en cuanto existen todos los recursos.
+    Las etapas que ya constan en el manifiesto (de un intento anterior) no se repiten.
+    Antes de cada etapa se comprueban el token de cancelación y el plazo de la historia.
+    Con `hls` (EmpaquetadorHLS), el segmento se publica en la playlist en cuanto está listo.
+    Con `portadas` (GeneradorPortadas), la primera escena genera además la portada, las miniaturas
+    y una vista previa de baja resolución en cuanto tiene imagen y audio.
+    La narración pasa entre etapas como RecursoAudio: se decodifica una sola vez (alineación o
+    Whisper) y el render recibe su duración sin volver a abrir el archivo.
+    Devuelve la ruta del segmento .mp4 o None si falla.
     """
     if not parrafo.strip():
         return None
 
+    cancelacion = cancelacion or TokenCancelacion()
+    plazo = plazo or Plazo()
+    recursos = {}
+
+    def etapa(nombre, generar):
+        cancelacion.comprobar()
+        if not manifiesto.artefacto(indice, nombre):
+            plazo.comprobar(nombre)
+        return manifiesto.etapa(indice, nombre, generar)
+
     try:
-        escena_id = generar_id_unico()
         ruta_imagen = os.path.join(IMAGES_DIR, f"{escena_id}.png")
-        ruta_audio = os.path.join(AUDIO_DIR, f"{escena_id}.mp3")
+        # Con AUDIO_FORMAT="aac" la narración se copia al segmento sin recodificar
+        extension_audio = "m4a" if settings.AUDIO_FORMAT == "aac" else "mp3"
+        ruta_audio = os.path.join(AUDIO_DIR, f"{escena_id}.{extension_audio}")
         ruta_subtitulo = os.path.join(SUBTITLES_DIR, f"{escena_id}.srt")
+        ruta_segmento = os.path.join(SEGMENTS_DIR, f"{escena_id}.mp4")
+
+        def narracion():
+            ruta = etapa("audio", lambda: audio_generator.generate_audio(parrafo, ruta_audio, plazo=plazo))
+            recursos["audio"] = audio_generator.cargar_recurso(ruta)
+            return recursos["audio"]
 
-        # Generar recursos individuales
-        image_generator.generate_image(parrafo, ruta_imagen)
-        audio_generator.generate_audio(parrafo, ruta_audio)
-        subtitle_generator.generar_subtitulo(ruta_audio, ruta_subtitulo)
+        grafo = GrafoEscena(obtener_ejecutor_etapas())
+        grafo.agregar("imagen", "imagen", lambda: etapa(
+            "imagen", lambda: image_generator.generate_image(parrafo, ruta_imagen, plazo=plazo)))
+        grafo.agregar("audio", "audio", narracion)
+        grafo.agregar(
+            "subtitulo", "subtitulos",
+            lambda audio: etapa(
+                "subtitulo", lambda: subtitle_generator.generar_subtitulo(
+                    audio, ruta_subtitulo, plazo=plazo, texto=parrafo)) if audio else "",
+            depende_de=["audio"]
+        )
+        grafo.agregar(
+            "clip", "video",
+            lambda imagen, audio, subtitulo: etapa(
+                "clip", lambda: renderizar_segmento(
+                    video_generator.backend, imagen, audio, parrafo, ruta_segmento,
+                    plazo=plazo, ruta_subtitulo=subtitulo)),
+            depende_de=["imagen", "audio", "subtitulo"]
+        )
+        if portadas and indice == 0:
+            # Vía rápida: no esperan a Whisper ni al render; si fallan, la escena sigue igual.
+            # La vista previa consta en el manifiesto, así que una historia reanudada no la repite
+            story_id = manifiesto.story_id
+            grafo.agregar(
+                "portada", "imagen",
+                lambda imagen: portadas.generar_portada(story_id, imagen) if imagen else "",
+                depende_de=["imagen"]
+            )
+            grafo.agregar(
+                "vista_previa", "video",
+                lambda imagen, audio: manifiesto.etapa(
+                    indice, "vista_previa", lambda: portadas.generar_vista_previa(
+                        story_id, imagen, audio.ruta, plazo=plazo)) if imagen and audio else "",
+                depende_de=["imagen", "audio"]
+            )
 
-        # Crear el clip final para esta escena
-        clip = video_generator.create_clip(ruta_imagen, ruta_audio, parrafo)
-        return clip
+        # Segmento de video de esta escena
+        segmento = grafo.ejecutar()["clip"]
+        manifiesto.marcar_estado(indice, "completed" if segmento else "failed")
+        if hls:
+            if segmento:
+                hls.agregar_escena(indice, segmento, plazo=plazo)
+            else:
+                hls.omitir_escena(indice)
+        return segmento or None
 
+    except GeneracionCancelada:
+        # La escena queda 'pending' en el manifiesto: un reintento la retomará
+        raise
     except Exception as e:
         logger.warning(f"⚠️ Error procesando escena: {e}")
+        manifiesto.marcar_estado(indice, "failed")
+        if hls:
+            hls.omitir_escena(indice)
         return None
+    finally:
+        # Las muestras decodificadas (o su archivo mapeado) no sobreviven a la escena
+        if recursos.get("audio"):
+            recursos["audio"].liberar()
 
-def generate_story(story_id, user_data):
+def generate_story(story_id, user_data, cancelacion=None):
     """
     Orquesta la generación completa de una historia (texto → video).
+
+    Parámetros:
+    - cancelacion (TokenCancelacion): Si se activa, la generación se detiene entre etapas.
+
+    Retorna:
+    - bool: True si la historia quedó completada, False si falló o se canceló.
     """
     logger.info(f"🚀 Iniciando generación de historia {story_id}")
+    cancelacion = cancelacion or TokenCancelacion()
+
+    # Presupuesto de tiempo de toda la historia, compartido por todas sus llamadas
+    plazo = Plazo(settings.STORY_DEADLINE_SECONDS)
 
     # Crear generadores
     text_generator = TextGenerator()
@@ -74,6 +168,8 @@ def generate_story(story_id, user_data):
     # Conectar a la base de datos
     db = SessionLocal()
     story = None
+    hls = None
+    portadas = GeneradorPortadas() if settings.PREVIEW_ENABLED else None
 
     try:
         # Buscar la historia en la base de datos
@@ -85,7 +181,7 @@ def generate_story(story_id, user_data):
             story = STORIES_DB.get(story_id)
             if story is None:
                 logger.error("❌ Historia no encontrada ni en BD ni en memoria.")
-                return
+                return False
 
         # Cambiar estado a "generating"
         story.status = "generating"
@@ -100,44 +196,71 @@ def generate_story(story_id, user_data):
         )
         logger.info(f"📖 Prompt construido:\n{prompt}")
 
-        # Generar el texto completo
-        cuento_completo = text_generator.generate_text(prompt)
-
-        # Guardar el texto generado (opcional)
-        with open(os.path.join(TEXT_DIR, f"{story_id}_cuento.txt"), "w", encoding="utf-8") as f:
-            f.write(cuento_completo)
-
-        # Dividir en escenas
-        parrafos = cuento_completo.strip().split("\n")
-
-        # Procesar escenas en paralelo
-        with ThreadPoolExecutor(max_workers=4) as executor:
-            futures = [
-                executor.submit(
-                    procesar_escena,
-                    parrafo,
-                    image_generator,
-                    audio_generator,
-                    subtitle_generator,
-                    video_generator
+        # Manifiesto de artefactos: si la historia ya se intentó, se reanuda desde él
+        manifiesto = ManifiestoHistoria.cargar(story_id)
+
+        # Progreso detallado (etapa, escenas, ETA) para el stream de eventos
+        progreso = ProgresoHistoria(story_id)
+        progreso.etapa("texto")
+
+        # Playlist HLS progresiva: la reproducción empieza con la primera escena renderizada
+        if settings.HLS_ENABLED:
+            hls = EmpaquetadorHLS(story_id, ANCHO_VIDEO, ALTO_VIDEO)
+
+        # Escenas del cuento: en streaming llegan una a una mientras el modelo escribe
+        if manifiesto.contenido["texto_completo"]:
+            logger.info(f"♻️ Reanudando historia {story_id} desde su manifiesto")
+            escenas = manifiesto.textos_escenas()
+        elif settings.TEXT_STREAMING:
+            escenas = text_generator.generar_escenas_stream(prompt, plazo=plazo)
+        else:
+            escenas = dividir_texto_en_escenas(text_generator.generate_text(prompt, plazo=plazo))
+
+        # Procesar cada escena en cuanto está disponible (tantas a la vez como admiten los pools de etapas)
+        parrafos = []
+        with ThreadPoolExecutor(max_workers=escenas_simultaneas()) as executor:
+            futures = []
+            try:
+                segmentos = _procesar_escenas(
+                    story_id, escenas, parrafos, futures, executor, manifiesto, progreso, cancelacion, plazo,
+                    image_generator, audio_generator, subtitle_generator, video_generator, hls, portadas
                 )
-                for parrafo in parrafos if parrafo.strip()
-            ]
-            clips = [f.result() for f in futures if f.result()]
+            except GeneracionCancelada:
+                # Las escenas que aún no empezaron no llegan a arrancar
+                for futuro in futures:
+                    futuro.cancel()
+                raise
 
-        if not clips:
+        if not segmentos:
             raise Exception("❌ No se pudo generar ningún clip válido.")
+        if hls:
+            hls.finalizar()
 
         # Generar el video final
-        video_final = concatenate_videoclips(clips)
+        cancelacion.comprobar()
+        plazo.comprobar("el render")
+        progreso.etapa("render")
+        ruta_srt = _subtitulos_historia(story_id, segmentos, manifiesto)
         ruta_video = os.path.join(VIDEO_DIR, f"{story_id}.mp4")
-        video_final.write_videofile(ruta_video, fps=24, verbose=False, logger=None)
+        video_generator.unir_segmentos(
+            [segmento for _, segmento in segmentos], ruta_video, plazo=plazo,
+            ruta_subtitulos=ruta_srt if settings.SUBTITLE_MODE == "soft" else None
+        )
 
         # Guardar la ruta y estado
+        manifiesto.registrar_video(ruta_video)
         story.video_path = ruta_video
         story.status = "completed"
         if db: db.commit()
         logger.info(f"✅ Historia {story_id} generada exitosamente.")
+        return True
+
+    except GeneracionCancelada:
+        logger.info(f"🛑 Generación de la historia {story_id} cancelada")
+        if story:
+            story.status = "cancelled"
+            if db: db.commit()
+        return False
 
     except Exception as e:
         logger.error(f"❌ Error al generar historia {story_id}: {e}")
@@ -146,5 +269,88 @@ def generate_story(story_id, user_data):
             if hasattr(story, 'error_message'):
                 story.error_message = str(e)
             if db: db.commit()
+        return False
     finally:
+        # La playlist se cierra también si la historia falla o se cancela
+        if hls:
+            hls.finalizar()
         db.close()
+
+
+def _procesar_escenas(story_id, escenas, parrafos, futures, executor, manifiesto, progreso, cancelacion, plazo,
+                      image_generator, audio_generator, subtitle_generator, video_generator, hls=None,
+                      portadas=None):
+    """
+    Lanza cada escena en el pool según llega del generador de texto.
+
+    Retorna:
+    - list: [(indice, ruta_segmento), ...] de las escenas que se generaron bien, en orden.
+    """
+    for parrafo in escenas:
+        cancelacion.comprobar()
+        if not parrafo.strip():
+            continue
+        indice = len(parrafos)
+        parrafos.append(parrafo)
+        manifiesto.registrar_escena(indice, parrafo)
+        if indice == 0:
+            progreso.etapa("escenas")
+        progreso.escena_agregada()
+        futuro = executor.submit(
+            procesar_escena,
+            parrafo,
+            f"{story_id}_{indice:02d}",
+            indice,
+            manifiesto,
+            image_generator,
+            audio_generator,
+            subtitle_generator,
+            video_generator,
+            cancelacion,
+            plazo,
+            hls,
+            portadas
+        )
+        futuro.add_done_callback(lambda f: _escena_terminada(progreso, f))
+        futures.append(futuro)
+
+    manifiesto.marcar_texto_completo(len(parrafos))
+    progreso.total_escenas(len(parrafos))
+
+    # Guardar el texto generado (opcional)
+    with open(os.path.join(TEXT_DIR, f"{story_id}_cuento.txt"), "w", encoding="utf-8") as f:
+        f.write("\n\n".join(parrafos))
+
+    return [(indice, f.result()) for indice, f in enumerate(futures) if f.result()]
+
+
+def _escena_terminada(progreso, futuro):
+    """
+    Cuenta la escena como terminada en el progreso, salvo si se canceló sin llegar a empezar.
+    """
+    if not futuro.cancelled():
+        progreso.escena_terminada()
+
+
+def _subtitulos_historia(story_id, segmentos, manifiesto):
+    """
+    Une los .srt de las escenas en los subtítulos de la historia completa (SRT y WebVTT),
+    desplazando cada uno según la duración real de los segmentos que lo preceden.
+
+    Retorna:
+    - str: Ruta del .srt de la historia o None si no se pudo generar.
+    """
+    try:
+        lineas = unir_subtitulos([
+            (manifiesto.artefacto(indice, "subtitulo"), duracion_medio(segmento))
+            for indice, segmento in segmentos
+        ])
+        if not lineas:
+            return None
+        ruta_srt = escribir_srt(lineas, os.path.join(SUBTITLES_DIR, f"{story_id}.srt"))
+        escribir_vtt(lineas, os.path.join(SUBTITLES_DIR, f"{story_id}.vtt"))
+        return ruta_srt
+    except Exception as e:
+        # Los subtítulos de la historia son un extra: el video se une igualmente
+        logger.warning(f"⚠️ No se pudieron unir los subtítulos de la historia {story_id}: {e}")
+        return None
@@ -0,0 +1,162 @@
+# tasks/worker.py
+# Trabajador de generación: reclama trabajos de la cola persistente (con lease) y los ejecuta.
+#
+# Puede ejecutarse de forma independiente en cualquier host que comparta la base de datos:
+#   DATABASE_URL=postgresql://... python -m tasks.worker --procesos 4
+
+import argparse
+import os
+import socket
+import threading
+import time
+from config.settings import settings
+from core.job_queue import (
+    reclamar_trabajo, finalizar_trabajo, renovar_lease, reencolar_expirados, cancelacion_solicitada
+)
+from core.cancellation import TokenCancelacion
+from core.rate_limiter import metricas_limitadores
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class Latido(threading.Thread):
+    """
+    Hilo que renueva periódicamente el lease de un trabajo mientras se genera
+    y comprueba si el usuario lo canceló.
+    Si el lease se pierde (otro trabajador lo reclamó tras vencer), lo deja indicado en `perdido`.
+    En ambos casos activa el token de cancelación para que el pipeline se detenga.
+    """
+
+    def __init__(self, job_id: str, worker_id: str, cancelacion: TokenCancelacion = None):
+        super().__init__(name=f"latido-{job_id}", daemon=True)
+        self.job_id = job_id
+        self.worker_id = worker_id
+        self.cancelacion = cancelacion or TokenCancelacion()
+        self.perdido = threading.Event()
+        self._parar = threading.Event()
+
+    def run(self):
+        intervalo = min(settings.JOB_CANCEL_CHECK_INTERVAL, settings.JOB_HEARTBEAT_INTERVAL)
+        ultimo_latido = time.monotonic()
+        while not self._parar.wait(intervalo):
+            try:
+                if cancelacion_solicitada(self.job_id):
+                    logger.info(f"🛑 Cancelación solicitada para el trabajo {self.job_id}")
+                    self.cancelacion.cancelar()
+                    return
+
+                if time.monotonic() - ultimo_latido < settings.JOB_HEARTBEAT_INTERVAL:
+                    continue
+                ultimo_latido = time.monotonic()
+                if not renovar_lease(self.job_id, self.worker_id):
+                    logger.warning(f"⚠️ Lease perdido para el trabajo {self.job_id}")
+                    self.perdido.set()
+                    self.cancelacion.cancelar()
+                    return
+            except Exception as e:
+                # Un fallo puntual de BD no debe tumbar la generación; el siguiente latido reintenta
+                logger.warning(f"⚠️ No se pudo renovar el lease de {self.job_id}: {e}")
+
+    def detener(self):
+        self._parar.set()
+
+
+def procesar_trabajo(trabajo: dict, worker_id: str) -> bool:
+    """
+    Ejecuta la generación de la historia asociada a un trabajo reclamado,
+    manteniendo vivo su lease, y registra el resultado en la cola.
+    """
+    from tasks.generate_story import generate_story
+
+    logger.info(f"👷 Procesando trabajo {trabajo['id']} (historia {trabajo['story_id']})")
+    cancelacion = TokenCancelacion()
+    latido = Latido(trabajo["id"], worker_id, cancelacion)
+    latido.start()
+    try:
+        exito = generate_story(trabajo["story_id"], trabajo["datos"], cancelacion=cancelacion)
+        error = None if exito else "La generación de la historia falló"
+    except Exception as e:
+        logger.error(f"❌ Error inesperado en el trabajo {trabajo['id']}: {e}")
+        exito, error = False, str(e)
+    finally:
+        latido.detener()
+
+    cancelado = cancelacion.cancelado and not latido.perdido.is_set()
+    if cancelado:
+        error = "Cancelada por el usuario"
+    if not finalizar_trabajo(trabajo["id"], exito, error, worker_id=worker_id, cancelado=cancelado):
+        logger.warning(f"⚠️ El trabajo {trabajo['id']} ya no pertenecía a {worker_id}; resultado descartado")
+    logger.info(f"🚦 Cuotas de proveedores en {worker_id}: {metricas_limitadores()}")
+    return exito
+
+
+def ejecutar_trabajador(worker_id: str, evento_parada=None) -> None:
+    """
+    Bucle principal de un trabajador. Procesa un trabajo cada vez, de modo que
+    el número de historias simultáneas queda acotado por el número de trabajadores.
+    Entre trabajos devuelve a la cola los leases vencidos de trabajadores caídos.
+
+    Parámetros:
+    - worker_id (str): Identificador único del trabajador.
+    - evento_parada: Evento opcional (threading/multiprocessing) para detener el bucle.
+    """
+    logger.info(f"👷 Trabajador {worker_id} iniciado")
+
+    # Cargar una sola vez los modelos pesados de este proceso (Whisper, clientes de API)
+    from core.model_registry import registro_modelos
+    registro_modelos.precargar()
+    from core.transcription import servicio_transcripcion
+    from core.tts_cache import cache_tts
+    logger.info(f"🔥 Recursos del trabajador {worker_id}: {registro_modelos.estado()}")
+
+    ultima_revision = 0.0
+    while not (evento_parada and evento_parada.is_set()):
+        if time.monotonic() - ultima_revision >= settings.JOB_HEARTBEAT_INTERVAL:
+            reencolar_expirados()
+            ultima_revision = time.monotonic()
+
+        trabajo = reclamar_trabajo(worker_id)
+        if trabajo is None:
+            time.sleep(settings.JOB_POLL_INTERVAL)
+            continue
+        procesar_trabajo(trabajo, worker_id)
+
+        metricas = servicio_transcripcion.metricas()
+        if metricas["lotes"]:
+            logger.info(f"📝 Transcripción en {worker_id}: {metricas}")
+        metricas = cache_tts.metricas()
+        if metricas["aciertos"] + metricas["fallos"]:
+            logger.info(f"♻️ Caché de narraciones en {worker_id}: {metricas}")
+
+    from core.render_pool import detener_pool_render
+    detener_pool_render()
+    logger.info(f"🛑 Trabajador {worker_id} detenido")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Trabajador de generación de historias Cuentix")
+    parser.add_argument("--procesos", type=int, default=1, help="Número de procesos trabajadores en este host")
+    args = parser.parse_args()
+
+    # Asegurar que las tablas existen (el trabajador puede arrancar antes que la API)
+    from config.database import engine
+    from models.models import Base
+    Base.metadata.create_all(bind=engine)
+
+    if args.procesos <= 1:
+        ejecutar_trabajador(f"{socket.gethostname()}-{os.getpid()}")
+        return
+
+    from core.orchestrator import iniciar_pool, detener_pool
+    iniciar_pool(args.procesos)
+    try:
+        while True:
+            time.sleep(settings.JOB_HEARTBEAT_INTERVAL)
+            iniciar_pool(args.procesos)  # Repone procesos que hayan muerto
+    except KeyboardInterrupt:
+        detener_pool()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+# tests/test_alineacion.py
+
+# Prueba unitaria de los subtítulos por alineación: detección de voz por energía sobre una
+# señal sintética, división en líneas y reparto de las líneas ajustado a las pausas.
+
+import numpy as np
+import pytest
+from core.processors.alineacion import (
+    FRECUENCIA_ANALISIS, energia_por_tramas, detectar_voz, dividir_en_lineas, alinear_lineas
+)
+
+
+def _senal(tramos, duracion):
+    """Tono de 220 Hz en los tramos indicados y ruido muy bajo en el resto."""
+    t = np.arange(int(duracion * FRECUENCIA_ANALISIS)) / FRECUENCIA_ANALISIS
+    senal = np.random.default_rng(0).normal(0, 0.002, len(t)).astype(np.float32)
+    for inicio, fin in tramos:
+        mascara = (t >= inicio) & (t < fin)
+        senal[mascara] += 0.5 * np.sin(2 * np.pi * 220 * t[mascara])
+    return senal
+
+
+def test_detectar_voz_encuentra_tramos_y_pausas():
+    senal = _senal([(0.3, 2.0), (2.6, 4.0), (4.05, 5.0)], 5.5)
+
+    tramos = detectar_voz(energia_por_tramas(senal))
+
+    # La pausa de 50 ms se considera parte de la voz; la de 600 ms separa tramos
+    assert len(tramos) == 2
+    assert tramos[0] == pytest.approx((0.3, 2.0), abs=0.05)
+    assert tramos[1] == pytest.approx((2.6, 5.0), abs=0.05)
+
+
+def test_silencio_sin_voz():
+    assert detectar_voz(energia_por_tramas(np.zeros(FRECUENCIA_ANALISIS, dtype=np.float32))) == []
+
+
+def test_dividir_en_lineas_por_frases_y_longitud():
+    lineas = dividir_en_lineas("Había una vez un dragón. Quería aprender a volar sin quemar las nubes del reino.", 30)
+
+    assert lineas[0] == "Había una vez un dragón."
+    assert all(len(linea) <= 30 for linea in lineas)
+    assert " ".join(lineas).split() == "Había una vez un dragón. Quería aprender a volar sin quemar las nubes del reino.".split()
+
+
+def test_cortes_se_ajustan_a_las_pausas():
+    lineas = ["Primera frase bastante larga.", "Segunda frase."]
+
+    resultado = alinear_lineas(lineas, [(0.3, 2.0), (2.6, 3.6)], 4.0)
+
+    assert resultado[0] == (pytest.approx(0.3), pytest.approx(2.0), lineas[0])
+    assert resultado[1] == (pytest.approx(2.6), pytest.approx(3.6), lineas[1])
+
+
+def test_reparto_proporcional_sin_voz():
+    resultado = alinear_lineas(["aaaa", "bbbbbbbb", "cccc"], [], 8.0)
+
+    assert [round(fin, 3) for _, fin, _ in resultado] == [2.0, 6.0, 8.0]
+    assert resultado[1][0] == pytest.approx(2.0)
@@ -0,0 +1,68 @@
+# tests/test_cancel_route.py
+
+# Prueba de la ruta de cancelación: el estado se cambia con una actualización condicional,
+# así una historia que un trabajador acaba de reclamar no queda marcada como cancelada.
+
+import pytest
+from flask import Flask
+from flask_jwt_extended import JWTManager, create_access_token
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from config.database import Base
+from models.models import Story, ChildProfile
+
+
+@pytest.fixture
+def entorno(tmp_path, monkeypatch):
+    from api import story_routes
+    engine = create_engine(f"sqlite:///{tmp_path / 'cancelar.db'}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    sesiones = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    monkeypatch.setattr(story_routes, "SessionLocal", sesiones)
+
+    with sesiones() as db:
+        db.add(ChildProfile(id="p1", nombre="Ana", edad=6, adulto_email="adulto@cuentix.com"))
+        db.add(Story(id="h1", profile_id="p1", status="pending"))
+        db.commit()
+
+    app = Flask(__name__)
+    app.config["JWT_SECRET_KEY"] = "secreto-de-prueba"
+    JWTManager(app)
+    app.register_blueprint(story_routes.stories_bp)
+    with app.test_request_context():
+        cabeceras = {"Authorization": f"Bearer {create_access_token(identity='adulto@cuentix.com')}"}
+    return app.test_client(), cabeceras, sesiones, story_routes
+
+
+def _estado(sesiones):
+    with sesiones() as db:
+        return db.get(Story, "h1").status
+
+
+def test_cancelar_en_cola(entorno, monkeypatch):
+    cliente, cabeceras, sesiones, story_routes = entorno
+    monkeypatch.setattr(story_routes, "cancel_story_generation", lambda story_id: {"en_cola": 1, "en_curso": 0})
+
+    respuesta = cliente.post("/api/stories/h1/cancel", headers=cabeceras)
+
+    assert respuesta.status_code == 202
+    assert respuesta.get_json()["status"] == "cancelled"
+    assert _estado(sesiones) == "cancelled"
+
+
+def test_reclamada_tras_la_lectura_no_se_marca_cancelada(entorno, monkeypatch):
+    cliente, cabeceras, sesiones, story_routes = entorno
+
+    def reclamada(story_id):
+        # Un trabajador la reclamó entre la lectura de la ruta y la cancelación
+        with sesiones() as db:
+            db.get(Story, story_id).status = "generating"
+            db.commit()
+        return {"en_cola": 0, "en_curso": 1}
+
+    monkeypatch.setattr(story_routes, "cancel_story_generation", reclamada)
+
+    respuesta = cliente.post("/api/stories/h1/cancel", headers=cabeceras)
+
+    assert respuesta.get_json()["status"] == "cancelling"
+    assert _estado(sesiones) == "generating"
@@ -0,0 +1,20 @@
+# tests/test_cancellation.py
+
+# Prueba unitaria del token de cancelación cooperativa.
+
+import pytest
+from core.cancellation import TokenCancelacion, GeneracionCancelada
+
+
+def test_token_sin_cancelar_no_lanza():
+    token = TokenCancelacion()
+    token.comprobar()
+    assert not token.cancelado
+
+
+def test_token_cancelado_lanza():
+    token = TokenCancelacion()
+    token.cancelar()
+    assert token.cancelado
+    with pytest.raises(GeneracionCancelada):
+        token.comprobar()
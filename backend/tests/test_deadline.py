@@ -0,0 +1,79 @@
+# tests/test_deadline.py
+
+# Prueba unitaria del plazo por historia: timeouts acotados por el presupuesto restante,
+# reintentos que no caben en el plazo y esperas por cuota que no se eternizan.
+
+import threading
+import time
+import pytest
+from tenacity import retry, stop_after_attempt, wait_fixed
+from core.deadline import Plazo, PlazoAgotado, limitar_timeout, sin_plazo_para_reintentar
+from core.rate_limiter import LimitadorProveedor
+from core.model_registry import RegistroModelos
+
+
+def test_timeout_limitado_por_el_plazo():
+    assert limitar_timeout(None, 60) == 60
+    assert limitar_timeout(Plazo(), 60) == 60
+    assert 9 < limitar_timeout(Plazo(10), 60) <= 10
+    assert limitar_timeout(Plazo(100), 30) == 30
+
+
+def test_plazo_vencido():
+    plazo = Plazo(0.01)
+    time.sleep(0.02)
+    assert plazo.vencido
+    with pytest.raises(PlazoAgotado):
+        plazo.comprobar("imagen")
+    with pytest.raises(PlazoAgotado):
+        plazo.timeout(60)
+
+
+def test_no_reintenta_si_no_cabe_en_el_plazo():
+    intentos = []
+
+    @retry(stop=stop_after_attempt(5) | sin_plazo_para_reintentar, wait=wait_fixed(10), reraise=True)
+    def llamar(plazo=None):
+        intentos.append(1)
+        raise ConnectionError("proveedor caído")
+
+    # El backoff de 10s no cabe en un plazo de 3s: un único intento
+    with pytest.raises(ConnectionError):
+        llamar(plazo=Plazo(3))
+    assert len(intentos) == 1
+
+
+def test_espera_por_cuota_respeta_el_plazo():
+    limitador = LimitadorProveedor("prueba", rpm=1, rafaga=1)
+    with limitador.reservar():
+        pass
+
+    # La siguiente petición tendría que esperar ~60s: con 0.2s de plazo se rechaza al momento
+    inicio = time.monotonic()
+    with pytest.raises(PlazoAgotado):
+        with limitador.reservar(plazo=Plazo(0.2)):
+            pass
+    assert time.monotonic() - inicio < 0.5
+
+
+def test_recurso_ocupado_respeta_el_plazo():
+    registro = RegistroModelos()
+    registro.registrar("whisper", lambda: object())
+    ocupado = threading.Event()
+    liberar = threading.Event()
+
+    def usar():
+        with registro.en_uso("whisper"):
+            ocupado.set()
+            liberar.wait(5)
+
+    hilo = threading.Thread(target=usar)
+    hilo.start()
+    ocupado.wait(5)
+    try:
+        with pytest.raises(PlazoAgotado):
+            with registro.en_uso("whisper", espera_max=0.1):
+                pass
+    finally:
+        liberar.set()
+        hilo.join()
@@ -0,0 +1,40 @@
+# tests/test_ffmpeg_utils.py
+
+# Prueba unitaria de las utilidades de ffmpeg: la duración se lee de la cabecera y un
+# ffmpeg colgado termina en RuntimeError en lugar de bloquear al trabajador.
+
+import subprocess
+from types import SimpleNamespace
+import pytest
+from config.settings import settings
+from core.processors import ffmpeg_utils
+
+
+@pytest.fixture(autouse=True)
+def ffmpeg_falso(monkeypatch):
+    monkeypatch.setattr(settings, "FFMPEG_BINARY", "ffmpeg-falso")
+
+
+def test_duracion_de_la_cabecera(monkeypatch):
+    llamadas = []
+
+    def run(comando, **kwargs):
+        llamadas.append(kwargs)
+        return SimpleNamespace(returncode=1, stderr="  Duration: 00:01:02.50, start: 0.000000")
+
+    monkeypatch.setattr(subprocess, "run", run)
+
+    assert ffmpeg_utils.duracion_medio("escena.m4a") == pytest.approx(62.5)
+    assert llamadas[0]["timeout"] == ffmpeg_utils.TIMEOUT_DURACION
+
+
+def test_ffmpeg_colgado_lanza_runtime_error(monkeypatch):
+    def run(comando, **kwargs):
+        raise subprocess.TimeoutExpired(comando, kwargs["timeout"])
+
+    monkeypatch.setattr(subprocess, "run", run)
+
+    with pytest.raises(RuntimeError):
+        ffmpeg_utils.duracion_medio("escena.m4a", timeout=1)
+    with pytest.raises(RuntimeError):
+        ffmpeg_utils.ejecutar_ffmpeg(["-i", "escena.m4a", "salida.mp4"], timeout=1)
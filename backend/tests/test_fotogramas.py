@@ -0,0 +1,95 @@
+# tests/test_fotogramas.py
+
+# Prueba unitaria de los fotogramas pre-renderizados: tamaño 720p, caché en disco
+# acotada expulsando lo usado hace más tiempo y fotogramas temporizados a partir del .srt.
+
+import os
+import pytest
+from PIL import Image
+from core.processors.fotogramas import CompositorFotogramas, limpiar_cache
+from utils.subtitulos import leer_srt
+
+
+@pytest.fixture
+def imagen(tmp_path):
+    ruta = tmp_path / "escena.png"
+    Image.new("RGB", (1024, 1024), (90, 140, 200)).save(ruta)
+    return str(ruta)
+
+
+@pytest.fixture
+def compositor(tmp_path):
+    return CompositorFotogramas(720, 720, cache_dir=str(tmp_path / "cache"))
+
+
+def test_fotograma_720p_con_texto(compositor, imagen):
+    ruta = compositor.fotograma(imagen, "Había una vez un dragón que quería volar.")
+    with Image.open(ruta) as fotograma:
+        assert fotograma.size == (720, 720)
+        # El subtítulo blanco aparece en la franja inferior, no en la superior
+        assert fotograma.crop((0, 600, 720, 720)).getextrema()[0][1] == 255
+        assert fotograma.crop((0, 0, 720, 100)).getextrema()[0][1] < 255
+
+
+def test_cache_de_fotogramas(compositor, imagen):
+    primera = compositor.fotograma(imagen, "Texto")
+    archivo = os.stat(primera).st_ino
+
+    # Un acierto solo marca el uso (fecha de modificación), no reescribe el PNG
+    assert compositor.fotograma(imagen, "Texto") == primera
+    assert os.stat(primera).st_ino == archivo
+    assert compositor.fotograma(imagen, "Otro texto") != primera
+
+
+def test_fotogramas_temporizados_desde_srt(compositor, imagen, tmp_path):
+    srt = tmp_path / "escena.srt"
+    srt.write_text(
+        "1\n00:00:00,500 --> 00:00:02,000\nHabía una vez\n\n"
+        "2\n00:00:02,000 --> 00:00:04,250\nun dragón\n\n",
+        encoding="utf-8"
+    )
+
+    assert leer_srt(str(srt)) == [(0.5, 2.0, "Había una vez"), (2.0, 4.25, "un dragón")]
+
+    tramos = compositor.fotogramas_srt(imagen, str(srt))
+    duraciones = [duracion for _, duracion in tramos]
+    assert duraciones[:-1] == pytest.approx([0.5, 1.5, 2.25])
+    # Hueco inicial y cola final sin texto comparten fotograma
+    assert tramos[0][0] == tramos[-1][0]
+    assert tramos[-1][1] is None
+
+
+def test_memoria_acotada_con_muchas_escenas(compositor, tmp_path):
+    resource = pytest.importorskip("resource")  # ru_maxrss: solo en Unix
+
+    def escena(i):
+        ruta = tmp_path / f"escena_{i}.png"
+        Image.new("RGB", (1024, 1024), (i * 7 % 256, 120, 200)).save(ruta)
+        return compositor.fotograma(str(ruta), f"Escena número {i}")
+
+    for i in range(3):
+        escena(i)
+    pico_inicial = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss  # KB en Linux
+
+    # Cada escena decodifica ~3 MB de imagen y ~1,5 MB de fotograma: si se retuvieran,
+    # 30 escenas superarían de largo el margen
+    for i in range(3, 33):
+        escena(i)
+    crecimiento_mb = (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - pico_inicial) / 1024
+    assert crecimiento_mb < 40
+
+
+def test_cache_expulsa_lo_usado_hace_mas_tiempo(tmp_path, imagen):
+    cache = tmp_path / "acotada"
+    compositor = CompositorFotogramas(720, 720, cache_dir=str(cache), max_bytes=0)
+    antiguo = compositor.fotograma(imagen, "Antiguo")
+    reciente = compositor.fotograma(imagen, "Reciente")
+    os.utime(antiguo, (1, 1))
+
+    limpiar_cache(str(cache), max_bytes=os.path.getsize(reciente), edad_min=60)
+
+    # El antiguo sale; el reciente se queda aunque la caché siga pasada de tamaño
+    assert not os.path.exists(antiguo)
+    assert os.path.exists(reciente)
+    # Un fotograma expulsado se vuelve a generar al pedirlo
+    assert os.path.exists(compositor.fotograma(imagen, "Antiguo"))
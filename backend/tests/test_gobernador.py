@@ -0,0 +1,39 @@
+# tests/test_gobernador.py
+
+# Prueba unitaria del gobernador de CPU: los núcleos se reparten entre trabajadores,
+# procesos de render y Whisper para que el total de hilos no supere los núcleos.
+
+import pytest
+from config.settings import settings, GobernadorCPU
+
+
+def _gobernador(**cambios):
+    return GobernadorCPU(settings.model_copy(update=cambios))
+
+
+def test_reparto_por_defecto_llena_los_nucleos():
+    gobernador = _gobernador(CPU_CORES=16, STORY_WORKERS=2, RENDER_PROCESSES=0, WHISPER_THREADS=0)
+
+    assert gobernador.nucleos_por_trabajador() == 8
+    assert gobernador.procesos_render() == 8
+    assert gobernador.hilos_ffmpeg() == 1
+    assert gobernador.hilos_torch() == 8
+
+
+def test_menos_procesos_de_render_reciben_mas_hilos():
+    gobernador = _gobernador(CPU_CORES=16, STORY_WORKERS=2, RENDER_PROCESSES=2)
+
+    assert gobernador.hilos_ffmpeg() == 4
+    assert 2 * gobernador.procesos_render() * gobernador.hilos_ffmpeg() == 16
+
+
+def test_perfil_render_y_argumentos():
+    gobernador = _gobernador(CPU_CORES=4, STORY_WORKERS=1, RENDER_PROCESSES=2, RENDER_PROFILE="rapido")
+
+    assert gobernador.perfil_render() == {"preset": "ultrafast", "crf": 28, "hilos": 2}
+    assert gobernador.argumentos_x264() == ["-preset", "ultrafast", "-crf", "28", "-threads", "2"]
+
+
+def test_perfil_desconocido():
+    with pytest.raises(ValueError):
+        _gobernador(RENDER_PROFILE="cine").perfil_render()
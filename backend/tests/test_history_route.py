@@ -0,0 +1,65 @@
+# tests/test_history_route.py
+
+# Prueba de la ruta de historial: solo lista las historias de los perfiles del adulto
+# e incluye la miniatura en cuanto existe, para que los listados no descarguen el video.
+
+import pytest
+from datetime import datetime
+from PIL import Image
+from flask import Flask
+from flask_jwt_extended import JWTManager, create_access_token
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from config.database import Base
+from models.models import Story, ChildProfile
+from core.processors import portadas
+from core.processors.portadas import GeneradorPortadas
+
+
+@pytest.fixture
+def entorno(tmp_path, monkeypatch):
+    from api import story_routes
+    monkeypatch.setattr(portadas, "PORTADAS_DIR", str(tmp_path / "portadas"))
+    engine = create_engine(f"sqlite:///{tmp_path / 'historial.db'}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    sesiones = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    monkeypatch.setattr(story_routes, "SessionLocal", sesiones)
+
+    with sesiones() as db:
+        db.add(ChildProfile(id="p1", nombre="Ana", edad=6, adulto_email="adulto@cuentix.com"))
+        db.add(ChildProfile(id="p2", nombre="Leo", edad=5, adulto_email="otro@cuentix.com"))
+        db.add(Story(id="h1", profile_id="p1", status="completed", created_at=datetime(2026, 1, 1)))
+        db.add(Story(id="h2", profile_id="p1", status="generating", created_at=datetime(2026, 1, 2)))
+        db.add(Story(id="h3", profile_id="p2", status="completed", created_at=datetime(2026, 1, 3)))
+        db.commit()
+
+    app = Flask(__name__)
+    app.config["JWT_SECRET_KEY"] = "secreto-de-prueba"
+    JWTManager(app)
+    app.register_blueprint(story_routes.stories_bp)
+    with app.test_request_context():
+        cabeceras = {"Authorization": f"Bearer {create_access_token(identity='adulto@cuentix.com')}"}
+    return app.test_client(), cabeceras
+
+
+def test_historial_con_miniaturas(entorno, tmp_path):
+    cliente, cabeceras = entorno
+    imagen = tmp_path / "escena.png"
+    Image.new("RGB", (64, 64), (90, 140, 200)).save(imagen)
+    GeneradorPortadas().generar_portada("h1", str(imagen))
+
+    historias = cliente.get("/api/stories/history", headers=cabeceras).get_json()
+
+    assert [h["id"] for h in historias] == ["h2", "h1"]
+    assert historias[1]["nombre"] == "Ana"
+    assert historias[1]["thumbnail_url"] == "/api/stories/h1/thumbnail"
+    assert historias[1]["video_url"] == "/api/stories/h1/download"
+    assert "thumbnail_url" not in historias[0] and "video_url" not in historias[0]
+
+
+def test_historial_con_limite(entorno):
+    cliente, cabeceras = entorno
+
+    historias = cliente.get("/api/stories/history?limite=1", headers=cabeceras).get_json()
+
+    assert [h["id"] for h in historias] == ["h2"]
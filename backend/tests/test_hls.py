@@ -0,0 +1,147 @@
+# tests/test_hls.py
+
+# Prueba unitaria del empaquetado HLS progresivo: las escenas se publican en orden,
+# una escena fallida no bloquea las siguientes y la playlist se cierra al terminar.
+# La ruta HLS se autoriza con el token firmado de la URL, sin cabecera Authorization.
+
+import os
+from flask import Flask
+from flask_jwt_extended import JWTManager, create_access_token
+from core.hls import EmpaquetadorHLS, leer_lista_segmentos, _bits
+
+VARIANTES = [
+    {"alto": 720, "video": "1800k", "audio": "128k"},
+    {"alto": 360, "video": "500k", "audio": "64k"},
+]
+
+
+class EmpaquetadorPrueba(EmpaquetadorHLS):
+    # Sin ffmpeg: cada escena produce dos trozos de 6 s y 2 s por variante
+    def _codificar(self, indice, ruta_segmento, plazo=None):
+        return [[(f"{self._nombre(v)}/e{indice:03d}_000.ts", 6.0), (f"{self._nombre(v)}/e{indice:03d}_001.ts", 2.0)]
+                for v in self.variantes]
+
+
+def _empaquetador(tmp_path):
+    return EmpaquetadorPrueba("h1", 720, 720, VARIANTES, 6.0, directorio=str(tmp_path / "h1"))
+
+
+def _leer(tmp_path, *partes):
+    with open(os.path.join(tmp_path, "h1", *partes), encoding="utf-8") as f:
+        return f.read()
+
+
+def test_escenas_se_publican_en_orden(tmp_path):
+    hls = _empaquetador(tmp_path)
+
+    hls.agregar_escena(1, "s1.mp4")
+    assert not os.path.exists(tmp_path / "h1" / "master.m3u8")
+
+    hls.agregar_escena(0, "s0.mp4")
+    playlist = _leer(tmp_path, "720p", "index.m3u8")
+    assert "#EXT-X-PLAYLIST-TYPE:EVENT" in playlist
+    assert playlist.index("e000_000.ts") < playlist.index("#EXT-X-DISCONTINUITY") < playlist.index("e001_000.ts")
+    assert "#EXT-X-ENDLIST" not in playlist
+
+
+def test_escena_omitida_no_bloquea_y_finalizar_cierra(tmp_path):
+    hls = _empaquetador(tmp_path)
+
+    hls.agregar_escena(1, "s1.mp4")
+    hls.omitir_escena(0)
+    hls.finalizar()
+
+    playlist = _leer(tmp_path, "360p", "index.m3u8")
+    assert "e000" not in playlist and "360p/e001_000.ts" in playlist
+    assert "#EXT-X-DISCONTINUITY" not in playlist
+    assert playlist.rstrip().endswith("#EXT-X-ENDLIST")
+
+
+def test_master_lista_variantes(tmp_path):
+    hls = _empaquetador(tmp_path)
+    hls.agregar_escena(0, "s0.mp4")
+
+    master = _leer(tmp_path, "master.m3u8")
+    assert "BANDWIDTH=1928000,RESOLUTION=720x720" in master
+    assert "BANDWIDTH=564000,RESOLUTION=360x360" in master
+    assert "360p/index.m3u8" in master
+
+
+def test_leer_lista_segmentos_y_bits(tmp_path):
+    ruta = tmp_path / "lista.csv"
+    ruta.write_text("e000_000.ts,0.000000,6.000000\ne000_001.ts,6.000000,8.500000\n", encoding="utf-8")
+
+    assert leer_lista_segmentos(str(ruta)) == [("e000_000.ts", 6.0), ("e000_001.ts", 2.5)]
+    assert _bits("1800k") == 1800000
+    assert _bits("1.5M") == 1500000
+
+
+def test_codificar_usa_el_pool_de_render(tmp_path, monkeypatch):
+    from core import render_pool
+    from config.settings import gobernador
+    llamadas = []
+
+    def ffmpeg_en_pool(argumentos, plazo=None, timeout=300):
+        llamadas.append(argumentos)
+        # Simula el muxer segment: una lista CSV por variante
+        for i, argumento in enumerate(argumentos):
+            if argumento == "-segment_list":
+                with open(argumentos[i + 1], "w", encoding="utf-8") as f:
+                    f.write("e000_000.ts,0.000000,6.000000\n")
+
+    monkeypatch.setattr(render_pool, "ejecutar_ffmpeg_en_pool", ffmpeg_en_pool)
+    monkeypatch.setattr(gobernador, "perfil_render", lambda: {"preset": "veryfast", "hilos": 4})
+    hls = EmpaquetadorHLS("h1", 720, 720, VARIANTES, 6.0, directorio=str(tmp_path / "h1"))
+
+    trozos = hls._codificar(0, "s0.mp4")
+
+    assert trozos == [[("720p/e000_000.ts", 6.0)], [("360p/e000_000.ts", 6.0)]]
+    # Un solo proceso de render: los hilos del perfil se reparten entre las variantes
+    argumentos = llamadas[0]
+    hilos = [argumentos[i + 1] for i, a in enumerate(argumentos) if a == "-threads"]
+    assert hilos == ["4", "2", "2"]
+
+
+def _cliente(tmp_path, monkeypatch):
+    from api import story_routes
+    monkeypatch.setattr(story_routes, "directorio_hls", lambda story_id: str(tmp_path / story_id))
+    app = Flask(__name__)
+    app.config["JWT_SECRET_KEY"] = "secreto-de-prueba"
+    JWTManager(app)
+    app.register_blueprint(story_routes.stories_bp)
+    return app, story_routes
+
+
+def test_ruta_hls_con_token_firmado(tmp_path, monkeypatch):
+    (tmp_path / "h1" / "720p").mkdir(parents=True)
+    (tmp_path / "h1" / "master.m3u8").write_text("#EXTM3U\n720p/index.m3u8\n", encoding="utf-8")
+    (tmp_path / "h1" / "720p" / "e000_000.ts").write_bytes(b"ts")
+    app, story_routes = _cliente(tmp_path, monkeypatch)
+
+    with app.test_request_context():
+        url = story_routes.url_playlist("h1")
+        otra = story_routes.url_playlist("h2")
+    cliente = app.test_client()
+
+    # Sin cabecera Authorization, como un <video src=...m3u8>
+    respuesta = cliente.get(url)
+    assert respuesta.status_code == 200
+    assert respuesta.headers["Cache-Control"] == "no-cache"
+    # Los trozos, pedidos por URL relativa, heredan el token
+    assert cliente.get(url.replace("master.m3u8", "720p/e000_000.ts")).data == b"ts"
+
+    # Un token de otra historia, o ninguno, no sirve
+    assert cliente.get(otra.replace("/h2/", "/h1/")).status_code == 401
+    assert cliente.get("/api/stories/h1/hls/master.m3u8").status_code == 404
+
+
+def test_token_hls_no_vale_como_jwt_de_la_api(tmp_path, monkeypatch):
+    app, story_routes = _cliente(tmp_path, monkeypatch)
+    with app.test_request_context():
+        token = story_routes.url_playlist("h1").split("/")[-2]
+        assert story_routes._token_hls_valido("h1", token)
+        # Un JWT de sesión tampoco abre el HLS
+        assert not story_routes._token_hls_valido("h1", create_access_token(identity="1"))
+
+    respuesta = app.test_client().get("/api/stories/queue", headers={"Authorization": f"Bearer {token}"})
+    assert respuesta.status_code in (401, 422)
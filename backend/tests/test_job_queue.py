@@ -0,0 +1,196 @@
+# tests/test_job_queue.py
+
+# Prueba unitaria de la cola persistente de trabajos: orden de llegada, reclamo único y leases.
+
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from config.database import Base
+from models.models import Story, StoryJob
+from core import job_queue
+
+
+def _fabrica_sesiones(ruta_db):
+    engine = create_engine(f"sqlite:///{ruta_db}", connect_args={"check_same_thread": False, "timeout": 30})
+    Base.metadata.create_all(bind=engine)
+    return sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+
+@pytest.fixture
+def ruta_db(tmp_path):
+    return str(tmp_path / "cola.db")
+
+
+@pytest.fixture
+def sesiones(ruta_db):
+    # Base SQLite temporal compartida por todos los "trabajadores" del test
+    return _fabrica_sesiones(ruta_db)
+
+
+def _crear_historia(sesiones, story_id):
+    db = sesiones()
+    db.add(Story(id=story_id, status="pending"))
+    db.commit()
+    db.close()
+
+
+def test_reclamar_en_orden_de_llegada(sesiones):
+    for i in range(3):
+        _crear_historia(sesiones, f"h{i}")
+        job_queue.encolar_trabajo(f"h{i}", {"nombre": f"N{i}"}, session_factory=sesiones)
+
+    assert job_queue.profundidad_cola(session_factory=sesiones) == 3
+
+    trabajo = job_queue.reclamar_trabajo("w1", session_factory=sesiones)
+    assert trabajo["story_id"] == "h0"
+    assert trabajo["datos"] == {"nombre": "N0"}
+    assert job_queue.profundidad_cola(session_factory=sesiones) == 2
+
+
+def test_cada_trabajo_se_reclama_una_sola_vez(sesiones):
+    for i in range(20):
+        _crear_historia(sesiones, f"h{i}")
+        job_queue.encolar_trabajo(f"h{i}", {}, session_factory=sesiones)
+
+    def reclamar_todo(worker_id):
+        reclamados = []
+        while True:
+            trabajo = job_queue.reclamar_trabajo(worker_id, session_factory=sesiones)
+            if trabajo is None:
+                return reclamados
+            reclamados.append(trabajo["id"])
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        resultados = list(executor.map(reclamar_todo, [f"w{i}" for i in range(4)]))
+
+    todos = [job_id for lote in resultados for job_id in lote]
+    assert len(todos) == 20
+    assert len(set(todos)) == 20
+
+
+def _reclamar_en_proceso(ruta_db, worker_id, resultados):
+    # Se ejecuta en un proceso aparte, como un trabajador en otro host
+    sesiones = _fabrica_sesiones(ruta_db)
+    while True:
+        trabajo = job_queue.reclamar_trabajo(worker_id, session_factory=sesiones)
+        if trabajo is None:
+            return
+        resultados.put(trabajo["id"])
+
+
+def test_varios_procesos_contra_la_misma_base(sesiones, ruta_db):
+    for i in range(30):
+        _crear_historia(sesiones, f"h{i}")
+        job_queue.encolar_trabajo(f"h{i}", {}, session_factory=sesiones)
+
+    contexto = multiprocessing.get_context("spawn")
+    resultados = contexto.Queue()
+    procesos = [
+        contexto.Process(target=_reclamar_en_proceso, args=(ruta_db, f"nodo{i}", resultados))
+        for i in range(3)
+    ]
+    for proceso in procesos:
+        proceso.start()
+    reclamados = [resultados.get(timeout=60) for _ in range(30)]
+    for proceso in procesos:
+        proceso.join(timeout=60)
+
+    assert len(set(reclamados)) == 30
+
+
+def test_lease_vencido_vuelve_a_la_cola(sesiones):
+    _crear_historia(sesiones, "h0")
+    job_queue.encolar_trabajo("h0", {}, session_factory=sesiones)
+    trabajo = job_queue.reclamar_trabajo("w1", session_factory=sesiones)
+
+    # Mientras el lease esté vigente, nadie lo recupera
+    assert job_queue.reencolar_expirados(session_factory=sesiones) == 0
+    assert job_queue.renovar_lease(trabajo["id"], "w1", session_factory=sesiones)
+
+    # Simula que el trabajador dejó de enviar latidos
+    db = sesiones()
+    db.query(StoryJob).filter_by(id=trabajo["id"]).update(
+        {StoryJob.lease_expires_at: datetime.utcnow() - timedelta(seconds=1)})
+    db.commit()
+    db.close()
+
+    assert job_queue.reencolar_expirados(session_factory=sesiones) == 1
+    nuevo = job_queue.reclamar_trabajo("w2", session_factory=sesiones)
+    assert nuevo["id"] == trabajo["id"]
+
+    # El trabajador antiguo ya no puede renovar ni cerrar el trabajo
+    assert not job_queue.renovar_lease(trabajo["id"], "w1", session_factory=sesiones)
+    assert not job_queue.finalizar_trabajo(trabajo["id"], True, worker_id="w1", session_factory=sesiones)
+    assert job_queue.finalizar_trabajo(trabajo["id"], True, worker_id="w2", session_factory=sesiones)
+
+
+def test_reparto_justo_entre_cuentas(sesiones):
+    # Una cuenta encola cinco historias y otra, una sola después
+    for i in range(5):
+        _crear_historia(sesiones, f"a{i}")
+        job_queue.encolar_trabajo(f"a{i}", {}, owner="escuela@cuentix.com", session_factory=sesiones)
+    _crear_historia(sesiones, "b0")
+    job_queue.encolar_trabajo("b0", {}, owner="familia@cuentix.com", session_factory=sesiones)
+
+    primero = job_queue.reclamar_trabajo("w1", session_factory=sesiones)
+    segundo = job_queue.reclamar_trabajo("w1", session_factory=sesiones)
+
+    assert primero["story_id"] == "a0"
+    assert segundo["story_id"] == "b0"
+    assert job_queue.profundidad_por_cuenta(session_factory=sesiones) == {
+        "escuela@cuentix.com": {"en_cola": 4, "en_curso": 1},
+        "familia@cuentix.com": {"en_cola": 0, "en_curso": 1},
+    }
+
+
+def test_prioridad_por_cuenta(sesiones, monkeypatch):
+    monkeypatch.setitem(job_queue.settings.ACCOUNT_PRIORITIES, "premium@cuentix.com", 1)
+
+    _crear_historia(sesiones, "normal")
+    job_queue.encolar_trabajo("normal", {}, owner="familia@cuentix.com", session_factory=sesiones)
+    _crear_historia(sesiones, "urgente")
+    job_queue.encolar_trabajo("urgente", {}, owner="premium@cuentix.com", session_factory=sesiones)
+
+    assert job_queue.reclamar_trabajo("w1", session_factory=sesiones)["story_id"] == "urgente"
+
+
+def test_cancelar_trabajos(sesiones):
+    for story_id in ("h1", "h2"):
+        _crear_historia(sesiones, story_id)
+        job_queue.encolar_trabajo(story_id, {}, session_factory=sesiones)
+
+    en_curso = job_queue.reclamar_trabajo("w1", session_factory=sesiones)
+    assert en_curso["story_id"] == "h1"
+
+    # En cola: se cancela al momento y ningún trabajador lo reclama
+    assert job_queue.cancelar_trabajos("h2", session_factory=sesiones) == {"en_cola": 1, "en_curso": 0}
+    assert job_queue.reclamar_trabajo("w2", session_factory=sesiones) is None
+
+    # En curso: solo se marca; el trabajador lo detecta y lo cierra como cancelado
+    assert not job_queue.cancelacion_solicitada(en_curso["id"], session_factory=sesiones)
+    assert job_queue.cancelar_trabajos("h1", session_factory=sesiones) == {"en_cola": 0, "en_curso": 1}
+    assert job_queue.cancelacion_solicitada(en_curso["id"], session_factory=sesiones)
+    assert job_queue.finalizar_trabajo(en_curso["id"], False, worker_id="w1", cancelado=True, session_factory=sesiones)
+
+    db = sesiones()
+    assert db.query(StoryJob).filter_by(id=en_curso["id"]).one().status == "cancelled"
+    db.close()
+
+
+def test_cancelado_con_lease_vencido_no_se_reencola(sesiones):
+    _crear_historia(sesiones, "h1")
+    job_queue.encolar_trabajo("h1", {}, session_factory=sesiones)
+    trabajo = job_queue.reclamar_trabajo("w1", session_factory=sesiones)
+    job_queue.cancelar_trabajos("h1", session_factory=sesiones)
+
+    db = sesiones()
+    db.query(StoryJob).filter_by(id=trabajo["id"]).update(
+        {StoryJob.lease_expires_at: datetime.utcnow() - timedelta(seconds=1)})
+    db.commit()
+    db.close()
+
+    assert job_queue.reencolar_expirados(session_factory=sesiones) == 0
+    assert job_queue.reclamar_trabajo("w2", session_factory=sesiones) is None
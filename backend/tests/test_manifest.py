@@ -0,0 +1,97 @@
+# tests/test_manifest.py
+
+# Prueba unitaria del manifiesto de artefactos: reutilización de etapas ya generadas
+# y descarte de artefactos cuando cambia el texto de la escena.
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from config.database import Base
+from models.models import Story
+from core.manifest import ManifiestoHistoria
+
+
+@pytest.fixture
+def sesiones(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'manifiesto.db'}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    fabrica = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    db = fabrica()
+    db.add(Story(id="h1", status="failed"))
+    db.commit()
+    db.close()
+    return fabrica
+
+
+def test_reanudar_solo_etapas_faltantes(sesiones, tmp_path):
+    manifiesto = ManifiestoHistoria.cargar("h1", session_factory=sesiones)
+    manifiesto.registrar_escena(0, "Había una vez un dragón.")
+    manifiesto.marcar_texto_completo(1)
+
+    imagen = tmp_path / "h1_00.png"
+    llamadas = []
+
+    def generar_imagen():
+        llamadas.append("imagen")
+        imagen.write_bytes(b"png")
+        return str(imagen)
+
+    assert manifiesto.etapa(0, "imagen", generar_imagen) == str(imagen)
+
+    # Un nuevo intento lee el manifiesto persistido y no repite la imagen
+    reanudado = ManifiestoHistoria.cargar("h1", session_factory=sesiones)
+    assert reanudado.contenido["texto_completo"]
+    assert reanudado.textos_escenas() == ["Había una vez un dragón."]
+    assert reanudado.etapa(0, "imagen", generar_imagen) == str(imagen)
+    assert llamadas == ["imagen"]
+
+    # El audio nunca se generó: sí se pide
+    assert reanudado.etapa(0, "audio", lambda: "") == ""
+    assert reanudado.artefacto(0, "audio") is None
+
+
+def test_cambio_de_texto_descarta_artefactos(sesiones, tmp_path):
+    imagen = tmp_path / "h1_00.png"
+    imagen.write_bytes(b"png")
+
+    manifiesto = ManifiestoHistoria.cargar("h1", session_factory=sesiones)
+    manifiesto.registrar_escena(0, "Texto original.")
+    manifiesto.registrar_artefacto(0, "imagen", str(imagen))
+    assert manifiesto.artefacto(0, "imagen") == str(imagen)
+
+    manifiesto.registrar_escena(0, "Texto distinto.")
+    assert manifiesto.artefacto(0, "imagen") is None
+
+
+def test_artefacto_borrado_de_disco_se_regenera(sesiones, tmp_path):
+    imagen = tmp_path / "h1_00.png"
+    imagen.write_bytes(b"png")
+
+    manifiesto = ManifiestoHistoria.cargar("h1", session_factory=sesiones)
+    manifiesto.registrar_escena(0, "Texto.")
+    manifiesto.registrar_artefacto(0, "imagen", str(imagen))
+    imagen.unlink()
+
+    assert manifiesto.artefacto(0, "imagen") is None
+
+
+def test_vista_previa_se_reutiliza_al_reanudar(sesiones, tmp_path):
+    vista_previa = tmp_path / "preview.mp4"
+    llamadas = []
+
+    def generar_vista_previa():
+        llamadas.append("vista_previa")
+        vista_previa.write_bytes(b"mp4")
+        return str(vista_previa)
+
+    manifiesto = ManifiestoHistoria.cargar("h1", session_factory=sesiones)
+    manifiesto.registrar_escena(0, "Había una vez un dragón.")
+    manifiesto.etapa(0, "vista_previa", generar_vista_previa)
+
+    reanudado = ManifiestoHistoria.cargar("h1", session_factory=sesiones)
+    assert reanudado.etapa(0, "vista_previa", generar_vista_previa) == str(vista_previa)
+    assert llamadas == ["vista_previa"]
+
+    # Con otro texto la escena es distinta: su vista previa deja de valer
+    reanudado.registrar_escena(0, "Había una vez un unicornio.")
+    assert reanudado.artefacto(0, "vista_previa") is None
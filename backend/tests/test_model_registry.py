@@ -0,0 +1,38 @@
+# tests/test_model_registry.py
+
+# Prueba unitaria del registro de modelos: carga única aunque lo pidan varios hilos a la vez.
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+from core.model_registry import RegistroModelos
+
+
+def test_carga_unica_entre_hilos():
+    cargas = []
+
+    def cargador():
+        cargas.append(1)
+        time.sleep(0.05)  # Simula leer pesos desde disco
+        return object()
+
+    registro = RegistroModelos()
+    registro.registrar("whisper", cargador)
+    assert registro.estado()["whisper"]["estado"] == "cold"
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        instancias = list(executor.map(lambda _: registro.obtener("whisper"), range(8)))
+
+    assert len(cargas) == 1
+    assert all(instancia is instancias[0] for instancia in instancias)
+    assert registro.estado()["whisper"]["estado"] == "warm"
+
+
+def test_precarga_tolera_errores():
+    def cargador_roto():
+        raise RuntimeError("sin pesos")
+
+    registro = RegistroModelos()
+    registro.registrar("whisper", cargador_roto)
+    registro.precargar(["whisper"])
+
+    assert registro.estado()["whisper"]["estado"] == "error"
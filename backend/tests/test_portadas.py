@@ -0,0 +1,48 @@
+# tests/test_portadas.py
+
+# Prueba unitaria de la vía rápida de portadas: portada JPEG/WebP y miniaturas desde la
+# ilustración de la primera escena, y URLs de la API solo para lo que ya existe.
+
+import pytest
+from PIL import Image
+from core.processors import portadas
+from core.processors.portadas import GeneradorPortadas, recursos_portada
+
+
+@pytest.fixture(autouse=True)
+def directorio(tmp_path, monkeypatch):
+    monkeypatch.setattr(portadas, "PORTADAS_DIR", str(tmp_path / "portadas"))
+
+
+@pytest.fixture
+def imagen(tmp_path):
+    ruta = tmp_path / "escena.png"
+    Image.new("RGB", (1024, 1024), (90, 140, 200)).save(ruta)
+    return str(ruta)
+
+
+def test_portada_y_miniaturas(imagen):
+    ruta = GeneradorPortadas().generar_portada("h1", imagen)
+
+    with Image.open(ruta) as portada:
+        assert portada.format == "WEBP" and portada.size == (720, 720)
+    with Image.open(portadas.ruta_portada("h1", "jpg")) as portada_jpg:
+        assert portada_jpg.format == "JPEG"
+    for tamano in portadas.TAMANOS_MINIATURA:
+        with Image.open(portadas.ruta_miniatura("h1", tamano)) as miniatura:
+            assert miniatura.size == (tamano, tamano)
+
+
+def test_recursos_solo_los_existentes(imagen):
+    assert recursos_portada("h1") == {}
+
+    GeneradorPortadas().generar_portada("h1", imagen)
+
+    assert recursos_portada("h1") == {
+        "poster_url": "/api/stories/h1/poster",
+        "thumbnail_url": "/api/stories/h1/thumbnail",
+    }
+
+
+def test_imagen_inexistente_no_rompe(tmp_path):
+    assert GeneradorPortadas().generar_portada("h1", str(tmp_path / "no_existe.png")) == ""
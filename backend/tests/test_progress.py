@@ -0,0 +1,99 @@
+# tests/test_progress.py
+
+# Prueba unitaria del progreso detallado: el pipeline guarda etapa y escenas en el trabajo
+# en curso y el bus reparte cada cambio a todos los suscriptores con una sola consulta.
+
+import json
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from config.database import Base
+from models.models import Story, StoryJob
+from core.progress import ProgresoHistoria, BusProgreso
+
+
+@pytest.fixture
+def sesiones(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'progreso.db'}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    fabrica = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    db = fabrica()
+    db.add(Story(id="h1", status="generating"))
+    db.add(StoryJob(story_id="h1", payload="{}", status="running"))
+    db.commit()
+    db.close()
+    return fabrica
+
+
+def test_progreso_se_guarda_en_el_trabajo(sesiones):
+    progreso = ProgresoHistoria("h1", session_factory=sesiones)
+    progreso.etapa("escenas")
+    progreso.escena_agregada()
+    progreso.escena_agregada()
+    progreso.total_escenas(2)
+    progreso.escena_terminada()
+
+    db = sesiones()
+    guardado = json.loads(db.query(StoryJob).filter_by(story_id="h1").one().progress)
+    db.close()
+
+    assert guardado["etapa"] == "escenas"
+    assert guardado["escenas_completadas"] == 1
+    assert guardado["escenas_total"] == 2
+    assert guardado["total_definitivo"] is True
+    assert guardado["eta_segundos"] is not None
+
+
+def test_bus_reparte_con_una_consulta(sesiones):
+    ProgresoHistoria("h1", session_factory=sesiones).etapa("texto")
+
+    bus = BusProgreso(session_factory=sesiones, intervalo=60)
+    bus._arrancar_hilo = lambda: None  # La prueba consulta a mano
+    colas = [bus.suscribir("h1") for _ in range(5)]
+
+    consultas = []
+    event.listen(sesiones.kw["bind"], "before_cursor_execute", lambda *a: consultas.append(a[2]))
+    bus.consultar()
+
+    # Dos sentencias (historias + progresos) para los cinco suscriptores
+    assert len(consultas) == 2
+    for cola in colas:
+        evento = cola.get_nowait()
+        assert evento["status"] == "generating"
+        assert evento["etapa"] == "texto"
+
+    # Sin cambios no se publica nada nuevo
+    bus.consultar()
+    assert all(cola.empty() for cola in colas)
+
+
+def test_nuevo_suscriptor_recibe_ultimo_estado(sesiones):
+    bus = BusProgreso(session_factory=sesiones, intervalo=60)
+    bus._arrancar_hilo = lambda: None
+    primera = bus.suscribir("h1")
+    bus.consultar()
+    primera.get_nowait()
+
+    segunda = bus.suscribir("h1")
+    assert segunda.get_nowait()["status"] == "generating"
+
+
+def test_escenas_canceladas_no_cuentan_como_terminadas():
+    from concurrent.futures import Future
+    from tasks.generate_story import _escena_terminada
+
+    class Contador:
+        terminadas = 0
+
+        def escena_terminada(self):
+            self.terminadas += 1
+
+    progreso = Contador()
+    hecha, cancelada = Future(), Future()
+    for futuro in (hecha, cancelada):
+        futuro.add_done_callback(lambda f: _escena_terminada(progreso, f))
+
+    hecha.set_result("segmento.mp4")
+    cancelada.cancel()
+
+    assert progreso.terminadas == 1
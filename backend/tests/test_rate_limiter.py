@@ -0,0 +1,111 @@
+# tests/test_rate_limiter.py
+
+# Prueba unitaria de los limitadores por proveedor: concurrencia máxima, ritmo por minuto y métricas,
+# y la cuota compartida entre trabajadores a través de la base de datos.
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from config.database import Base
+from config.settings import settings
+from models.models import ProviderQuota
+from core import rate_limiter
+from core.rate_limiter import LimitadorProveedor, CuboCompartido
+
+
+def test_maximo_en_curso():
+    limitador = LimitadorProveedor("openai_images", max_en_curso=2)
+    activas = []
+    maximo = []
+    lock = threading.Lock()
+
+    def llamada(_):
+        with limitador.reservar():
+            with lock:
+                activas.append(1)
+                maximo.append(len(activas))
+            time.sleep(0.05)
+            with lock:
+                activas.pop()
+
+    with ThreadPoolExecutor(max_workers=6) as executor:
+        list(executor.map(llamada, range(6)))
+
+    assert max(maximo) == 2
+    assert limitador.metricas()["llamadas"] == 6
+    assert limitador.metricas()["en_curso"] == 0
+
+
+def test_ritmo_de_peticiones_por_minuto():
+    # 600 rpm = una petición cada 0.1 s, sin ráfaga acumulada
+    limitador = LimitadorProveedor("openai_tts", rpm=600, rafaga=1)
+
+    inicio = time.monotonic()
+    for _ in range(4):
+        with limitador.reservar():
+            pass
+    duracion = time.monotonic() - inicio
+
+    assert duracion >= 0.25
+    assert limitador.metricas()["espera_total_s"] >= 0.25
+
+
+def test_penalizar_tras_429_frena_el_ritmo():
+    limitador = LimitadorProveedor("deepseek", rpm=600)
+
+    with limitador.reservar():
+        pass
+    limitador.penalizar()
+
+    inicio = time.monotonic()
+    with limitador.reservar():
+        pass
+    assert time.monotonic() - inicio >= 0.05
+
+
+def _fabrica_sesiones(ruta_db):
+    engine = create_engine(f"sqlite:///{ruta_db}", connect_args={"check_same_thread": False, "timeout": 30})
+    Base.metadata.create_all(bind=engine)
+    return sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+
+def test_cuota_compartida_entre_trabajadores(tmp_path):
+    # Dos "trabajadores" con su propio limitador y la misma base: 600 rpm en total, no por cada uno
+    sesiones = _fabrica_sesiones(tmp_path / "cuotas.db")
+    trabajadores = [LimitadorProveedor("openai_tts", rpm=600, rafaga=1, session_factory=sesiones) for _ in range(2)]
+
+    def llamadas(limitador):
+        for _ in range(3):
+            with limitador.reservar():
+                pass
+
+    inicio = time.monotonic()
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        list(executor.map(llamadas, trabajadores))
+
+    # 6 peticiones a una cada 0.1 s (la primera sale del cubo lleno)
+    assert time.monotonic() - inicio >= 0.45
+
+
+def test_cuota_compartida_sin_plazo_no_consume(tmp_path):
+    sesiones = _fabrica_sesiones(tmp_path / "cuotas.db")
+    cubo = CuboCompartido("deepseek:peticiones", 60, 1, session_factory=sesiones)
+
+    assert cubo.adquirir(1)
+    assert not cubo.adquirir(1, espera_max=0.1)  # el siguiente hueco está a 1 s
+
+    cubo.vaciar()
+    with sesiones() as db:
+        assert db.get(ProviderQuota, "deepseek:peticiones").disponibles == 0
+
+
+def test_en_curso_se_reparte_entre_trabajadores(monkeypatch):
+    monkeypatch.setattr(settings, "STORY_WORKERS", 2)
+    monkeypatch.setattr(settings, "PROVIDER_LIMITS", {"prueba_reparto": {"max_en_curso": 4}})
+    monkeypatch.setattr(rate_limiter, "_limitadores", {})
+
+    limitador = rate_limiter.obtener_limitador("prueba_reparto")
+
+    assert limitador.en_curso._initial_value == 2
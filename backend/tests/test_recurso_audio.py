@@ -0,0 +1,73 @@
+# tests/test_recurso_audio.py
+
+# Prueba unitaria del RecursoAudio: la narración se decodifica una sola vez aunque la pidan
+# varias etapas a la vez, las narraciones largas quedan mapeadas en memoria y al proceso de
+# render solo viajan la ruta y la duración.
+
+import os
+import pickle
+import threading
+import numpy as np
+import pytest
+from core.processors import recurso_audio
+from core.processors.recurso_audio import RecursoAudio, FRECUENCIA_PCM
+
+
+class RecursoPrueba(RecursoAudio):
+    # Sin ffmpeg: escribe `segundos` de un tono como PCM float32 y cuenta las decodificaciones
+    segundos = 2.0
+
+    def _extraer_pcm(self, ruta_pcm, timeout):
+        self.decodificaciones = getattr(self, "decodificaciones", 0) + 1
+        t = np.arange(int(self.segundos * self.frecuencia)) / self.frecuencia
+        (0.5 * np.sin(2 * np.pi * 220 * t)).astype(np.float32).tofile(ruta_pcm)
+
+
+def test_decodifica_una_sola_vez_entre_hilos(tmp_path):
+    recurso = RecursoPrueba(str(tmp_path / "escena.m4a"))
+    resultados = []
+    hilos = [threading.Thread(target=lambda: resultados.append(recurso.cargar())) for _ in range(4)]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+
+    assert recurso.decodificaciones == 1
+    assert all(muestras is resultados[0] for muestras in resultados)
+    assert resultados[0].dtype == np.float32
+    assert recurso.duracion == pytest.approx(2.0)
+
+
+def test_narracion_larga_mapeada_y_liberada(tmp_path, monkeypatch):
+    monkeypatch.setattr(recurso_audio, "UMBRAL_MEMMAP_BYTES", 1024)
+    recurso = RecursoPrueba(str(tmp_path / "escena.m4a"))
+
+    muestras = recurso.cargar()
+    ruta_pcm = recurso._ruta_pcm
+
+    assert isinstance(muestras, np.memmap)
+    assert len(muestras) == 2 * FRECUENCIA_PCM
+    assert os.path.exists(ruta_pcm)
+    del muestras
+    recurso.liberar()
+    assert not os.path.exists(ruta_pcm)
+    assert recurso.duracion == pytest.approx(2.0)
+
+
+def test_al_proceso_de_render_solo_viajan_ruta_y_duracion(tmp_path):
+    recurso = RecursoPrueba(str(tmp_path / "escena.m4a"))
+    recurso.cargar()
+
+    copia = pickle.loads(pickle.dumps(recurso))
+
+    assert copia._muestras is None
+    assert os.fspath(copia) == recurso.ruta
+    assert copia.duracion == pytest.approx(2.0)
+
+
+def test_de_acepta_rutas_y_recursos(tmp_path):
+    ruta = str(tmp_path / "escena.m4a")
+    recurso = RecursoAudio.de(ruta)
+
+    assert recurso.ruta == os.path.abspath(ruta)
+    assert RecursoAudio.de(recurso) is recurso
@@ -0,0 +1,41 @@
+# tests/test_render_pool.py
+
+# Prueba unitaria del pool de render: si un proceso de render muere y el pool se rompe,
+# el pool roto se cierra y el siguiente render crea uno nuevo.
+
+import pytest
+from concurrent.futures.process import BrokenProcessPool
+from core import render_pool
+
+
+class PoolRoto:
+    def __init__(self):
+        self.cerrado = None
+
+    def submit(self, *args, **kwargs):
+        raise BrokenProcessPool("un proceso de render murió")
+
+    def shutdown(self, wait=True, cancel_futures=False):
+        self.cerrado = (wait, cancel_futures)
+
+
+def test_pool_roto_se_cierra_y_se_descarta(monkeypatch):
+    roto = PoolRoto()
+    monkeypatch.setattr(render_pool, "_pool", roto)
+
+    resultado = render_pool.renderizar_segmento("ffmpeg", "escena.png", "escena.m4a", "texto", "seg.mp4")
+
+    assert resultado == ""
+    assert roto.cerrado == (False, True)
+    assert render_pool._pool is None
+
+
+def test_ffmpeg_en_pool_roto_relanza_y_descarta(monkeypatch):
+    roto = PoolRoto()
+    monkeypatch.setattr(render_pool, "_pool", roto)
+
+    with pytest.raises(BrokenProcessPool):
+        render_pool.ejecutar_ffmpeg_en_pool(["-i", "seg.mp4", "salida.ts"])
+
+    assert roto.cerrado == (False, True)
+    assert render_pool._pool is None
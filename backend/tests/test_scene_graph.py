@@ -0,0 +1,90 @@
+# tests/test_scene_graph.py
+
+# Prueba unitaria del ejecutor de grafos de escena: paralelismo entre imagen y audio,
+# orden de dependencias y propagación de errores.
+
+import threading
+import time
+import pytest
+from config.settings import settings, gobernador
+from core.scene_graph import EjecutorEtapas, GrafoEscena, escenas_simultaneas
+
+
+@pytest.fixture
+def ejecutor():
+    ejecutor = EjecutorEtapas({"imagen": 1, "audio": 1, "subtitulos": 1, "video": 1})
+    yield ejecutor
+    ejecutor.cerrar()
+
+
+def test_imagen_y_audio_en_paralelo(ejecutor):
+    # Ambas etapas deben estar en curso a la vez para pasar la barrera
+    barrera = threading.Barrier(2, timeout=5)
+
+    def etapa(nombre):
+        barrera.wait()
+        time.sleep(0.05)
+        return nombre
+
+    grafo = GrafoEscena(ejecutor)
+    grafo.agregar("imagen", "imagen", lambda: etapa("img.png"))
+    grafo.agregar("audio", "audio", lambda: etapa("voz.mp3"))
+    grafo.agregar("clip", "video", lambda imagen, audio: f"{imagen}+{audio}", depende_de=["imagen", "audio"])
+
+    inicio = time.monotonic()
+    resultados = grafo.ejecutar()
+
+    assert resultados["clip"] == "img.png+voz.mp3"
+    assert time.monotonic() - inicio < 0.1 * 2
+
+
+def test_dependencias_en_orden(ejecutor):
+    orden = []
+
+    def registrar(nombre, valor=None):
+        orden.append(nombre)
+        return valor or nombre
+
+    grafo = GrafoEscena(ejecutor)
+    grafo.agregar("audio", "audio", lambda: registrar("audio"))
+    grafo.agregar("subtitulo", "subtitulos", lambda audio: registrar("subtitulo", audio + ".srt"), depende_de=["audio"])
+    grafo.agregar("clip", "video", lambda audio, subtitulo: registrar("clip"), depende_de=["audio", "subtitulo"])
+
+    resultados = grafo.ejecutar()
+
+    assert orden == ["audio", "subtitulo", "clip"]
+    assert resultados["subtitulo"] == "audio.srt"
+
+
+def test_error_en_etapa_se_propaga(ejecutor):
+    llamado = []
+
+    def fallar():
+        raise RuntimeError("TTS caído")
+
+    grafo = GrafoEscena(ejecutor)
+    grafo.agregar("audio", "audio", fallar)
+    grafo.agregar("subtitulo", "subtitulos", lambda audio: llamado.append(audio), depende_de=["audio"])
+
+    with pytest.raises(RuntimeError):
+        grafo.ejecutar()
+    assert llamado == []
+
+
+def test_dependencia_inexistente(ejecutor):
+    with pytest.raises(ValueError):
+        GrafoEscena(ejecutor).agregar("clip", "video", lambda imagen: imagen, depende_de=["imagen"])
+
+
+def test_escenas_simultaneas_segun_pools_y_gobernador(monkeypatch):
+    monkeypatch.setattr(settings, "SCENE_POOL_IMAGE", 4)
+    monkeypatch.setattr(settings, "SCENE_POOL_AUDIO", 4)
+    monkeypatch.setattr(settings, "SCENE_POOL_SUBTITLES", 2)
+    monkeypatch.setattr(settings, "SCENE_POOL_VIDEO", 0)
+
+    monkeypatch.setattr(gobernador, "procesos_render", lambda: 2)
+    assert escenas_simultaneas() == 4
+
+    # Con más procesos de render, más escenas en curso para que ninguno quede ocioso
+    monkeypatch.setattr(gobernador, "procesos_render", lambda: 8)
+    assert escenas_simultaneas() == 8
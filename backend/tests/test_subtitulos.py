@@ -0,0 +1,62 @@
+# tests/test_subtitulos.py
+
+# Prueba unitaria de la unión de subtítulos: los .srt de cada escena se desplazan
+# según la duración de las escenas anteriores y se escriben en SRT y WebVTT.
+
+import pytest
+from utils.subtitulos import leer_srt, escribir_srt, escribir_vtt, unir_subtitulos, formatear_tiempo
+
+
+def _srt(tmp_path, nombre, lineas):
+    return escribir_srt(lineas, str(tmp_path / nombre))
+
+
+def test_formatear_tiempo():
+    assert formatear_tiempo(3725.5) == "01:02:05,500"
+    assert formatear_tiempo(1.25, ".") == "00:00:01.250"
+
+
+def test_unir_desplaza_por_duracion_de_escena(tmp_path):
+    primera = _srt(tmp_path, "a.srt", [(0.0, 1.5, "Había una vez"), (1.5, 3.0, "un dragón")])
+    segunda = _srt(tmp_path, "b.srt", [(0.2, 2.0, "que quería volar")])
+
+    lineas = unir_subtitulos([(primera, 4.0), (None, 2.5), (segunda, 3.0)])
+
+    assert [texto for _, _, texto in lineas] == ["Había una vez", "un dragón", "que quería volar"]
+    assert lineas[2][0] == pytest.approx(6.7)
+    assert lineas[2][1] == pytest.approx(8.5)
+
+
+def test_unir_recorta_al_final_de_la_escena(tmp_path):
+    escena = _srt(tmp_path, "a.srt", [(0.0, 2.0, "hola"), (2.0, 5.2, "adiós"), (5.1, 6.0, "fuera")])
+
+    lineas = unir_subtitulos([(escena, 5.0)])
+
+    assert lineas[-1] == (pytest.approx(2.0), pytest.approx(5.0), "adiós")
+    assert len(lineas) == 2
+
+
+def test_escribir_vtt_y_releer(tmp_path):
+    lineas = [(0.0, 1.0, "uno"), (61.5, 63.0, "dos")]
+    ruta_vtt = escribir_vtt(lineas, str(tmp_path / "h.vtt"))
+    contenido = open(ruta_vtt, encoding="utf-8").read()
+
+    assert contenido.startswith("WEBVTT\n\n")
+    assert "00:01:01.500 --> 00:01:03.000\ndos" in contenido
+    assert leer_srt(escribir_srt(lineas, str(tmp_path / "h.srt"))) == lineas
+
+
+def test_transcripcion_whisper_se_escribe_con_escribir_srt(tmp_path, monkeypatch):
+    from core.processors import subtitles_generator
+    from core.processors.subtitles_generator import SubtitlesGenerator
+
+    ruta_audio = tmp_path / "escena.m4a"
+    ruta_audio.write_bytes(b"")
+    monkeypatch.setattr(subtitles_generator.servicio_transcripcion, "transcribir", lambda audio, plazo=None: [
+        {"start": 0.0, "end": 1.25, "text": " Había una vez "},
+        {"start": 1.25, "end": 61.5, "text": "un dragón"},
+    ])
+
+    ruta_srt = SubtitlesGenerator(motor="alineacion")._transcribir(str(ruta_audio), str(tmp_path / "escena.srt"))
+
+    assert leer_srt(ruta_srt) == [(0.0, 1.25, "Había una vez"), (1.25, 61.5, "un dragón")]
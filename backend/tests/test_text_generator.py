@@ -37,3 +37,120 @@ def test_generar_texto_basico(generador_texto):
     # Validar que incluye las etiquetas de estructura
     assert any(seccion in resultado for seccion in ["[Intro]", "[Conflicto]", "[Resolucion]", "[Moraleja]"]), \
         "El cuento debe contener las secciones estructuradas [Intro], [Conflicto], [Resolucion], [Moraleja]."
+
+
+def _trocear(texto, tamano=7):
+    # Simula los deltas de una respuesta en streaming
+    return [texto[i:i + tamano] for i in range(0, len(texto), tamano)]
+
+
+def test_detector_escenas_con_etiquetas():
+    """
+    Cada escena se cierra al llegar la etiqueta siguiente y se descarta la cabecera.
+    """
+    from core.processors.text_generator import DetectorEscenas
+
+    cuento = (
+        "[Intro] (20-25s):\n"
+        "Fluffy vivía en el bosque.\n\n"
+        "[Conflicto] (30-40s):\n"
+        "Llegó un búho gruñón.\n\n"
+        "[Resolución] (30-40s):\n"
+        "1. Encontró una flor.\n"
+        "2. *¡Zas!* La flor brilló.\n\n"
+        "[Moraleja]: Siempre hay luz."
+    )
+
+    detector = DetectorEscenas()
+    cerradas_durante_stream = []
+    for fragmento in _trocear(cuento):
+        cerradas_durante_stream += detector.alimentar(fragmento)
+    escenas = cerradas_durante_stream + detector.cerrar()
+
+    assert escenas == [
+        "Fluffy vivía en el bosque.",
+        "Llegó un búho gruñón.",
+        "1. Encontró una flor.\n2. *¡Zas!* La flor brilló.",
+        "Siempre hay luz.",
+    ]
+    # Las tres primeras escenas se entregan antes de que termine el texto
+    assert len(cerradas_durante_stream) == 3
+
+
+def test_detector_escenas_por_parrafos():
+    """
+    Sin etiquetas, cada párrafo cerrado es una escena (mismo criterio que el modo sin streaming).
+    """
+    from core.processors.text_generator import DetectorEscenas, dividir_texto_en_escenas
+
+    cuento = "Había una vez un dragón.\n\nQuería volar.\nY voló muy alto."
+
+    detector = DetectorEscenas()
+    escenas = []
+    for fragmento in _trocear(cuento, 3):
+        escenas += detector.alimentar(fragmento)
+    escenas += detector.cerrar()
+
+    assert escenas == ["Había una vez un dragón.", "Quería volar.", "Y voló muy alto."]
+    assert dividir_texto_en_escenas(cuento) == escenas
+
+
+def test_stream_reintenta_429_al_abrirse(monkeypatch):
+    """
+    Un 429 al abrir el stream se reintenta (aún no se entregó ninguna escena).
+    """
+    import openai
+    from types import SimpleNamespace as N
+    from core.processors import text_generator
+    from core.processors.text_generator import TextGenerator
+    from core.rate_limiter import LimitadorProveedor
+
+    # Cuota local del proceso: la prueba no toca la base de datos compartida
+    monkeypatch.setattr(text_generator, "obtener_limitador", lambda proveedor: LimitadorProveedor(proveedor))
+
+    class Limite(openai.RateLimitError):
+        def __init__(self):
+            Exception.__init__(self, "429")
+
+    def chunk(texto):
+        return N(choices=[N(delta=N(content=texto))])
+
+    class Completions:
+        llamadas = 0
+
+        def create(self, **kwargs):
+            Completions.llamadas += 1
+            if Completions.llamadas == 1:
+                raise Limite()
+            return iter([chunk("Había una vez.\n"), chunk("Fin.")])
+
+    generador = TextGenerator.__new__(TextGenerator)
+    generador.client = N(chat=N(completions=Completions()))
+
+    assert list(generador.generar_escenas_stream("prompt")) == ["Había una vez.", "Fin."]
+    assert Completions.llamadas == 2
+
+
+def test_generar_cuento_usa_generate_text(monkeypatch):
+    """
+    generar_cuento solo construye el prompt: la petición es la misma que la de generate_text.
+    """
+    from core.processors.text_generator import TextGenerator
+
+    generador = TextGenerator.__new__(TextGenerator)
+    prompts = []
+
+    def generate_text(prompt, plazo=None):
+        prompts.append(prompt)
+        return "[Intro] Había una vez."
+
+    monkeypatch.setattr(generador, "generate_text", generate_text)
+
+    datos = {
+        "nombre": "Lucas", "edad": 6, "personaje_principal": "Dragón", "lugar": "Bosque encantado",
+        "villano": "Robot descontrolado", "objeto_magico": "Lupa mágica", "tipo_final": "Final feliz"
+    }
+
+    assert generador.generar_cuento(datos) == "[Intro] Había una vez."
+    assert len(prompts) == 1
+    assert "Lucas" in prompts[0] and "{nombre}" not in prompts[0]
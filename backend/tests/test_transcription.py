@@ -0,0 +1,134 @@
+# tests/test_transcription.py
+
+# Prueba unitaria del servicio de transcripción por lotes: los audios que llegan mientras
+# se procesa un lote se agrupan en el siguiente, la cola tiene tope y cada escena
+# recibe sus segmentos por su Future.
+
+import threading
+import pytest
+from core.deadline import Plazo, PlazoAgotado
+from core.transcription import ServicioTranscripcion, ColaTranscripcionLlena, segmentos_desde_tokens
+
+
+class LoteBloqueante:
+    """Procesador de lotes falso: el primer lote espera a que se le dé paso."""
+
+    def __init__(self):
+        self.lotes = []
+        self.paso = threading.Event()
+        self.empezado = threading.Event()
+
+    def __call__(self, rutas):
+        self.lotes.append(list(rutas))
+        self.empezado.set()
+        self.paso.wait(5)
+        return [[{"start": 0.0, "end": 1.0, "text": ruta}] for ruta in rutas]
+
+
+def test_audios_en_espera_se_agrupan_en_un_lote():
+    procesador = LoteBloqueante()
+    servicio = ServicioTranscripcion(procesador, max_lote=8, espera_lote=0.0, max_cola=16)
+
+    primero = servicio.enviar("a0")
+    assert procesador.empezado.wait(5)
+    resto = [servicio.enviar(f"a{i}") for i in range(1, 6)]
+    procesador.paso.set()
+
+    assert primero.result(5)[0]["text"] == "a0"
+    assert [f.result(5)[0]["text"] for f in resto] == ["a1", "a2", "a3", "a4", "a5"]
+    assert procesador.lotes == [["a0"], ["a1", "a2", "a3", "a4", "a5"]]
+
+    metricas = servicio.metricas()
+    assert metricas["lotes"] == 2 and metricas["audios"] == 6
+    assert metricas["tamano_medio_lote"] == pytest.approx(3.0)
+
+
+def test_tope_de_cola():
+    procesador = LoteBloqueante()
+    servicio = ServicioTranscripcion(procesador, max_lote=1, espera_lote=0.0, max_cola=1)
+
+    servicio.enviar("a0")
+    assert procesador.empezado.wait(5)
+    servicio.enviar("a1")
+    with pytest.raises(ColaTranscripcionLlena):
+        servicio.enviar("a2", espera_max=0.05)
+    procesador.paso.set()
+
+
+def test_plazo_agotado_esperando_resultado():
+    procesador = LoteBloqueante()
+    servicio = ServicioTranscripcion(procesador, max_lote=1, espera_lote=0.0, max_cola=4)
+
+    with pytest.raises(PlazoAgotado):
+        servicio.transcribir("a0", plazo=Plazo(0.1))
+    procesador.paso.set()
+
+
+def test_error_del_lote_llega_a_cada_escena():
+    def falla(rutas):
+        raise RuntimeError("modelo caído")
+
+    servicio = ServicioTranscripcion(falla, max_lote=4, espera_lote=0.0, max_cola=4)
+    with pytest.raises(RuntimeError, match="modelo caído"):
+        servicio.enviar("a0").result(5)
+
+
+class TokenizerFalso:
+    timestamp_begin = 1000
+
+    def decode(self, tokens):
+        return " ".join(f"p{t}" for t in tokens)
+
+
+def test_segmentos_desde_tokens():
+    # <|0.00|> 1 2 <|1.20|><|1.20|> 3 <|2.50|>
+    tokens = [1000, 1, 2, 1060, 1060, 3, 1125]
+
+    segmentos = segmentos_desde_tokens(tokens, TokenizerFalso())
+
+    assert segmentos == [
+        {"start": 0.0, "end": pytest.approx(1.2), "text": "p1 p2"},
+        {"start": pytest.approx(1.2), "end": pytest.approx(2.5), "text": "p3"},
+    ]
+
+
+def test_segmentos_faster_misma_estructura_con_palabras():
+    from types import SimpleNamespace as N
+    from core.transcription import segmentos_faster
+
+    segmentos = [
+        N(start=0.0, end=1.5, text=" Había una vez", words=[
+            N(start=0.0, end=0.4, word=" Había"), N(start=0.4, end=0.7, word=" una"),
+            N(start=0.7, end=1.5, word=" vez"),
+        ]),
+        N(start=1.5, end=2.0, text="  ", words=None),
+    ]
+
+    resultado = segmentos_faster(segmentos)
+
+    assert resultado == [{
+        "start": 0.0, "end": 1.5, "text": "Había una vez",
+        "words": [
+            {"start": 0.0, "end": 0.4, "word": "Había"},
+            {"start": 0.4, "end": 0.7, "word": "una"},
+            {"start": 0.7, "end": 1.5, "word": "vez"},
+        ],
+    }]
+
+
+def test_motor_desconocido_falla(monkeypatch):
+    from config.settings import settings
+    from core import transcription
+
+    monkeypatch.setattr(settings, "WHISPER_ENGINE", "otro")
+    with pytest.raises(ValueError):
+        transcription.transcribir_lote(["escena.m4a"])
+
+
+def test_segmentos_desde_tokens_sin_cierre_acaba_con_el_clip():
+    # <|0.00|> 1 <|1.20|><|1.20|> 2 3 (sin marca de cierre), en un clip de 4 s
+    tokens = [1000, 1, 1060, 1060, 2, 3]
+
+    segmentos = segmentos_desde_tokens(tokens, TokenizerFalso(), duracion=4.0)
+
+    assert segmentos[-1] == {"start": pytest.approx(1.2), "end": 4.0, "text": "p2 p3"}
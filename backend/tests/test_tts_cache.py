@@ -0,0 +1,109 @@
+# tests/test_tts_cache.py
+
+# Prueba unitaria de la caché de narraciones: un acierto no vuelve a sintetizar, peticiones
+# simultáneas de la misma clave comparten una síntesis y el tamaño se acota expulsando lo
+# usado hace más tiempo.
+
+import os
+import threading
+import time
+from core.tts_cache import CacheTTS, clave_tts
+
+
+def _sintetizador(ruta, contenido=b"audio", llamadas=None, espera=0.0):
+    def generar():
+        if llamadas is not None:
+            llamadas.append(ruta)
+        time.sleep(espera)
+        with open(ruta, "wb") as f:
+            f.write(contenido)
+        return ruta
+    return generar
+
+
+def test_clave_normaliza_el_texto_y_distingue_voz():
+    base = clave_tts("openai", "alloy", "tts-1", ".m4a", "Había una vez")
+    assert clave_tts("openai", "alloy", "tts-1", ".m4a", "  Había\n una   vez ") == base
+    assert clave_tts("openai", "nova", "tts-1", ".m4a", "Había una vez") != base
+    assert clave_tts("openai", "alloy", "tts-1", ".mp3", "Había una vez") != base
+
+
+def test_acierto_copia_sin_sintetizar(tmp_path):
+    cache = CacheTTS(str(tmp_path / "cache"), max_bytes=1024)
+    llamadas = []
+
+    ruta_a, ruta_b = str(tmp_path / "a.m4a"), str(tmp_path / "b.m4a")
+    primera = cache.obtener_o_generar("k", ruta_a, _sintetizador(ruta_a, llamadas=llamadas))
+    segunda = cache.obtener_o_generar("k", ruta_b, _sintetizador(ruta_b, llamadas=llamadas))
+
+    assert len(llamadas) == 1
+    assert primera == ruta_a
+    with open(segunda, "rb") as f:
+        assert f.read() == b"audio"
+    metricas = cache.metricas()
+    assert (metricas["aciertos"], metricas["fallos"]) == (1, 1)
+
+
+def test_peticiones_simultaneas_comparten_una_sintesis(tmp_path):
+    cache = CacheTTS(str(tmp_path / "cache"), max_bytes=1024)
+    llamadas = []
+    resultados = []
+
+    def pedir(i):
+        ruta = str(tmp_path / f"escena_{i}.m4a")
+        resultados.append(cache.obtener_o_generar("k", ruta, _sintetizador(ruta, llamadas=llamadas, espera=0.2)))
+
+    hilos = [threading.Thread(target=pedir, args=(i,)) for i in range(4)]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+
+    assert len(llamadas) == 1
+    assert sorted(resultados) == sorted(str(tmp_path / f"escena_{i}.m4a") for i in range(4))
+    assert all(os.path.exists(ruta) for ruta in resultados)
+    assert cache.metricas()["coalescidas"] == 3
+
+
+def test_expulsa_lo_usado_hace_mas_tiempo(tmp_path):
+    cache = CacheTTS(str(tmp_path / "cache"), max_bytes=25)
+    for clave in ("a", "b"):
+        ruta = str(tmp_path / f"{clave}.mp3")
+        cache.obtener_o_generar(clave, ruta, _sintetizador(ruta, b"x" * 10))
+    # "a" se vuelve a usar: la más antigua pasa a ser "b"
+    cache.obtener_o_generar("a", str(tmp_path / "a2.mp3"), _sintetizador(str(tmp_path / "a2.mp3")))
+    ruta = str(tmp_path / "c.mp3")
+    cache.obtener_o_generar("c", ruta, _sintetizador(ruta, b"x" * 10))
+
+    assert sorted(os.listdir(tmp_path / "cache")) == ["a.mp3", "c.mp3"]
+    assert cache.metricas()["expulsadas"] == 1
+
+
+def test_fallo_de_sintesis_no_se_guarda(tmp_path):
+    cache = CacheTTS(str(tmp_path / "cache"), max_bytes=1024)
+
+    assert cache.obtener_o_generar("k", str(tmp_path / "a.mp3"), lambda: "") == ""
+    assert os.listdir(tmp_path / "cache") == []
+
+
+def test_si_no_se_guarda_en_cache_las_esperas_copian_la_sintesis(tmp_path, monkeypatch):
+    cache = CacheTTS(str(tmp_path / "cache"), max_bytes=1024)
+    monkeypatch.setattr(cache, "_guardar", lambda nombre, ruta: "")  # p. ej. disco lleno
+    llamadas = []
+    resultados = []
+
+    def pedir(i):
+        ruta = str(tmp_path / f"escena_{i}.m4a")
+        resultados.append(cache.obtener_o_generar("k", ruta, _sintetizador(ruta, llamadas=llamadas, espera=0.2)))
+
+    hilos = [threading.Thread(target=pedir, args=(i,)) for i in range(3)]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+
+    assert len(llamadas) == 1
+    assert sorted(resultados) == sorted(str(tmp_path / f"escena_{i}.m4a") for i in range(3))
+    for ruta in resultados:
+        with open(ruta, "rb") as f:
+            assert f.read() == b"audio"
@@ -0,0 +1,109 @@
+# tests/test_video_generator.py
+
+# Prueba del motor de render ffmpeg: una escena de imagen fija se codifica a su segmento,
+# los segmentos se renderizan en paralelo en el pool de procesos y se unen sin recodificar.
+# El render de varias escenas seguidas mantiene la memoria acotada y la narración AAC
+# se copia al segmento sin recodificar.
+
+import os
+import pytest
+from PIL import Image
+
+pytest.importorskip("imageio_ffmpeg")
+
+from core.processors.video_generator import VideoGenerator, argumentos_audio
+from core.processors.ffmpeg_utils import ejecutar_ffmpeg
+from core.processors.audio_generator import convertir_a_m4a
+from core.render_pool import renderizar_segmento, detener_pool_render
+
+
+@pytest.fixture
+def recursos(tmp_path):
+    ruta_imagen = tmp_path / "escena.png"
+    ruta_audio = tmp_path / "escena.mp3"
+    Image.new("RGB", (1024, 1024), (90, 140, 200)).save(ruta_imagen)
+    ejecutar_ffmpeg(["-f", "lavfi", "-i", "sine=frequency=440:duration=2", str(ruta_audio)])
+    return str(ruta_imagen), str(ruta_audio)
+
+
+def test_render_ffmpeg_y_union(recursos, tmp_path):
+    ruta_imagen, ruta_audio = recursos
+    generador = VideoGenerator(backend="ffmpeg")
+
+    segmentos = [
+        generador.render_segmento(ruta_imagen, ruta_audio, f"Escena {i}", str(tmp_path / f"seg_{i}.mp4"))
+        for i in range(2)
+    ]
+    assert all(segmento and os.path.exists(segmento) for segmento in segmentos)
+
+    ruta_final = generador.unir_segmentos(segmentos, str(tmp_path / "final.mp4"))
+    assert os.path.getsize(ruta_final) > 0
+
+
+def test_motor_desconocido():
+    with pytest.raises(ValueError):
+        VideoGenerator(backend="blender")
+
+
+def test_segmentos_en_pool_de_procesos(recursos, tmp_path):
+    from concurrent.futures import ThreadPoolExecutor
+    ruta_imagen, ruta_audio = recursos
+
+    try:
+        with ThreadPoolExecutor(max_workers=3) as hilos:
+            segmentos = list(hilos.map(
+                lambda i: renderizar_segmento("ffmpeg", ruta_imagen, ruta_audio, f"Escena {i}",
+                                              str(tmp_path / f"seg_{i}.mp4")),
+                range(3)
+            ))
+    finally:
+        detener_pool_render()
+
+    assert all(segmentos)
+    ruta_final = VideoGenerator(backend="ffmpeg").unir_segmentos(segmentos, str(tmp_path / "final.mp4"))
+    assert os.path.getsize(ruta_final) > 0
+
+
+def test_render_moviepy_memoria_acotada(recursos, tmp_path):
+    pytest.importorskip("moviepy")
+    resource = pytest.importorskip("resource")
+    ruta_imagen, ruta_audio = recursos
+    generador = VideoGenerator(backend="moviepy")
+
+    assert generador.render_segmento(ruta_imagen, ruta_audio, "Escena 0", str(tmp_path / "seg_0.mp4"))
+    pico_inicial = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    # Cada escena se libera al codificarse: el pico no crece con el número de escenas
+    for i in range(1, 9):
+        assert generador.render_segmento(ruta_imagen, ruta_audio, f"Escena {i}", str(tmp_path / f"seg_{i}.mp4"))
+    crecimiento_mb = (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - pico_inicial) / 1024
+    assert crecimiento_mb < 50
+
+
+def test_narracion_aac_se_copia(recursos, tmp_path):
+    ruta_imagen, ruta_audio = recursos
+    ruta_m4a = convertir_a_m4a(ruta_audio, str(tmp_path / "escena.m4a"))
+    assert argumentos_audio(ruta_m4a) == ["-c:a", "copy"]
+    assert "-c:a" in argumentos_audio(ruta_audio) and "aac" in argumentos_audio(ruta_audio)
+
+    segmento = VideoGenerator(backend="ffmpeg").render_segmento(
+        ruta_imagen, ruta_m4a, "Escena", str(tmp_path / "seg.mp4")
+    )
+    assert segmento and os.path.getsize(segmento) > 0
+
+
+def test_render_ffmpeg_con_comilla_en_la_ruta(recursos, tmp_path):
+    from core.processors.fotogramas import CompositorFotogramas
+    from utils.subtitulos import escribir_srt
+
+    ruta_imagen, ruta_audio = recursos
+    ruta_srt = str(tmp_path / "escena.srt")
+    escribir_srt([(0.0, 1.0, "Había una vez"), (1.0, 2.0, "un dragón")], ruta_srt)
+    generador = VideoGenerator(backend="ffmpeg")
+    # Los fotogramas temporizados van en la lista concat: la comilla debe ir escapada
+    generador.compositor = CompositorFotogramas(720, 720, cache_dir=str(tmp_path / "cuento d'Artagnan"))
+
+    segmento = generador.render_segmento(ruta_imagen, ruta_audio, "Había una vez un dragón",
+                                         str(tmp_path / "seg.mp4"), ruta_subtitulo=ruta_srt)
+
+    assert segmento and os.path.getsize(segmento) > 0
@@ -0,0 +1,80 @@
+# utils/subtitulos.py
+# Lectura y escritura de subtítulos SRT / WebVTT y unión de los subtítulos de cada escena
+# en un único archivo de la historia, desplazando los tiempos según la duración de cada escena.
+
+import re
+
+TIEMPO_SRT = re.compile(r"(\d+):(\d+):(\d+)[,.](\d+)\s*-->\s*(\d+):(\d+):(\d+)[,.](\d+)")
+
+
+def leer_srt(ruta_srt: str) -> list:
+    """
+    Lee un archivo .srt.
+
+    Retorna:
+    - list: [(inicio_s, fin_s, texto), ...] en orden.
+    """
+    with open(ruta_srt, encoding="utf-8") as f:
+        bloques = re.split(r"\n\s*\n", f.read().strip())
+
+    lineas = []
+    for bloque in bloques:
+        filas = bloque.strip().splitlines()
+        for i, fila in enumerate(filas):
+            tiempo = TIEMPO_SRT.search(fila)
+            if tiempo:
+                h1, m1, s1, ms1, h2, m2, s2, ms2 = (int(v) for v in tiempo.groups())
+                texto = " ".join(filas[i + 1:]).strip()
+                lineas.append((h1 * 3600 + m1 * 60 + s1 + ms1 / 1000,
+                               h2 * 3600 + m2 * 60 + s2 + ms2 / 1000, texto))
+                break
+    return lineas
+
+
+def formatear_tiempo(segundos: float, separador: str = ",") -> str:
+    """
+    Convierte segundos a hh:mm:ss,mmm (SRT) o hh:mm:ss.mmm (WebVTT, separador=".").
+    """
+    milisegundos_totales = int(round(max(segundos, 0) * 1000))
+    horas, resto = divmod(milisegundos_totales, 3600 * 1000)
+    minutos, resto = divmod(resto, 60 * 1000)
+    segundos_rest, milisegundos = divmod(resto, 1000)
+    return f"{horas:02}:{minutos:02}:{segundos_rest:02}{separador}{milisegundos:03}"
+
+
+def escribir_srt(lineas: list, ruta_salida: str) -> str:
+    with open(ruta_salida, "w", encoding="utf-8") as f:
+        for i, (inicio, fin, texto) in enumerate(lineas, start=1):
+            f.write(f"{i}\n{formatear_tiempo(inicio)} --> {formatear_tiempo(fin)}\n{texto}\n\n")
+    return ruta_salida
+
+
+def escribir_vtt(lineas: list, ruta_salida: str) -> str:
+    with open(ruta_salida, "w", encoding="utf-8") as f:
+        f.write("WEBVTT\n\n")
+        for inicio, fin, texto in lineas:
+            f.write(f"{formatear_tiempo(inicio, '.')} --> {formatear_tiempo(fin, '.')}\n{texto}\n\n")
+    return ruta_salida
+
+
+def unir_subtitulos(escenas: list) -> list:
+    """
+    Une los subtítulos de las escenas en una sola línea de tiempo.
+
+    Parámetros:
+    - escenas (list): [(ruta_srt | None, duracion_escena_s), ...] en el orden del video.
+
+    Retorna:
+    - list: [(inicio_s, fin_s, texto), ...] con los tiempos de la historia completa.
+    """
+    lineas = []
+    desplazamiento = 0.0
+    for ruta_srt, duracion in escenas:
+        if ruta_srt:
+            for inicio, fin, texto in leer_srt(ruta_srt):
+                # Whisper puede pasarse unas décimas del final del audio: se recorta a la escena
+                fin = min(fin, duracion)
+                if texto and fin > inicio:
+                    lineas.append((desplazamiento + inicio, desplazamiento + fin, texto))
+        desplazamiento += duracion
+    return lineas
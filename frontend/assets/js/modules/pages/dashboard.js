@@ -7,10 +7,15 @@
   ► 3. Renderiza tarjetas dinámicas por perfil con opciones de eliminar/usar
   ► 4. Elimina perfiles con confirmación visual (SweetAlert2)
   ► 5. Guarda perfil activo en localStorage (profile_id)
+  ► 6. Muestra los últimos cuentos con su miniatura (/api/stories/history)
 --------------------------------------------------------------------------- */
 
 import { apiClient } from '../api.js';
 import { mostrarFeedback } from '../utils/showFeedback.js';
+import { cargarMiniaturas } from '../utils/miniaturas.js';
+
+// Cuántos cuentos recientes se muestran en el panel
+const CUENTOS_RECIENTES = 4;
 
 /** Verifica si hay token. Si no, redirige al login absoluto */
 function verificarAutenticacion() {
@@ -24,6 +29,7 @@ function verificarAutenticacion() {
 export function initPage() {
   verificarAutenticacion();
   obtenerPerfiles();
+  obtenerCuentosRecientes();
 }
 
 /** Llama al backend y renderiza los perfiles del adulto */
@@ -61,6 +67,36 @@ async function obtenerPerfiles() {
   }
 }
 
+/** Llama al backend y renderiza los últimos cuentos con su miniatura */
+async function obtenerCuentosRecientes() {
+  const contenedor = document.getElementById('cuentos-recientes');
+  if (!contenedor) return;
+
+  try {
+    const { data: cuentos } = await apiClient.get('/stories/history', {
+      params: { limite: CUENTOS_RECIENTES }
+    });
+
+    if (!cuentos.length) {
+      contenedor.innerHTML = '<p class="text-muted">Aún no has creado cuentos.</p>';
+      return;
+    }
+
+    contenedor.innerHTML = cuentos.map(cuento => `
+      <a class="cuento-reciente" href="result.html?id=${cuento.id}">
+        <img data-thumbnail="${cuento.thumbnail_url || ''}" alt="Miniatura del cuento" hidden />
+        <span>${cuento.nombre}</span>
+      </a>
+    `).join('');
+
+    cargarMiniaturas(contenedor);
+
+  } catch (err) {
+    console.error('[dashboard] Error al obtener cuentos recientes:', err);
+    contenedor.innerHTML = '<p class="text-muted">No se pudieron cargar los cuentos.</p>';
+  }
+}
+
 /** Delegación de eventos para botones dentro del contenedor */
 document.addEventListener('click', (e) => {
   const id = e.target.dataset.id;
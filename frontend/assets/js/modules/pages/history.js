@@ -6,6 +6,7 @@
 // -----------------------------------------------------------------------------
 
 import { apiClient } from '../api.js';
+import { cargarMiniaturas } from '../utils/miniaturas.js';
 
 // Función principal de inicialización
 function initPage() {
@@ -42,6 +43,9 @@ function initPage() {
                 col.innerHTML = renderCard(story);
                 listContainer.appendChild(col);
             });
+
+            // Miniaturas ligeras (existen desde la primera escena), sin descargar los videos
+            cargarMiniaturas(listContainer);
         } catch (err) {
             console.error('[history.js] Error al cargar historial:', err);
             resetStates();
@@ -57,7 +61,7 @@ function initPage() {
 
         return `
       <div class="history-card">
-        <img src="${story.thumbnail_url}" alt="Miniatura del cuento" class="history-card__img">
+        <img data-thumbnail="${story.thumbnail_url || ''}" alt="Miniatura del cuento" class="history-card__thumb" hidden>
         <div class="history-card__body">
           <h5 class="history-card__title">${story.nombre}</h5>
           <p class="history-card__meta">${fecha}</p>
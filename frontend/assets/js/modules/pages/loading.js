@@ -22,10 +22,45 @@ export function initPage() {
     return;
   }
 
-  const endpoint = `http://localhost:5000/api/stories/${storyId}/status`;
+  const API = 'http://localhost:5000';
+  const endpoint = `${API}/api/stories/${storyId}/status`;
   let intentos = 0;
   const maxIntentos = 20;
 
+  // Reproducción progresiva: la playlist HLS lleva su propio token firmado en la URL,
+  // así el reproductor pide variantes y trozos sin cabecera Authorization
+  const video = document.getElementById('vista-hls');
+  let reproduciendo = false;
+
+  function reproducirPlaylist(playlistUrl) {
+    if (reproduciendo || !playlistUrl || !video) return;
+    const url = `${API}${playlistUrl}`;
+
+    if (video.canPlayType('application/vnd.apple.mpegurl')) {
+      video.src = url;
+    } else if (window.Hls && window.Hls.isSupported()) {
+      const hls = new window.Hls();
+      hls.loadSource(url);
+      hls.attachMedia(video);
+    } else {
+      return; // Sin soporte HLS: se espera al video final
+    }
+
+    reproduciendo = true;
+    video.classList.remove('d-none');
+  }
+
+  // Al terminar: si ya se está viendo la versión progresiva no se interrumpe con la redirección
+  function cuentoListo() {
+    const resultado = `/pages/result.html?id=${storyId}`;
+    if (reproduciendo) {
+      statusText.innerHTML = `¡Listo! <a href="${resultado}">Ver y descargar tu video-cuento</a>`;
+      return;
+    }
+    statusText.textContent = '¡Listo! Redirigiendo a tu video-cuento...';
+    window.location.href = resultado;
+  }
+
   // 3. Función que consulta repetidamente el estado del cuento
   async function verificarEstado() {
     try {
@@ -41,17 +76,22 @@ export function initPage() {
         throw new Error(data?.error || 'Error inesperado del servidor.');
       }
 
+      reproducirPlaylist(data.playlist_url);
+
       // 4. Procesamiento según estado devuelto
       switch (data.status) {
         case 'completed':
-          statusText.textContent = '¡Listo! Redirigiendo a tu video-cuento...';
-          window.location.href = `/pages/result.html?id=${storyId}`;
+          cuentoListo();
           break;
 
         case 'failed':
           statusText.textContent = 'La generación del cuento ha fallado. Intenta nuevamente.';
           break;
 
+        case 'cancelled':
+          statusText.textContent = 'La generación del cuento fue cancelada.';
+          break;
+
         case 'pending':
         case 'generating':
           statusText.textContent = `Generando cuento mágico... (Intento ${intentos + 1} de ${maxIntentos})`;
@@ -74,6 +114,83 @@ export function initPage() {
     }
   }
 
-  // 5. Inicia el ciclo de verificación
-  verificarEstado();
+  // 5. Texto de progreso detallado (etapa, escenas y tiempo estimado)
+  const etapas = {
+    pending: 'En cola',
+    texto: 'Escribiendo el cuento',
+    escenas: 'Ilustrando y narrando escenas',
+    render: 'Montando el video'
+  };
+
+  function mostrarProgreso(data) {
+    const etapa = etapas[data.etapa] || 'Generando cuento mágico';
+    let texto = `${etapa}...`;
+    if (data.escenas_total) {
+      const total = data.total_definitivo ? data.escenas_total : `${data.escenas_total}+`;
+      texto += ` Escena ${data.escenas_completadas} de ${total}.`;
+    }
+    if (data.eta_segundos) {
+      texto += ` Quedan unos ${Math.ceil(data.eta_segundos / 60)} min.`;
+    }
+    statusText.textContent = texto;
+  }
+
+  // 6. Escucha el stream de progreso (SSE). Se usa fetch en lugar de EventSource
+  //    para poder enviar la cabecera Authorization.
+  async function escucharProgreso() {
+    const res = await fetch(`${API}/api/stories/${storyId}/events`, {
+      headers: {
+        Authorization: `Bearer ${token}`
+      }
+    });
+
+    if (!res.ok || !res.body) {
+      throw new Error(`Stream no disponible (${res.status})`);
+    }
+
+    const lector = res.body.getReader();
+    const decodificador = new TextDecoder();
+    let buffer = '';
+
+    while (true) {
+      const { value, done } = await lector.read();
+      if (done) break;
+      buffer += decodificador.decode(value, { stream: true });
+
+      // Cada evento SSE termina con una línea en blanco
+      let fin;
+      while ((fin = buffer.indexOf('\n\n')) !== -1) {
+        const bloque = buffer.slice(0, fin);
+        buffer = buffer.slice(fin + 2);
+
+        const linea = bloque.split('\n').find((l) => l.startsWith('data: '));
+        if (!linea) continue; // comentarios de keep-alive
+
+        const data = JSON.parse(linea.slice(6));
+        reproducirPlaylist(data.playlist_url);
+        if (data.status === 'completed') {
+          cuentoListo();
+          return;
+        }
+        if (data.status === 'failed') {
+          statusText.textContent = 'La generación del cuento ha fallado. Intenta nuevamente.';
+          return;
+        }
+        if (data.status === 'cancelled') {
+          statusText.textContent = 'La generación del cuento fue cancelada.';
+          return;
+        }
+        mostrarProgreso(data);
+      }
+    }
+
+    // El stream se cortó sin estado final: se continúa por consulta periódica
+    throw new Error('Stream cerrado antes de terminar');
+  }
+
+  // 7. Inicia el stream de progreso; si falla, vuelve al ciclo de verificación
+  escucharProgreso().catch((err) => {
+    console.warn('[loading.js] Progreso en vivo no disponible, consultando estado:', err);
+    verificarEstado();
+  });
 }
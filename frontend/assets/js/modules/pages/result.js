@@ -22,6 +22,19 @@ export function initPage() {
   }
 
   const videoUrl = `http://localhost:5000/api/stories/${storyId}/download`;
+  const posterUrl = `http://localhost:5000/api/stories/${storyId}/poster`;
+
+  // Portada ligera mientras se descarga el video completo
+  fetch(posterUrl, {
+    headers: {
+      Authorization: `Bearer ${token}`
+    }
+  })
+    .then(res => (res.ok ? res.blob() : null))
+    .then(blob => {
+      if (blob && blob.size > 0) videoElement.poster = URL.createObjectURL(blob);
+    })
+    .catch(() => {});
 
   fetch(videoUrl, {
     headers: {
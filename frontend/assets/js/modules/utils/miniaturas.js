@@ -0,0 +1,27 @@
+// archivo: frontend/assets/js/modules/utils/miniaturas.js
+// -----------------------------------------------------------------------------
+// Carga las miniaturas de los cuentos (/api/stories/<id>/thumbnail)
+// La ruta exige JWT y un <img src> no puede enviarlo: se pide como blob con apiClient
+// Uso: <img data-thumbnail="/api/stories/<id>/thumbnail" hidden> + cargarMiniaturas(contenedor)
+// -----------------------------------------------------------------------------
+
+import { apiClient } from '../api.js';
+
+/** Rellena cada <img data-thumbnail> del contenedor con su miniatura */
+export function cargarMiniaturas(contenedor) {
+    contenedor.querySelectorAll('img[data-thumbnail]').forEach(img => {
+        const url = img.dataset.thumbnail;
+        img.removeAttribute('data-thumbnail');
+        if (!url) return;
+
+        // apiClient ya incluye /api en su baseURL
+        apiClient.get(url.replace(/^\/api/, ''), { responseType: 'blob' })
+            .then(({ data }) => {
+                if (data && data.size > 0) {
+                    img.src = URL.createObjectURL(data);
+                    img.hidden = false;
+                }
+            })
+            .catch(err => console.warn('[miniaturas] No se pudo cargar la miniatura:', err));
+    });
+}